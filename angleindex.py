@@ -0,0 +1,259 @@
+import heapq
+import random
+from array import array
+from collections import deque
+from math import sqrt, acos, cos, pi
+from operator import add, mul
+from timeit import default_timer as timer
+from vector import Vector
+
+ZERO_TOLERANCE = 1e-10
+
+EXACT = 'exact'
+LSH = 'lsh'
+
+DEFAULT_BLOCK_SIZE = 1024
+DEFAULT_NUM_TABLES = 8
+DEFAULT_NUM_BITS = 8
+LATENCY_SAMPLES = 1000
+
+UNKNOWN_BACKEND_MSG = 'Unknown index backend'
+CANNOT_INDEX_ZERO_VECTOR_MSG = 'Cannot index or query the zero vector, it has no direction'
+DIMENSIONS_MUST_MATCH_MSG = 'All vectors should live in the same dimension'
+
+
+def _unit(v, dimension):
+    coordinates = getattr(v, 'coordinates', v)
+    if len(coordinates) != dimension:
+        raise Exception(DIMENSIONS_MUST_MATCH_MSG)
+    magnitude = sqrt(sum([x * x for x in coordinates]))
+    if magnitude < ZERO_TOLERANCE:
+        raise Exception(CANNOT_INDEX_ZERO_VECTOR_MSG)
+    return array('d', [x / magnitude for x in coordinates])
+
+
+def _angle(similarity):
+    # unit vectors, so only roundoff takes the cosine outside [-1, 1]
+    return acos(max(-1., min(1., similarity)))
+
+
+class AngleIndex(object):
+    # nearest vectors by angle. Stored vectors are normalized once into one
+    # contiguous float64 buffer (row-major, like VectorBatch), so a query is
+    # a sequence of inner products with unit rows. The exact backend scans
+    # the buffer block_size rows at a time, a strided column per coordinate;
+    # the lsh backend hashes every vector with num_tables sets of num_bits
+    # random hyperplanes and only ranks the vectors that share a bucket (or
+    # a bucket one bit away) with the query. Results are (id, angle) pairs,
+    # closest first, where id is the insertion position.
+
+    def __init__(self, dimension, backend=EXACT, block_size=DEFAULT_BLOCK_SIZE,
+                 num_tables=DEFAULT_NUM_TABLES, num_bits=DEFAULT_NUM_BITS, seed=0):
+        if backend not in (EXACT, LSH):
+            raise Exception(UNKNOWN_BACKEND_MSG)
+        self.dimension = dimension
+        self.backend = backend
+        self.block_size = block_size
+        self.units = array('d')
+        self.count = 0
+
+        if backend == LSH:
+            rng = random.Random(seed)
+            # per table, num_bits hyperplane normals stored row-major
+            self.planes = [array('d', [rng.gauss(0., 1.) for _ in range(num_bits * dimension)])
+                           for _ in range(num_tables)]
+            self.num_bits = num_bits
+            self.tables = [{} for _ in range(num_tables)]
+
+        self.queries = 0
+        self.candidates = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    @classmethod
+    def from_vectors(cls, vectors, **options):
+        vectors = list(vectors)
+        index = cls(vectors[0].dimension, **options)
+        index.extend(vectors)
+        return index
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        # the stored unit vector
+        d = self.dimension
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError('vector index out of range')
+        return Vector(self.units[i * d:(i + 1) * d])
+
+    def __str__(self):
+        return 'AngleIndex: {} vectors of dimension {}, {} backend'.format(
+            self.count, self.dimension, self.backend)
+
+
+    def _signature(self, planes, u):
+        d = self.dimension
+        signature = 0
+        for b in range(self.num_bits):
+            if sum(map(mul, planes[b * d:(b + 1) * d], u)) >= 0.:
+                signature |= 1 << b
+        return signature
+
+    def add(self, v):
+        u = _unit(v, self.dimension)
+        i = self.count
+        self.units.extend(u)
+        self.count += 1
+        if self.backend == LSH:
+            for planes, table in zip(self.planes, self.tables):
+                table.setdefault(self._signature(planes, u), []).append(i)
+        return i
+
+    def extend(self, vectors):
+        return [self.add(v) for v in vectors]
+
+    def _similarities(self, q, start, stop):
+        # inner products of q with rows start..stop, one coordinate column at a time
+        d = self.dimension
+        block = self.units[start * d:stop * d]
+        c = q[0]
+        sums = [x * c for x in block[0::d]]
+        for j in range(1, d):
+            c = q[j]
+            sums = list(map(add, sums, [x * c for x in block[j::d]]))
+        return sums
+
+    def _candidates(self, q):
+        # ids sharing a bucket with q, or a bucket one hyperplane away, in some table
+        found = set()
+        for planes, table in zip(self.planes, self.tables):
+            signature = self._signature(planes, q)
+            found.update(table.get(signature, ()))
+            for b in range(self.num_bits):
+                found.update(table.get(signature ^ (1 << b), ()))
+        return sorted(found)
+
+    def _scored(self, q, exact):
+        # (similarity, id) pairs of every vector the backend looks at
+        if exact or self.backend == EXACT:
+            self.candidates += self.count
+            for start in range(0, self.count, self.block_size):
+                stop = min(self.count, start + self.block_size)
+                yield zip(self._similarities(q, start, stop), range(start, stop))
+            return
+        d = self.dimension
+        units = self.units
+        ids = self._candidates(q)
+        self.candidates += len(ids)
+        yield [(sum(map(mul, units[i * d:(i + 1) * d], q)), i) for i in ids]
+
+    def _top(self, q, k, exact):
+        best = []
+        for scored in self._scored(q, exact):
+            best = heapq.nlargest(k, best + heapq.nlargest(k, scored))
+        return best
+
+    def search(self, query, k=10, in_degrees=False, exact=False):
+        # the k stored vectors closest in direction to query;
+        # exact=True scans everything whatever the backend
+        start = timer()
+        best = self._top(_unit(query, self.dimension), k, exact)
+        factor = 180 / pi if in_degrees else 1.
+        results = [(i, _angle(s) * factor) for s, i in best]
+        self._record(start)
+        return results
+
+    def within(self, query, max_angle, in_degrees=False, exact=False):
+        # every stored vector at most max_angle away from query, closest first
+        start = timer()
+        q = _unit(query, self.dimension)
+        factor = 180 / pi if in_degrees else 1.
+        threshold = cos(max_angle / factor) - ZERO_TOLERANCE
+        found = []
+        for scored in self._scored(q, exact):
+            found.extend([(s, i) for s, i in scored if s >= threshold])
+        found.sort(reverse=True)
+        results = [(i, _angle(s) * factor) for s, i in found]
+        results = [(i, a) for i, a in results if a <= max_angle + ZERO_TOLERANCE]
+        self._record(start)
+        return results
+
+    def _record(self, start):
+        self.queries += 1
+        self._latencies.append(timer() - start)
+
+    def recall(self, queries, k=10):
+        # mean fraction of the exact top k that search returns (always 1 for
+        # the exact backend); only the searches count towards metrics()
+        total = 0.
+        queries = list(queries)
+        for query in queries:
+            candidates = self.candidates
+            expected = set([i for s, i in self._top(_unit(query, self.dimension), k, True)])
+            self.candidates = candidates
+            found = set([i for i, a in self.search(query, k)])
+            total += len(expected & found) / len(expected) if expected else 1.
+        return total / len(queries) if queries else 1.
+
+    def metrics(self):
+        latencies = sorted(self._latencies)
+
+        def percentile(q):
+            if not latencies:
+                return 0.
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        return {
+            'size': self.count,
+            'queries': self.queries,
+            # vectors ranked per query: all of them for an exact scan
+            'mean_candidates': self.candidates / self.queries if self.queries else 0.,
+            'latency_mean': sum(latencies) / len(latencies) if latencies else 0.,
+            'latency_p50': percentile(0.5),
+            'latency_p99': percentile(0.99),
+        }
+
+
+if __name__ == '__main__':
+    rng = random.Random(1)
+    dimension = 8
+    vectors = [Vector([rng.gauss(0, 1) for _ in range(dimension)]) for _ in range(2000)]
+    queries = [Vector([rng.gauss(0, 1) for _ in range(dimension)]) for _ in range(50)]
+
+    # the exact backend agrees with a linear scan over angle_with
+    index = AngleIndex.from_vectors(vectors, block_size=300)
+    q = queries[0]
+    scan = sorted(range(len(vectors)), key=lambda i: -q.normalize().inner_product(vectors[i].normalize()))
+    results = index.search(q, 5)
+    if not ([i for i, a in results] == scan[:5] and abs(results[0][1] - q.angle_with(vectors[scan[0]])) < 1e-3):
+        print('test case 1 failed')
+
+    def degrees(u, v):
+        return acos(max(-1., min(1., u.normalize().inner_product(v.normalize())))) * 180 / pi
+
+    close = index.within(q, 40, in_degrees=True)
+    if not ([i for i, a in close] == [i for i in scan if degrees(q, vectors[i]) <= 40] and
+            all(a <= 40 for i, a in close)):
+        print('test case 2 failed')
+
+    # approximate backend: most of the true neighbours from a fraction of the vectors
+    lsh = AngleIndex.from_vectors(vectors, backend=LSH)
+    recall = lsh.recall(queries, 10)
+    metrics = lsh.metrics()
+    if not (recall > 0.8 and metrics['mean_candidates'] < len(vectors) and metrics['queries'] == 50):
+        print('test case 3 failed')
+
+    # inserts are searchable right away
+    i = lsh.add(Vector([2.] * dimension))
+    if not (lsh.search(Vector([1.] * dimension), 1)[0][0] == i and len(lsh) == 2001 and
+            abs(lsh[i].magnitude() - 1) < 1e-12):
+        print('test case 4 failed')
+
+    try:
+        index.add(Vector([0.] * dimension))
+        print('test case 5 failed')
+    except Exception as e:
+        if str(e) != CANNOT_INDEX_ZERO_VECTOR_MSG:
+            print('test case 5 failed')
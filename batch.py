@@ -0,0 +1,150 @@
+from array import array
+
+ZERO_TOLERANCE = 1e-10
+
+UNIQUE_SOLUTION = 0
+NO_SOLUTIONS = 1
+INF_SOLUTIONS = 2
+
+UNIQUE_SOLUTION_MSG = 'Unique solution'
+NO_SOLUTIONS_MSG = 'No solutions'
+INF_SOLUTIONS_MSG = 'Infinitely many solutions'
+
+CLASSIFICATION_MSGS = {
+    UNIQUE_SOLUTION: UNIQUE_SOLUTION_MSG,
+    NO_SOLUTIONS: NO_SOLUTIONS_MSG,
+    INF_SOLUTIONS: INF_SOLUTIONS_MSG,
+}
+
+ALL_SYSTEMS_MUST_HAVE_SAME_SHAPE_MSG = 'All systems in a batch should have the same shape'
+
+
+def stack_equations(systems):
+    # turn a list of equation lists (Lines, Planes or a LinearSystem) into coeffs/consts
+    coeffs = []
+    consts = []
+    for equations in systems:
+        coeffs.append([e.normal_vector.coordinates for e in equations])
+        consts.append([e.constant_term for e in equations])
+    return coeffs, consts
+
+
+def solve_batch(coeffs, consts):
+    # coeffs has shape [N][m][n] and consts [N][m]. Returns a classification
+    # code per system and a flat [N*n] solution array; system k owns
+    # solutions[k*n:(k+1)*n]. Infinite systems get the particular solution with
+    # every free variable set to zero, inconsistent ones get nan.
+    num_systems = len(coeffs)
+    classes = array('b', bytes(num_systems))
+    if num_systems == 0:
+        return classes, array('d')
+
+    m = len(coeffs[0])
+    n = len(coeffs[0][0])
+    for rows in coeffs:
+        if len(rows) != m or any(len(r) != n for r in rows):
+            raise Exception(ALL_SYSTEMS_MUST_HAVE_SAME_SHAPE_MSG)
+    solutions = array('d', bytes(8 * num_systems * n))
+
+    if m == n == 2:
+        _solve_2x2(coeffs, consts, classes, solutions)
+    elif m == n == 3:
+        _solve_3x3(coeffs, consts, classes, solutions)
+    else:
+        for k in range(num_systems):
+            _store(k, n, _eliminate(coeffs[k], consts[k], n), classes, solutions)
+    return classes, solutions
+
+
+def _store(k, n, result, classes, solutions):
+    code, x = result
+    classes[k] = code
+    solutions[k * n:(k + 1) * n] = array('d', x)
+
+
+def _solve_2x2(coeffs, consts, classes, solutions):
+    for k in range(len(coeffs)):
+        (a, b), (c, d) = coeffs[k]
+        k1, k2 = consts[k]
+        det = a * d - b * c
+        if abs(det) < ZERO_TOLERANCE:
+            _store(k, 2, _eliminate(coeffs[k], consts[k], 2), classes, solutions)
+            continue
+        solutions[2 * k] = (d * k1 - b * k2) / det
+        solutions[2 * k + 1] = (a * k2 - c * k1) / det
+
+
+def _solve_3x3(coeffs, consts, classes, solutions):
+    for k in range(len(coeffs)):
+        (a, b, c), (d, e, f), (g, h, i) = coeffs[k]
+        k1, k2, k3 = consts[k]
+        # cofactors of the first row are reused for the determinant
+        co_a = e * i - f * h
+        co_b = f * g - d * i
+        co_c = d * h - e * g
+        det = a * co_a + b * co_b + c * co_c
+        if abs(det) < ZERO_TOLERANCE:
+            _store(k, 3, _eliminate(coeffs[k], consts[k], 3), classes, solutions)
+            continue
+        inv = 1. / det
+        solutions[3 * k] = (k1 * co_a + b * (f * k3 - k2 * i) + c * (k2 * h - e * k3)) * inv
+        solutions[3 * k + 1] = (a * (k2 * i - f * k3) + k1 * co_b + c * (d * k3 - k2 * g)) * inv
+        solutions[3 * k + 2] = (a * (e * k3 - k2 * h) + b * (k2 * g - d * k3) + k1 * co_c) * inv
+
+
+def _eliminate(coeffs, consts, n):
+    rows = [list(r) + [c] for r, c in zip(coeffs, consts)]
+    m = len(rows)
+
+    pivots = []
+    row = 0
+    for col in range(n):
+        if row >= m:
+            break
+        pivot_row = max(range(row, m), key=lambda i: abs(rows[i][col]))
+        if abs(rows[pivot_row][col]) < ZERO_TOLERANCE:
+            continue
+        rows[row], rows[pivot_row] = rows[pivot_row], rows[row]
+        top = rows[row]
+        pivot = top[col]
+        for i in range(m):
+            if i == row:
+                continue
+            factor = rows[i][col] / pivot
+            if factor != 0.:
+                rows[i] = [y - factor * x for x, y in zip(top, rows[i])]
+        pivots.append(col)
+        row += 1
+
+    for r in rows[row:]:
+        if abs(r[n]) >= ZERO_TOLERANCE:
+            return NO_SOLUTIONS, [float('nan')] * n
+
+    x = [0.] * n
+    for i, col in enumerate(pivots):
+        x[col] = rows[i][n] / rows[i][col]
+    if len(pivots) != n:
+        return INF_SOLUTIONS, x
+    return UNIQUE_SOLUTION, x
+
+
+if __name__ == '__main__':
+    classes, x = solve_batch([[[1, 1], [1, -1]], [[1, 1], [2, 2]], [[1, 1], [2, 2]]],
+                             [[2, 0], [1, 2], [1, 3]])
+    if not (list(classes) == [UNIQUE_SOLUTION, INF_SOLUTIONS, NO_SOLUTIONS] and
+            list(x[0:2]) == [1., 1.]):
+        print('test case 1 failed')
+
+    classes, x = solve_batch([[[0, 1, 1], [1, -1, 1], [1, 2, -5]]], [[1, 2, 3]])
+    if not (classes[0] == UNIQUE_SOLUTION and
+            all(abs(a - b) < 1e-10 for a, b in zip(x, [23/9, 7/9, 2/9]))):
+        print('test case 2 failed')
+
+    classes, x = solve_batch([[[1, 1, 1], [0, 1, 0], [1, 1, -1], [1, 0, -2]]], [[1, 2, 3, 2]])
+    if not (classes[0] == UNIQUE_SOLUTION and
+            all(abs(a - b) < 1e-10 for a, b in zip(x, [0, 2, -1]))):
+        print('test case 3 failed')
+
+    classes, x = solve_batch([[[1, 1, 1], [1, 1, 1]]], [[1, 2]])
+    if not (classes[0] == NO_SOLUTIONS and CLASSIFICATION_MSGS[classes[0]] == NO_SOLUTIONS_MSG):
+        print('test case 4 failed')
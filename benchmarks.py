@@ -0,0 +1,333 @@
+import sys
+import random
+from copy import deepcopy
+from timeit import default_timer as timer
+from vector import Vector
+from plane import Plane
+from linsys import LinearSystem
+
+
+def best_of(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = timer()
+        fn()
+        best = min(best, timer() - start)
+    return best
+
+
+def random_system(num_equations, dimension, seed=0):
+    rng = random.Random(seed)
+    return LinearSystem([Plane(normal_vector=Vector([rng.uniform(-10, 10) for _ in range(dimension)]),
+                               constant_term=rng.uniform(-10, 10))
+                         for _ in range(num_equations)])
+
+
+def bench_copy(num_equations=1000, dimension=3):
+    # compute_triangular_form used to start with a deepcopy of the whole system
+    s = random_system(num_equations, dimension)
+    print('copy, {} equations in {} variables'.format(num_equations, dimension))
+    print('  deepcopy:            {:.4f}s'.format(best_of(lambda: deepcopy(s))))
+    print('  structural copy:     {:.4f}s'.format(best_of(lambda: s.copy())))
+    print('  triangular (deepcopy + inplace): {:.4f}s'.format(
+        best_of(lambda: deepcopy(s).compute_triangular_form(inplace=True))))
+    print('  triangular (copy-on-write):      {:.4f}s'.format(
+        best_of(lambda: s.compute_triangular_form())))
+    fresh = [random_system(num_equations, dimension) for _ in range(3)]
+    print('  triangular (inplace):            {:.4f}s'.format(
+        best_of(lambda: fresh.pop().compute_triangular_form(inplace=True))))
+
+
+def bench_blocked(dimension=300, block_size=64):
+    import os
+    s = random_system(dimension, dimension).to_dense()
+    print('LU, {0}x{0}, block size {1}'.format(dimension, block_size))
+    print('  unblocked:              {:.3f}s'.format(best_of(lambda: s.factorize(), 1)))
+    print('  blocked, serial:        {:.3f}s'.format(
+        best_of(lambda: s.factorize_blocked(block_size), 1)))
+    cores = os.cpu_count() or 1
+    workers = 2
+    while workers <= max(2, cores):
+        for executor in ['thread', 'process']:
+            print('  blocked, {} workers ({}): {:.3f}s'.format(workers, executor, best_of(
+                lambda: s.factorize_blocked(block_size, workers, executor), 1)))
+        workers *= 2
+
+
+def bench_outofcore(dimension=200):
+    import os
+    import resource
+    import tempfile
+    from outofcore import OutOfCoreSystem
+    rng = random.Random(0)
+    print('out-of-core RREF, {0}x{0}'.format(dimension))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'system.bin')
+        for max_memory in [2 ** 16, 2 ** 20, 2 ** 26]:
+            # rows are generated straight into the file, never as Planes
+            rows = (([rng.uniform(-10, 10) for _ in range(dimension)], rng.uniform(-10, 10))
+                    for _ in range(dimension))
+            with OutOfCoreSystem.from_rows(path, rows, dimension, max_memory) as s:
+                start = timer()
+                s.find_solutions()
+                elapsed = timer() - start
+                print('  max_memory {:>8} bytes, {:>4} rows per tile, {:>2} columns per panel, '
+                      '{:>3} passes: {:.3f}s'.format(max_memory, s.tile_rows, s.panel_columns, s.passes, elapsed))
+    print('  peak RSS of this process: {} KiB'.format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def bench_storage(num_equations=500, dimension=500):
+    import os
+    import pickle
+    import tempfile
+    import storage
+    s = random_system(num_equations, dimension)
+    print('storage, {} equations in {} variables'.format(num_equations, dimension))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'system')
+        with open(path + '.pickle', 'wb') as f:
+            pickle.dump(s, f)
+        s.save(path + '.lsys')
+        for suffix in ['.pickle', '.lsys']:
+            print('  {:<7} {:>9} bytes'.format(suffix, os.path.getsize(path + suffix)))
+
+        def load_pickle():
+            with open(path + '.pickle', 'rb') as f:
+                pickle.load(f)
+        print('  pickle load:           {:.4f}s'.format(best_of(load_pickle)))
+        print('  mapped load:           {:.4f}s'.format(best_of(lambda: storage.load(path + '.lsys'))))
+        print('  mapped load, one row:  {:.4f}s'.format(best_of(lambda: storage.load(path + '.lsys')[0])))
+
+
+def bench_textio(num_equations=1000000, dimension=3):
+    import io
+    import textio
+    rng = random.Random(0)
+    rows = [({c: round(rng.uniform(-10, 10), 3) for c in range(dimension)}, round(rng.uniform(-10, 10), 3))
+             for _ in range(num_equations)]
+    s = textio._build(rows, dimension, 'dense')
+    print('text I/O, {} equations in {} variables'.format(num_equations, dimension))
+
+    def report(label, fn):
+        elapsed = best_of(fn, 1)
+        print('  {:<24} {:.2f}s, {:>9.0f} equations/s'.format(label, elapsed, num_equations / elapsed))
+
+    out = io.StringIO()
+    report('write equations:', lambda: textio.write_equations(s, out))
+    text = out.getvalue()
+    out = io.StringIO()
+    report('write csv:', lambda: textio.write_csv(s, out))
+    csv = out.getvalue()
+    report('Planes, then dense:', lambda: LinearSystem([Plane(Vector([row.get(c, 0.) for c in range(dimension)]), k)
+                                                         for row, k in textio.parse_equations(io.StringIO(text))]
+                                                        ).to_dense())
+    report('read equations, dense:', lambda: textio.read_equations(io.StringIO(text), dimension))
+    report('read equations, sparse:', lambda: textio.read_equations(io.StringIO(text), layout='sparse'))
+    report('read csv, dense:', lambda: textio.read_csv(io.StringIO(csv)))
+
+
+def bench_many(num_systems=2000, dimension=12):
+    import os
+    from pool import solve_many
+    systems = [random_system(dimension, dimension, seed) for seed in range(num_systems)]
+    print('solve_many, {} systems of {}x{}'.format(num_systems, dimension, dimension))
+    print('  find_solutions, one by one: {:.3f}s'.format(
+        best_of(lambda: [s.find_solutions() for s in systems], 1)))
+    print('  solve_many, 1 worker:       {:.3f}s'.format(best_of(lambda: list(solve_many(systems, 1)), 1)))
+    workers = 2
+    while workers <= max(2, os.cpu_count() or 1):
+        print('  solve_many, {} workers:      {:.3f}s'.format(
+            workers, best_of(lambda: list(solve_many(systems, workers)), 1)))
+        workers *= 2
+
+
+def bench_service(num_requests=5000, dimension=3):
+    import asyncio
+    from service import AsyncSolver
+    systems = [random_system(dimension, dimension, seed) for seed in range(num_requests)]
+    print('async service, {} concurrent {}x{} requests'.format(num_requests, dimension, dimension))
+    print('  find_solutions, one by one: {:.3f}s'.format(
+        best_of(lambda: [s.find_solutions() for s in systems], 1)))
+
+    async def run(window):
+        async with AsyncSolver(window=window) as solver:
+            await asyncio.gather(*[solver.solve(s) for s in systems])
+            return solver.metrics()
+
+    for window in [0.0005, 0.002, 0.01]:
+        metrics = asyncio.run(run(window))
+        print('  window {:.4f}s: {:>8.0f} solves/s, mean batch {:.0f}, p50 {:.4f}s, p99 {:.4f}s'.format(
+            window, metrics['throughput'], metrics['mean_batch_size'],
+            metrics['latency_p50'], metrics['latency_p99']))
+
+
+def bench_refine(dimension=150):
+    s = random_system(dimension, dimension)
+    print('mixed precision, {0}x{0}'.format(dimension))
+    print('  float64 LU:               {:.3f}s'.format(best_of(lambda: s.factorize().solve(
+        [p.constant_term for p in s.planes]), 1)))
+    print('  float32 LU + refinement:  {:.3f}s'.format(best_of(lambda: s.solve_mixed_precision(), 1)))
+    print('  {}'.format(s.solve_mixed_precision()))
+
+
+def bench_vector(count=100000, dimension=3):
+    import tracemalloc
+
+    class TupleVector(object):
+        # the layout Vector used to have: a tuple plus a per-instance __dict__
+        def __init__(self, coordinates):
+            self.coordinates = tuple(coordinates)
+            self.dimension = len(coordinates)
+
+    rng = random.Random(0)
+    rows = [[rng.uniform(-10, 10) for _ in range(dimension)] for _ in range(count)]
+    print('vectors, {} of dimension {}'.format(count, dimension))
+    for label, cls in [('tuple + __dict__', TupleVector), ('Vector', Vector)]:
+        tracemalloc.start()
+        # fresh floats per vector, as computed coordinates would be
+        vectors = [cls([x * 1. for x in row]) for row in rows]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del vectors
+        print('  {:<17} {:.0f} bytes per instance'.format(label + ':', size / count))
+
+    vectors = [Vector(row) for row in rows[:1000]]
+    pairs = list(zip(vectors, vectors[1:]))
+    print('  construction:     {:.3f}us'.format(1e6 * best_of(lambda: [Vector(row) for row in rows]) / count))
+    print('  is_parallel_to:   {:.3f}us'.format(1e6 * best_of(lambda: [u.is_parallel_to(v) for u, v in pairs]) / len(pairs)))
+    print('  angle_with:       {:.3f}us'.format(1e6 * best_of(lambda: [u.angle_with(v) for u, v in pairs]) / len(pairs)))
+
+    # the solver path: row operations are Vector.add and Vector.scale on floats
+    from plane import Plane
+    from linsys import LinearSystem
+    us = [Vector([rng.uniform(-10, 10) for _ in range(dimension)]) for _ in range(20000)]
+    vs = [Vector([rng.uniform(-10, 10) for _ in range(dimension)]) for _ in range(20000)]
+    n = 60
+    system = LinearSystem([Plane(Vector([rng.uniform(-5, 5) for _ in range(n)]), rng.uniform(-5, 5))
+                           for _ in range(n)])
+    print('  add, 20000 pairs:   {:.4f}s'.format(best_of(lambda: [u.add(v) for u, v in zip(us, vs)], 7)))
+    print('  scale, 20000:       {:.4f}s'.format(best_of(lambda: [u.scale(1.5) for u in us], 7)))
+    print('  find_solutions {0}x{0}: {1:.4f}s'.format(n, best_of(system.find_solutions, 7)))
+
+
+def bench_vectorbatch(count=100000, dimension=3):
+    from vectorbatch import VectorBatch
+    rng = random.Random(0)
+    us = [Vector([rng.uniform(-10, 10) for _ in range(dimension)]) for _ in range(count)]
+    vs = [Vector([rng.uniform(-10, 10) for _ in range(dimension)]) for _ in range(count)]
+    a = VectorBatch.from_vectors(us)
+    b = VectorBatch.from_vectors(vs)
+    print('vector batch, {} pairs of dimension {}'.format(count, dimension))
+    print('  conversion to and from Vectors: {:.3f}s'.format(
+        best_of(lambda: VectorBatch.from_vectors(us).to_vectors(), 1)))
+    cases = [
+        ('add', lambda: [u.add(v) for u, v in zip(us, vs)], lambda: a.add(b)),
+        ('inner_product', lambda: [u.inner_product(v) for u, v in zip(us, vs)], lambda: a.inner_product(b)),
+        ('normalize', lambda: [Vector(u.coordinates).normalize() for u in us], lambda: a.normalize()),
+        ('angle_with', lambda: [Vector(u.coordinates).angle_with(Vector(v.coordinates)) for u, v in zip(us, vs)],
+         lambda: a.angle_with(b)),
+        ('cross_product', lambda: [u.cross_product(v) for u, v in zip(us, vs)], lambda: a.cross_product(b)),
+        ('component_orthogonal_to', lambda: [u.component_orthogonal_to(Vector(v.coordinates)) for u, v in zip(us, vs)],
+         lambda: a.component_orthogonal_to(b)),
+    ]
+    for name, one_by_one, batched in cases:
+        # fresh Vectors where the result would otherwise come from their cache
+        print('  {:<24} Vector {:.3f}s, VectorBatch {:.3f}s'.format(
+            name + ':', best_of(one_by_one, 1), best_of(batched, 1)))
+
+
+def bench_expr(count=200, dimension=1000):
+    from array import array
+    rng = random.Random(0)
+    us = [Vector([rng.uniform(-10, 10) for _ in range(dimension)]) for _ in range(count)]
+    vs = [Vector([rng.uniform(-10, 10) for _ in range(dimension)]) for _ in range(count)]
+    w = Vector([rng.uniform(-10, 10) for _ in range(dimension)])
+    out = array('d', bytes(8 * dimension))
+    print('lazy vector expressions, {} pairs of dimension {}'.format(count, dimension))
+    cases = [
+        ('u + 2v - w', lambda: [u.add(v.scale(2.)).subtract(w) for u, v in zip(us, vs)],
+         lambda: [(u + 2. * v - w).evaluate() for u, v in zip(us, vs)],
+         lambda: [(u + 2. * v - w).evaluate(out=out) for u, v in zip(us, vs)]),
+        # fresh Vectors, so normalize() is not served from the cache
+        ('component_orthogonal_to', lambda: [u.component_orthogonal_to(Vector(v.coordinates)) for u, v in zip(us, vs)],
+         lambda: [(u - (u @ v) / (v @ v) * v).evaluate() for u, v in zip(us, vs)],
+         lambda: [(u - (u @ v) / (v @ v) * v).evaluate(out=out) for u, v in zip(us, vs)]),
+    ]
+    for name, eager, fused, into in cases:
+        print('  {:<24} methods {:.3f}s, fused {:.3f}s, fused with out= {:.3f}s'.format(
+            name + ':', best_of(eager), best_of(fused), best_of(into)))
+
+
+def bench_angleindex(count=20000, dimension=16, num_queries=20, k=10):
+    from angleindex import AngleIndex, LSH
+    rng = random.Random(0)
+    vectors = [Vector([rng.gauss(0, 1) for _ in range(dimension)]) for _ in range(count)]
+    queries = [Vector([rng.gauss(0, 1) for _ in range(dimension)]) for _ in range(num_queries)]
+    print('top {} by angle, {} vectors of dimension {}, {} queries'.format(k, count, dimension, num_queries))
+    start = timer()
+    for q in queries:
+        # fresh Vectors, so every comparison normalizes both sides as before
+        sorted(range(count), key=lambda i: Vector(q.coordinates).angle_with(Vector(vectors[i].coordinates)))[:k]
+    print('  angle_with scan: {:.4f}s per query'.format((timer() - start) / num_queries))
+    for backend in ('exact', LSH):
+        start = timer()
+        index = AngleIndex.from_vectors(vectors, backend=backend)
+        built = timer() - start
+        recall = index.recall(queries, k)
+        metrics = index.metrics()
+        print('  {:<6} build {:.3f}s, p50 {:.4f}s, p99 {:.4f}s per query, {:.0f} candidates, recall {:.3f}'.format(
+            backend + ':', built, metrics['latency_p50'], metrics['latency_p99'],
+            metrics['mean_candidates'], recall))
+
+
+def bench_grouping(count=300, copies=3):
+    from plane import Plane
+    from grouping import group_parallel, group_coincident
+    rng = random.Random(0)
+    planes = []
+    for _ in range(count // copies):
+        p = Plane(Vector([rng.uniform(-5, 5) for _ in range(3)]), rng.uniform(-5, 5))
+        for _ in range(copies):
+            c = rng.choice([-1, 1]) * rng.uniform(0.5, 3)
+            planes.append(Plane(p.normal_vector.scale(c), p.constant_term * c))
+    rng.shuffle(planes)
+
+    def pairwise(same):
+        groups = []
+        for p in planes:
+            for group in groups:
+                if same(group[0], p):
+                    group.append(p)
+                    break
+            else:
+                groups.append([p])
+        return groups
+
+    print('grouping {} planes, {} copies of each'.format(count, copies))
+    print('  parallel:   pairwise {:.3f}s, hashed {:.4f}s'.format(
+        best_of(lambda: pairwise(lambda a, b: a.is_parallel_to(b)), 1), best_of(lambda: group_parallel(planes))))
+    print('  coincident: pairwise {:.3f}s, hashed {:.4f}s'.format(
+        best_of(lambda: pairwise(lambda a, b: a == b), 1), best_of(lambda: group_coincident(planes))))
+
+
+BENCHMARKS = {
+    'copy': bench_copy,
+    'blocked': bench_blocked,
+    'outofcore': bench_outofcore,
+    'storage': bench_storage,
+    'textio': bench_textio,
+    'many': bench_many,
+    'service': bench_service,
+    'refine': bench_refine,
+    'vector': bench_vector,
+    'vectorbatch': bench_vectorbatch,
+    'expr': bench_expr,
+    'angleindex': bench_angleindex,
+    'grouping': bench_grouping,
+}
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or sorted(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
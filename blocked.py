@@ -0,0 +1,178 @@
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait
+from multiprocessing import shared_memory
+from lu import LUFactorization
+import procpool
+
+ZERO_TOLERANCE = 1e-10
+DEFAULT_BLOCK_SIZE = 64
+
+UNKNOWN_EXECUTOR_MSG = "The executor should be 'thread' or 'process'"
+
+
+def _update_rows(a, n, k0, k1, start, end):
+    # A22 -= L21 U12 for rows start..end-1 of the trailing matrix. Each row is
+    # pulled out once, updated by every row of the panel's U12, then written back.
+    u_rows = [a[k * n + k1:k * n + n] for k in range(k0, k1)]
+    for i in range(start, end):
+        base = i * n
+        multipliers = a[base + k0:base + k1]
+        row = a[base + k1:base + n]
+        for l, u in zip(multipliers, u_rows):
+            if l != 0.:
+                row = [x - l * y for x, y in zip(row, u)]
+        a[base + k1:base + n] = array('d', row)
+
+
+def _update_tile_shared(name, n, k0, k1, start, end):
+    # process pool entry point: attach to the shared buffer by name
+    shm = shared_memory.SharedMemory(name=name)
+    a = shm.buf.cast('d')
+    try:
+        _update_rows(a, n, k0, k1, start, end)
+    finally:
+        a.release()
+        shm.close()
+
+
+def _factor_panel(a, n, k0, k1, perm):
+    # unblocked LU with partial pivoting on columns k0..k1-1; swaps move
+    # whole rows so the parts left and right of the panel follow along
+    for k in range(k0, k1):
+        pivot_row = k
+        pivot_val = abs(a[k * n + k])
+        for i in range(k + 1, n):
+            val = abs(a[i * n + k])
+            if val > pivot_val:
+                pivot_row = i
+                pivot_val = val
+        if pivot_val < ZERO_TOLERANCE:
+            raise Exception(LUFactorization.MATRIX_IS_SINGULAR_MSG)
+        if pivot_row != k:
+            p = pivot_row * n
+            q = k * n
+            temp = array('d', a[p:p + n])
+            a[p:p + n] = array('d', a[q:q + n])
+            a[q:q + n] = temp
+            perm[k], perm[pivot_row] = perm[pivot_row], perm[k]
+
+        pivot = a[k * n + k]
+        pivot_tail = a[k * n + k + 1:k * n + k1]
+        for i in range(k + 1, n):
+            start = i * n
+            coeff = a[start + k]
+            if coeff == 0.:
+                continue
+            multiplier = coeff / pivot
+            a[start + k] = multiplier
+            a[start + k + 1:start + k1] = array('d', [y - multiplier * x for x, y in
+                                                      zip(pivot_tail, a[start + k + 1:start + k1])])
+
+
+def _solve_u12(a, n, k0, k1):
+    # U12 = L11^-1 A12, where L11 is the unit lower triangle of the panel
+    for k in range(k0, k1):
+        u = a[k * n + k1:k * n + n]
+        for i in range(k + 1, k1):
+            l = a[i * n + k]
+            if l != 0.:
+                a[i * n + k1:i * n + n] = array('d', [x - l * y for x, y in zip(a[i * n + k1:i * n + n], u)])
+
+
+def blocked_lu(coefficients, dimension, block_size=DEFAULT_BLOCK_SIZE, workers=1, executor='thread'):
+    # right-looking blocked LU with partial pivoting. Each step factors a
+    # panel of block_size columns, then updates the trailing matrix as one
+    # matrix-matrix product split into row tiles across a pool.
+    # executor='process' keeps the matrix in shared memory so the tiles run
+    # on separate cores, in the process pool shared with the other solvers;
+    # 'thread' avoids the setup cost but shares the GIL. With workers=None
+    # small matrices are factored without a pool.
+    n = dimension
+    if len(coefficients) != n * n:
+        raise Exception(LUFactorization.MATRIX_MUST_BE_SQUARE_MSG)
+    if executor not in ('thread', 'process'):
+        raise Exception(UNKNOWN_EXECUTOR_MSG)
+    if workers is None:
+        parallel = procpool.elimination_work(n, n) >= procpool.MIN_PARALLEL_WORK
+        workers = procpool.default_workers() if parallel else 1
+    perm = list(range(n))
+
+    shm = None
+    pool = None
+    if workers > 1 and executor == 'process':
+        shm = shared_memory.SharedMemory(create=True, size=max(8, 8 * n * n))
+        a = shm.buf.cast('d')
+        a[:n * n] = array('d', coefficients)
+    else:
+        a = array('d', coefficients)
+        if workers > 1:
+            pool = ThreadPoolExecutor(max_workers=workers)
+
+    futures = []
+    try:
+        for k0 in range(0, n, block_size):
+            k1 = min(k0 + block_size, n)
+            _factor_panel(a, n, k0, k1, perm)
+            if k1 == n:
+                break
+            _solve_u12(a, n, k0, k1)
+
+            remaining = n - k1
+            if workers <= 1:
+                _update_rows(a, n, k0, k1, k1, n)
+                continue
+            tile = -(-remaining // workers)
+            futures = []
+            for start in range(k1, n, tile):
+                end = min(start + tile, n)
+                if shm is not None:
+                    futures.append(procpool.submit(workers, _update_tile_shared, shm.name, n, k0, k1, start, end))
+                else:
+                    futures.append(pool.submit(_update_rows, a, n, k0, k1, start, end))
+            for f in futures:
+                f.result()
+
+        lu = array('d', a[:n * n])
+    finally:
+        if shm is None:
+            if pool is not None:
+                pool.shutdown()
+        else:
+            # the pool outlives this call, so tiles still running after an
+            # error have to finish before the buffer goes away
+            wait(futures)
+            a.release()
+            try:
+                shm.close()
+            except BufferError:
+                # slices of the buffer are still held by a propagating traceback
+                pass
+            shm.unlink()
+
+    return LUFactorization.from_factors(lu, perm, n)
+
+
+if __name__ == '__main__':
+    import random
+
+    rng = random.Random(0)
+    n = 37
+    a = array('d', [rng.uniform(-1, 1) for _ in range(n * n)])
+    b = [rng.uniform(-1, 1) for _ in range(n)]
+    reference = LUFactorization(a, n)
+    expected = reference.solve(b)
+
+    for case, options in enumerate([{'block_size': 8},
+                                     {'block_size': 5, 'workers': 3},
+                                     {'block_size': 64},
+                                     {'block_size': 8, 'workers': 2, 'executor': 'process'}]):
+        f = blocked_lu(a, n, **options)
+        if not (f.perm == reference.perm and
+                all(abs(x - y) < 1e-9 for x, y in zip(f.solve(b), expected))):
+            print('test case {} failed'.format(case + 1))
+
+    # the process pool is shared and stays up between factorizations
+    pool = procpool.get_pool(2)
+    blocked_lu(a, n, 8, 2, 'process')
+    if procpool.get_pool(2) is not pool:
+        print('test case 5 failed')
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from fractions import Fraction
+from exact import to_fraction
+from parametrization import Parametrization
+
+ZERO_TOLERANCE = 1e-10
+DEFAULT_MAXSIZE = 128
+
+
+def canonical_key(planes, dimension, exact=False):
+    # each equation is scaled so its first nonzero coefficient is 1, then the
+    # equations are sorted; scaled or reordered copies of a system get the
+    # same key. Nothing is rounded, since systems that differ only in the
+    # last digits can have very different solutions. With exact=True the
+    # scaling is done in Fractions read like find_exact_solutions reads them.
+    rows = []
+    for p in planes:
+        coordinates = p.normal_vector.coordinates
+        constant_term = p.constant_term
+        if exact:
+            coordinates = [to_fraction(x) for x in coordinates]
+            constant_term = to_fraction(constant_term)
+        scale = None
+        for x in coordinates:
+            if abs(x) >= ZERO_TOLERANCE:
+                scale = x
+                break
+        if scale is None:
+            # 0 = 0 or 0 = c, which only matters as consistent or not
+            constant = 0. if abs(constant_term) < ZERO_TOLERANCE else 1.
+            rows.append((0.,) * dimension + (constant,))
+        else:
+            rows.append(tuple([x / scale for x in coordinates]) + (constant_term / scale,))
+    rows.sort()
+    return (dimension, tuple(rows))
+
+
+def _copy(value):
+    # callers get their own copy, so changing a result can't change the cache
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, Parametrization):
+        return Parametrization(value.basepoint, list(value.direction_vectors))
+    if hasattr(value, 'copy'):
+        return value.copy()
+    return value
+
+
+class SolutionCache(object):
+    # LRU memo of results keyed on canonical_key; share one between systems
+    # by setting LinearSystem.solution_cache
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def key(self, planes, dimension, exact=False):
+        return canonical_key(planes, dimension, exact)
+
+    def lookup(self, key, compute):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _copy(self._entries[key])
+
+        self.misses += 1
+        value = compute()
+        self._entries[key] = _copy(value)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __str__(self):
+        return 'SolutionCache: {} entries of {}, {} hits, {} misses, {} evictions'.format(
+            len(self), self.maxsize, self.hits, self.misses, self.evictions)
+
+
+if __name__ == '__main__':
+    from vector import Vector
+    from plane import Plane
+
+    p1 = Plane(normal_vector=Vector([0,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,-1,1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1,2,-5]), constant_term=3)
+    scaled = [Plane(normal_vector=Vector([-3,3,-3]), constant_term=-6),
+              Plane(normal_vector=Vector([3,6,-15]), constant_term=9),
+              Plane(normal_vector=Vector([0,0.1,0.1]), constant_term=0.1)]
+    if canonical_key([p1,p2,p3], 3) != canonical_key(scaled, 3):
+        print('test case 1 failed')
+    if canonical_key([p1,p2,p3], 3) == canonical_key([p1,p2,p2], 3):
+        print('test case 2 failed')
+
+    cache = SolutionCache(maxsize=2)
+    calls = []
+    def compute(value):
+        calls.append(value)
+        return [value]
+    cache.lookup('a', lambda: compute(1))
+    cache.lookup('b', lambda: compute(2))
+    result = cache.lookup('a', lambda: compute(3))
+    result.append(4)
+    cache.lookup('c', lambda: compute(5))
+    if not (calls == [1, 2, 5] and cache.lookup('a', lambda: compute(6)) == [1] and
+            cache.hits == 2 and cache.misses == 3 and cache.evictions == 1 and len(cache) == 2):
+        print('test case 3 failed')
+    if cache.lookup('b', lambda: compute(7)) != [7]:
+        print('test case 4 failed')
+
+    from linsys import LinearSystem
+    LinearSystem.solution_cache = SolutionCache()
+    s = LinearSystem([p1,p2,p3])
+    x = s.find_solutions()
+    y = LinearSystem(list(reversed(scaled))).find_solutions()
+    if not (x == y and LinearSystem.solution_cache.hits == 1 and LinearSystem.solution_cache.misses == 2):
+        print('test case 5 failed')
+
+    # a row operation changes the key, so the old entry is not returned
+    s.multiply_coefficient_and_row(2, 0)
+    s[2] = Plane(normal_vector=Vector([1,2,-5]), constant_term=4)
+    if s.find_solutions() == x:
+        print('test case 6 failed')
+
+    r = s.compute_rref()
+    r.swap_rows(0, 1)
+    if not (s.compute_rref()[0] == Plane(normal_vector=Vector([1,0,0]), constant_term=r[1].constant_term) and
+            s.compute_rref(inplace=True) is s):
+        print('test case 7 failed')
+
+    # nearly equal systems must not share an entry
+    LinearSystem.solution_cache = SolutionCache()
+    LinearSystem([Plane(Vector([1,0]), 1), Plane(Vector([0,1]), 1)]).find_solutions(exact=True)
+    x = LinearSystem([Plane(Vector([1,0]), 1 + 1e-12), Plane(Vector([0,1]), 1)]).find_solutions(exact=True)
+    if x[0] != Fraction(1000000000001, 1000000000000):
+        print('test case 8 failed')
+
+    near = [Plane(Vector([1,1]), 2), Plane(Vector([1,1+1e-10]), 2)]
+    shifted = [Plane(Vector([1,1]), 2), Plane(Vector([1,1+1e-10]), 2+1e-10)]
+    LinearSystem(near).find_solutions()
+    cached = LinearSystem(shifted).find_solutions()
+    LinearSystem.solution_cache = None
+    if cached != LinearSystem(shifted).find_solutions():
+        print('test case 9 failed')
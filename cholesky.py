@@ -0,0 +1,121 @@
+from array import array
+from math import sqrt
+from lu import LUFactorization
+
+ZERO_TOLERANCE = 1e-10
+
+
+class CholeskyFactorization(object):
+    # A = L L^T for symmetric positive-definite A, with L stored row-major.
+    # Only the lower triangle of A is read.
+
+    MATRIX_MUST_BE_SQUARE_MSG = 'Only square systems can be factorized'
+    NOT_POSITIVE_DEFINITE_MSG = 'Matrix is not positive definite'
+    RHS_DIMENSION_MISMATCH_MSG = 'The right-hand side does not match the size of the system'
+
+    def __init__(self, coefficients, dimension):
+        if len(coefficients) != dimension * dimension:
+            raise Exception(self.MATRIX_MUST_BE_SQUARE_MSG)
+        self.dimension = dimension
+        self.lower = array('d', bytes(8 * dimension * dimension))
+        self._factor(coefficients)
+
+    @classmethod
+    def from_factors(cls, lower, dimension):
+        # wraps a factor computed or stored elsewhere
+        factorization = cls.__new__(cls)
+        factorization.dimension = dimension
+        factorization.lower = lower
+        return factorization
+
+    def _factor(self, a):
+        n = self.dimension
+        L = self.lower
+        for i in range(n):
+            row_i = L[i * n:i * n + i]
+            for j in range(i + 1):
+                s = a[i * n + j] - sum([x * y for x, y in zip(row_i[:j], L[j * n:j * n + j])])
+                if i == j:
+                    if s <= ZERO_TOLERANCE:
+                        raise Exception(self.NOT_POSITIVE_DEFINITE_MSG)
+                    L[i * n + i] = sqrt(s)
+                else:
+                    value = s / L[j * n + j]
+                    L[i * n + j] = value
+                    row_i[j] = value
+
+    def solve(self, b):
+        n = self.dimension
+        if len(b) != n:
+            raise Exception(self.RHS_DIMENSION_MISMATCH_MSG)
+        L = self.lower
+
+        # L y = b
+        y = [0.] * n
+        for i in range(n):
+            start = i * n
+            y[i] = (b[i] - sum([l * v for l, v in zip(L[start:start + i], y)])) / L[start + i]
+
+        # L^T x = y, walking down the columns of L
+        x = [0.] * n
+        for i in range(n - 1, -1, -1):
+            s = sum([L[k * n + i] * x[k] for k in range(i + 1, n)])
+            x[i] = (y[i] - s) / L[i * n + i]
+        return x
+
+    def solve_many(self, B):
+        return [self.solve(b) for b in B]
+
+
+def is_symmetric(coefficients, dimension):
+    n = dimension
+    for i in range(n):
+        for j in range(i):
+            if abs(coefficients[i * n + j] - coefficients[j * n + i]) >= ZERO_TOLERANCE:
+                return False
+    return True
+
+
+def factorize(coefficients, dimension, assume_spd=False):
+    # Cholesky for symmetric matrices, which needs about half the flops of LU
+    # and no pivoting; LU if that fails. Cholesky only reads the lower
+    # triangle, so symmetry is always checked: a matrix declared SPD with
+    # assume_spd=True that is not symmetric is factored by LU, and the
+    # result never depends on the hint.
+    if is_symmetric(coefficients, dimension):
+        try:
+            return CholeskyFactorization(coefficients, dimension)
+        except Exception as e:
+            if str(e) != CholeskyFactorization.NOT_POSITIVE_DEFINITE_MSG:
+                raise e
+    return LUFactorization(coefficients, dimension)
+
+
+if __name__ == '__main__':
+    a = array('d', [4, 12, -16,
+                    12, 37, -43,
+                    -16, -43, 98])
+    f = factorize(a, 3)
+    if not (isinstance(f, CholeskyFactorization) and
+            list(f.lower) == [2, 0, 0, 6, 1, 0, -8, 5, 3]):
+        print('test case 1 failed')
+
+    x = f.solve([1, 2, 3])
+    lu_x = LUFactorization(a, 3).solve([1, 2, 3])
+    if not all(abs(u - v) < 1e-8 for u, v in zip(x, lu_x)):
+        print('test case 2 failed')
+
+    # symmetric but indefinite falls back to LU
+    f = factorize(array('d', [1, 2, 2, 1]), 2)
+    if not (isinstance(f, LUFactorization) and
+            all(abs(u - v) < 1e-10 for u, v in zip(f.solve([3, 3]), [1, 1]))):
+        print('test case 3 failed')
+
+    if not isinstance(factorize(array('d', [2, 1, 0, 2]), 2), LUFactorization):
+        print('test case 4 failed')
+
+    # declared SPD, but the upper triangle disagrees with the lower one
+    f = factorize(array('d', [4, 1, 3, 3]), 2, assume_spd=True)
+    if not (isinstance(f, LUFactorization) and
+            all(abs(u - v) < 1e-10 for u, v in zip(f.solve([1, 2]), [1 / 9, 5 / 9]))):
+        print('test case 5 failed')
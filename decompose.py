@@ -0,0 +1,178 @@
+from vector import Vector
+from parametrization import Parametrization
+from dense import DenseSystem
+import procpool
+
+ZERO_TOLERANCE = 1e-10
+NO_SOLUTIONS_MSG = 'No solutions'
+
+
+class Component(object):
+    # a group of equations and the variables they involve, as indices in
+    # their original order
+
+    def __init__(self, equations, variables):
+        self.equations = equations
+        self.variables = variables
+
+
+def _find(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def connected_components(system):
+    # components of the variable-equation incidence graph, plus the indices
+    # of equations with no nonzero coefficient at all
+    dimension = system.dimension
+    parent = list(range(dimension))
+    used = [False] * dimension
+    rows = []
+    empty = []
+    for i in range(len(system)):
+        cols = [c for c, v in system.row_entries(i) if abs(v) >= ZERO_TOLERANCE]
+        rows.append(cols)
+        if not cols:
+            empty.append(i)
+            continue
+        root = _find(parent, cols[0])
+        for c in cols:
+            used[c] = True
+            other = _find(parent, c)
+            if other != root:
+                parent[other] = root
+
+    by_root = {}
+    for c in range(dimension):
+        if used[c]:
+            by_root.setdefault(_find(parent, c), Component([], [])).variables.append(c)
+    for i, cols in enumerate(rows):
+        if cols:
+            by_root[_find(parent, cols[0])].equations.append(i)
+
+    components = sorted(by_root.values(), key=lambda comp: comp.variables[0])
+    return components, empty
+
+
+def _solve_component(task):
+    # runs in a worker process; takes and returns plain lists so nothing but
+    # numbers crosses the process boundary
+    coefficients, constants = task
+    rref = DenseSystem.from_rows(coefficients, constants).compute_rref(inplace=True)
+    result = rref.solutions_from_rref()
+    if isinstance(result, Parametrization):
+        pivots = rref.indices_of_first_nonzero_terms_in_each_row()
+        free_indices = sorted(set(range(rref.dimension)) - set(pivots))
+        return (list(result.basepoint.coordinates),
+                [list(v.coordinates) for v in result.direction_vectors],
+                free_indices)
+    return result
+
+
+def solve_decomposed(system, workers=None):
+    # solves each connected component on its own, in a shared process pool
+    # when there is more than one component and more than one worker, and
+    # stitches the results back into the original variable order. With
+    # workers=None small systems are solved in this process.
+    if not hasattr(system, 'row_entries'):
+        system = system.to_sparse()
+    dimension = system.dimension
+    constants = system.right_hand_side()
+    components, empty = connected_components(system)
+
+    for i in empty:
+        if abs(constants[i]) >= ZERO_TOLERANCE:
+            return NO_SOLUTIONS_MSG
+
+    tasks = []
+    for comp in components:
+        position = {c: k for k, c in enumerate(comp.variables)}
+        coefficients = []
+        for i in comp.equations:
+            row = [0.] * len(comp.variables)
+            for c, v in system.row_entries(i):
+                if c in position:
+                    row[position[c]] = v
+            coefficients.append(row)
+        tasks.append((coefficients, [constants[i] for i in comp.equations]))
+
+    if workers is None:
+        work = sum([procpool.elimination_work(len(comp.equations), len(comp.variables))
+                    for comp in components])
+        workers = procpool.default_workers() if work >= procpool.MIN_PARALLEL_WORK else 1
+    if workers > 1 and len(tasks) > 1:
+        chunksize = max(1, len(tasks) // (4 * workers))
+        results = list(procpool.map_tasks(workers, _solve_component, tasks, chunksize))
+    else:
+        results = [_solve_component(task) for task in tasks]
+
+    basepoint = [0] * dimension
+    direction_vectors = []
+    constrained = [False] * dimension
+    for comp, result in zip(components, results):
+        if result == NO_SOLUTIONS_MSG:
+            return NO_SOLUTIONS_MSG
+        if isinstance(result, tuple):
+            sub_basepoint, sub_directions, sub_free = result
+        else:
+            sub_basepoint, sub_directions, sub_free = result, [], []
+        for c, x in zip(comp.variables, sub_basepoint):
+            basepoint[c] = x
+            constrained[c] = True
+        for free, sub_direction in zip(sub_free, sub_directions):
+            direction = [0] * dimension
+            for c, x in zip(comp.variables, sub_direction):
+                direction[c] = x
+            direction_vectors.append((comp.variables[free], direction))
+
+    # variables that appear in no equation are free
+    for c in range(dimension):
+        if not constrained[c]:
+            direction = [0] * dimension
+            direction[c] = 1
+            direction_vectors.append((c, direction))
+
+    if not direction_vectors:
+        return basepoint
+    # order the directions by their free variable, as a single RREF would
+    direction_vectors.sort()
+    return Parametrization(Vector(basepoint), [Vector(v) for free, v in direction_vectors])
+
+
+if __name__ == '__main__':
+    from sparse import SparseLinearSystem
+
+    # x_1 + x_3 = 2, x_2 = 3, x_1 - x_3 = 0, x_4 free
+    s = SparseLinearSystem([{0: 1., 2: 1.}, {1: 1.}, {0: 1., 2: -1.}], [2., 3., 0.], 4)
+    components, empty = connected_components(s)
+    if not ([c.variables for c in components] == [[0, 2], [1]] and
+            [c.equations for c in components] == [[0, 2], [1]] and empty == []):
+        print('test case 1 failed')
+
+    for workers in [1, 2]:
+        param = solve_decomposed(s, workers=workers)
+        if not (param.basepoint == Vector([1, 3, 1, 0]) and
+                param.direction_vectors == [Vector([0, 0, 0, 1])]):
+            print('test case 2 failed')
+
+    s = SparseLinearSystem([{0: 1.}, {1: 1.}, {}], [1., 2., 0.], 2)
+    if solve_decomposed(s, workers=1) != [1., 2.]:
+        print('test case 3 failed')
+
+    s = SparseLinearSystem([{0: 1.}, {1: 1.}, {1: 2.}], [1., 2., 5.], 2)
+    if solve_decomposed(s, workers=2) != NO_SOLUTIONS_MSG:
+        print('test case 4 failed')
+
+    # later calls reuse the pool; small systems never start one
+    pool = procpool.get_pool(2)
+    solve_decomposed(s, workers=2)
+    if procpool.get_pool(2) is not pool:
+        print('test case 5 failed')
+    for pool in procpool._pools.values():
+        pool.shutdown()
+    procpool._pools.clear()
+    s = SparseLinearSystem([{0: 1.}, {1: 1.}], [1., 2.], 2)
+    if solve_decomposed(s) != [1., 2.] or procpool._pools:
+        print('test case 6 failed')
@@ -0,0 +1,300 @@
+from array import array
+from vector import Vector
+from plane import Plane
+from parametrization import Parametrization
+from lu import LUFactorization
+import cholesky
+import blocked
+
+ZERO_TOLERANCE = 1e-10
+
+
+class DenseSystem(object):
+    # augmented matrix [A|b] stored row-major in a single float64 buffer
+
+    ALL_ROWS_MUST_BE_IN_SAME_DIM_MSG = 'All rows in the system should live in the same dimension'
+    BUFFER_SIZE_MISMATCH_MSG = 'The buffer size does not match the shape of the system'
+    NO_SOLUTIONS_MSG = 'No solutions'
+    INF_SOLUTIONS_MSG = 'Infinitely many solutions'
+
+    def __init__(self, num_equations, dimension, buffer=None):
+        self.num_equations = num_equations
+        self.dimension = dimension
+        self.width = dimension + 1
+
+        if buffer is None:
+            buffer = array('d', bytes(8 * num_equations * self.width))
+        elif len(buffer) != num_equations * self.width:
+            raise Exception(self.BUFFER_SIZE_MISMATCH_MSG)
+        self.buffer = buffer
+
+    @classmethod
+    def from_planes(cls, planes):
+        d = planes[0].dimension
+        buffer = array('d')
+        for p in planes:
+            if p.dimension != d:
+                raise Exception(cls.ALL_ROWS_MUST_BE_IN_SAME_DIM_MSG)
+            buffer.extend(p.normal_vector.coordinates)
+            buffer.append(p.constant_term)
+        return cls(len(planes), d, buffer)
+
+    @classmethod
+    def from_rows(cls, coefficients, constants):
+        d = len(coefficients[0])
+        buffer = array('d')
+        for row, c in zip(coefficients, constants):
+            if len(row) != d:
+                raise Exception(cls.ALL_ROWS_MUST_BE_IN_SAME_DIM_MSG)
+            buffer.extend(row)
+            buffer.append(c)
+        return cls(len(coefficients), d, buffer)
+
+    def copy(self):
+        return DenseSystem(self.num_equations, self.dimension, array('d', self.buffer))
+
+    def coefficients(self, row):
+        start = row * self.width
+        return self.buffer[start:start + self.dimension]
+
+    def constant_term(self, row):
+        return self.buffer[row * self.width + self.dimension]
+
+    def right_hand_side(self):
+        return list(self.buffer[self.dimension::self.width])
+
+    def row_entries(self, row):
+        start = row * self.width
+        return [(j, v) for j, v in enumerate(self.buffer[start:start + self.dimension]) if v != 0.]
+
+    def diagonal(self):
+        w = self.width
+        return [self.buffer[i * w + i] for i in range(min(self.num_equations, self.dimension))]
+
+    def matvec(self, x):
+        buf = self.buffer
+        w = self.width
+        n = self.dimension
+        return [sum([a * b for a, b in zip(buf[i * w:i * w + n], x)]) for i in range(self.num_equations)]
+
+    def to_planes(self):
+        return [self[i] for i in range(self.num_equations)]
+
+    @property
+    def planes(self):
+        return self.to_planes()
+
+
+    def swap_rows(self, row1, row2):
+        if row1 == row2:
+            return
+        w = self.width
+        buf = self.buffer
+        a = row1 * w
+        b = row2 * w
+        # copied, since slicing a memoryview buffer gives a view
+        temp = array('d', buf[a:a + w])
+        buf[a:a + w] = buf[b:b + w]
+        buf[b:b + w] = temp
+
+    def multiply_coefficient_and_row(self, coefficient, row, start=0):
+        w = self.width
+        buf = self.buffer
+        a = row * w
+        buf[a + start:a + w] = array('d', [x * coefficient for x in buf[a + start:a + w]])
+
+    def add_multiple_times_row_to_row(self, coefficient, row_to_add, row_to_be_added_to, start=0):
+        # columns before start are known to be zero in row_to_add and can be skipped
+        w = self.width
+        buf = self.buffer
+        a = row_to_add * w
+        b = row_to_be_added_to * w
+        buf[b + start:b + w] = array('d', [y + coefficient * x for x, y in
+                                           zip(buf[a + start:a + w], buf[b + start:b + w])])
+
+    def compute_triangular_form(self, inplace=False):
+        system = self if inplace else self.copy()
+        buf = system.buffer
+        w = system.width
+        num_eq = system.num_equations
+        num_var = system.dimension
+
+        row = 0
+        for col in range(num_var):
+            if row >= num_eq:
+                break
+
+            # pick the largest coefficient in the column as the pivot
+            pivot_row = row
+            pivot_val = abs(buf[row * w + col])
+            for i in range(row + 1, num_eq):
+                val = abs(buf[i * w + col])
+                if val > pivot_val:
+                    pivot_row = i
+                    pivot_val = val
+            if pivot_val < ZERO_TOLERANCE:
+                continue
+
+            system.swap_rows(pivot_row, row)
+            pivot = buf[row * w + col]
+            for i in range(row + 1, num_eq):
+                coeff = buf[i * w + col]
+                if abs(coeff) >= ZERO_TOLERANCE:
+                    system.add_multiple_times_row_to_row(-coeff / pivot, row, i, col)
+                buf[i * w + col] = 0.
+            row += 1
+        return system
+
+    def compute_rref(self, inplace=False):
+        system = self.compute_triangular_form(inplace)
+        buf = system.buffer
+        w = system.width
+
+        for i, j in enumerate(system.indices_of_first_nonzero_terms_in_each_row()):
+            if j == -1:
+                continue
+            system.multiply_coefficient_and_row(1. / buf[i * w + j], i, j)
+            buf[i * w + j] = 1.
+            for k in range(i):
+                coeff = buf[k * w + j]
+                if abs(coeff) >= ZERO_TOLERANCE:
+                    system.add_multiple_times_row_to_row(-coeff, i, k, j)
+                buf[k * w + j] = 0.
+        return system
+
+    def factorize(self, assume_spd=False):
+        if self.num_equations != self.dimension:
+            raise Exception(LUFactorization.MATRIX_MUST_BE_SQUARE_MSG)
+        coefficients = array('d')
+        for i in range(self.num_equations):
+            coefficients.extend(self.coefficients(i))
+        return cholesky.factorize(coefficients, self.dimension, assume_spd)
+
+    def factorize_blocked(self, block_size=blocked.DEFAULT_BLOCK_SIZE, workers=1, executor='thread'):
+        # LU through the blocked, tiled engine; see blocked.blocked_lu
+        if self.num_equations != self.dimension:
+            raise Exception(LUFactorization.MATRIX_MUST_BE_SQUARE_MSG)
+        coefficients = array('d')
+        for i in range(self.num_equations):
+            coefficients.extend(self.coefficients(i))
+        return blocked.blocked_lu(coefficients, self.dimension, block_size, workers, executor)
+
+    def find_solutions(self):
+        return self.compute_rref().solutions_from_rref()
+
+    def solutions_from_rref(self):
+        pivot_indices = self.indices_of_first_nonzero_terms_in_each_row()
+
+        for i, j in enumerate(pivot_indices):
+            if j == -1 and abs(self.constant_term(i)) >= ZERO_TOLERANCE:
+                return self.NO_SOLUTIONS_MSG
+
+        if len([j for j in pivot_indices if j != -1]) != self.dimension:
+            return self.paramatrize_infinite_solutions(pivot_indices)
+
+        solution = [0] * self.dimension
+        for i, j in enumerate(pivot_indices):
+            if j != -1:
+                solution[j] = self.constant_term(i)
+        return solution
+
+    def paramatrize_infinite_solutions(self, pivot_indices=None):
+        if pivot_indices is None:
+            pivot_indices = self.indices_of_first_nonzero_terms_in_each_row()
+        dimension = self.dimension
+        buf = self.buffer
+        w = self.width
+        free_indices = sorted(set(range(dimension)) - set(pivot_indices))
+
+        basepoint = [0] * dimension
+        for i, j in enumerate(pivot_indices):
+            if j != -1:
+                basepoint[j] = buf[i * w + dimension]
+
+        direction_vectors = []
+        for free in free_indices:
+            free_vector = [0] * dimension
+            free_vector[free] = 1
+            for i, j in enumerate(pivot_indices):
+                if j != -1:
+                    free_vector[j] = -buf[i * w + free]
+            direction_vectors.append(Vector(free_vector))
+
+        return Parametrization(Vector(basepoint), direction_vectors)
+
+    def indices_of_first_nonzero_terms_in_each_row(self):
+        buf = self.buffer
+        w = self.width
+        indices = [-1] * self.num_equations
+        for i in range(self.num_equations):
+            start = i * w
+            for j in range(self.dimension):
+                if abs(buf[start + j]) >= ZERO_TOLERANCE:
+                    indices[i] = j
+                    break
+        return indices
+
+
+    def __len__(self):
+        return self.num_equations
+
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.num_equations
+        if not 0 <= i < self.num_equations:
+            raise IndexError('row index out of range')
+        return Plane(normal_vector=Vector(self.coefficients(i)),
+                     constant_term=self.constant_term(i))
+
+
+    def __setitem__(self, i, x):
+        if x.dimension != self.dimension:
+            raise Exception(self.ALL_ROWS_MUST_BE_IN_SAME_DIM_MSG)
+        start = i * self.width
+        self.buffer[start:start + self.dimension] = array('d', x.normal_vector.coordinates)
+        self.buffer[start + self.dimension] = x.constant_term
+
+
+    def __str__(self):
+        ret = 'Dense Linear System:\n'
+        temp = ['Equation {}: {}'.format(i+1, p) for i, p in enumerate(self.planes)]
+        ret += '\n'.join(temp)
+        return ret
+
+
+if __name__ == '__main__':
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0,1,1]), constant_term=2)
+    s = DenseSystem.from_planes([p1,p2])
+    r = s.compute_rref()
+    if not (r[0] == Plane(normal_vector=Vector([1,0,0]), constant_term=-1) and
+            r[1] == p2):
+        print('test case 1 failed')
+
+    p1 = Plane(normal_vector=Vector([0,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,-1,1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1,2,-5]), constant_term=3)
+    s = DenseSystem.from_planes([p1,p2,p3])
+    x = s.find_solutions()
+    if not all(abs(a - b) < 1e-10 for a, b in zip(x, [23/9, 7/9, 2/9])):
+        print('test case 2 failed')
+
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,1,1]), constant_term=2)
+    s = DenseSystem.from_planes([p1,p2])
+    if s.find_solutions() != DenseSystem.NO_SOLUTIONS_MSG:
+        print('test case 3 failed')
+
+    p1 = Plane(Vector([0.935, 1.76, -9.365]), -9.955)
+    p2 = Plane(Vector([0.187, 0.352, -1.873]), -1.991)
+    p3 = Plane(Vector([0.374, 0.704, -3.746]), -3.982)
+    p4 = Plane(Vector([-0.561, -1.056, 5.619]), 5.973)
+    s = DenseSystem.from_planes([p1,p2,p3,p4])
+    param = s.find_solutions()
+    if not (isinstance(param, Parametrization) and len(param.direction_vectors) == 2):
+        print('test case 4 failed')
+
+    # the original buffer is left untouched unless inplace is requested
+    if not s[0] == p1:
+        print('test case 5 failed')
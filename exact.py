@@ -0,0 +1,154 @@
+from decimal import Decimal
+from fractions import Fraction
+from math import gcd
+from vector import Vector
+from parametrization import Parametrization
+
+NO_SOLUTIONS_MSG = 'No solutions'
+INF_SOLUTIONS_MSG = 'Infinitely many solutions'
+UNSUPPORTED_COEFFICIENT_MSG = 'Exact solving needs int, float, Decimal or Fraction coefficients'
+
+
+def to_fraction(x):
+    if isinstance(x, (int, Fraction)):
+        return Fraction(x)
+    if isinstance(x, float):
+        # read floats the way they are written, so 0.1 is 1/10 rather than
+        # the nearest binary fraction
+        return Fraction(repr(x))
+    if isinstance(x, Decimal):
+        return Fraction(x)
+    raise Exception(UNSUPPORTED_COEFFICIENT_MSG)
+
+
+def to_integer_rows(planes):
+    # scale every augmented row [a | c] by the lcm of its denominators
+    rows = []
+    for p in planes:
+        row = [to_fraction(x) for x in p.normal_vector.coordinates]
+        row.append(to_fraction(p.constant_term))
+        multiple = 1
+        for x in row:
+            multiple = multiple * x.denominator // gcd(multiple, x.denominator)
+        rows.append([int(x * multiple) for x in row])
+    return rows
+
+
+def bareiss_rref(rows, dimension):
+    # fraction-free Gauss-Jordan elimination (Bareiss) on integer rows, in
+    # place. Every division is exact and every entry stays a minor of the
+    # input, so entry sizes grow polynomially. At the end each pivot row has
+    # the same value d on its pivot, i.e. the RREF is rows / d.
+    # Returns the pivot columns (pivot k lives in row k) and d.
+    num_eq = len(rows)
+    previous = 1
+    pivots = []
+    row = 0
+    for col in range(dimension):
+        if row >= num_eq:
+            break
+        pivot_row = -1
+        for i in range(row, num_eq):
+            if rows[i][col] != 0:
+                pivot_row = i
+                break
+        if pivot_row == -1:
+            continue
+        rows[row], rows[pivot_row] = rows[pivot_row], rows[row]
+
+        top = rows[row]
+        pivot = top[col]
+        for i in range(num_eq):
+            if i == row:
+                continue
+            # this also scales the pivots of the rows above from the previous
+            # pivot up to the new one
+            coeff = rows[i][col]
+            rows[i] = [(pivot * x - coeff * y) // previous for x, y in zip(rows[i], top)]
+        previous = pivot
+        pivots.append(col)
+        row += 1
+
+    return pivots, previous
+
+
+def find_exact_solutions(planes):
+    dimension = planes[0].dimension
+    rows = to_integer_rows(planes)
+    pivots, d = bareiss_rref(rows, dimension)
+    rank = len(pivots)
+
+    for r in rows[rank:]:
+        if r[dimension] != 0:
+            return NO_SOLUTIONS_MSG
+
+    if rank != dimension:
+        return parametrize_exact_solutions(rows, pivots, d, dimension)
+
+    solution = [Fraction(0)] * dimension
+    for k, col in enumerate(pivots):
+        solution[col] = Fraction(rows[k][dimension], d)
+    return solution
+
+
+def parametrize_exact_solutions(rows, pivots, d, dimension):
+    free_indices = sorted(set(range(dimension)) - set(pivots))
+
+    basepoint = [Fraction(0)] * dimension
+    for k, col in enumerate(pivots):
+        basepoint[col] = Fraction(rows[k][dimension], d)
+
+    direction_vectors = []
+    for free in free_indices:
+        free_vector = [Fraction(0)] * dimension
+        free_vector[free] = Fraction(1)
+        for k, col in enumerate(pivots):
+            free_vector[col] = Fraction(-rows[k][free], d)
+        direction_vectors.append(Vector(free_vector))
+
+    return Parametrization(Vector(basepoint), direction_vectors)
+
+
+if __name__ == '__main__':
+    import random
+    from plane import Plane
+
+    p1 = Plane(normal_vector=Vector([0,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,-1,1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1,2,-5]), constant_term=3)
+    if find_exact_solutions([p1,p2,p3]) != [Fraction(23, 9), Fraction(7, 9), Fraction(2, 9)]:
+        print('test case 1 failed')
+
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,1,1]), constant_term=2)
+    if find_exact_solutions([p1,p2]) != NO_SOLUTIONS_MSG:
+        print('test case 2 failed')
+
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0,1,1]), constant_term=2)
+    param = find_exact_solutions([p1,p2])
+    if not (param.basepoint == Vector([-1,2,0]) and
+            param.direction_vectors == [Vector([0,-1,1])]):
+        print('test case 3 failed')
+
+    # decimal inputs are read exactly, so the rows are exactly proportional
+    p1 = Plane(Vector([0.1, 0.2, 0.3]), 0.6)
+    p2 = Plane(Vector([0.3, 0.6, 0.9]), 1.8)
+    param = find_exact_solutions([p1,p2])
+    if not (isinstance(param, Parametrization) and len(param.direction_vectors) == 2):
+        print('test case 4 failed')
+
+    # every point of the parametrization solves random rank-deficient systems
+    rng = random.Random(0)
+    for trial in range(20):
+        n = rng.randint(2, 6)
+        base = [[rng.randint(-9, 9) for _ in range(n + 1)] for _ in range(n - 1)]
+        mix = [[rng.randint(-3, 3) for _ in base] for _ in range(2)]
+        rows = base + [[sum(m * b[j] for m, b in zip(mi, base)) for j in range(n + 1)] for mi in mix]
+        planes = [Plane(Vector(r[:n]), r[n]) for r in rows]
+        result = find_exact_solutions(planes)
+        points = [result.basepoint] + [result.basepoint.add(v) for v in result.direction_vectors]
+        if not all(p.normal_vector.inner_product(x) == Fraction(p.constant_term)
+                   for p in planes for x in points):
+            print('test case 5 failed')
+            break
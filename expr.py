@@ -0,0 +1,303 @@
+from array import array
+from collections import OrderedDict
+
+DIMENSIONS_MUST_MATCH_MSG = 'All vectors in an expression should live in the same dimension'
+OUT_SIZE_MISMATCH_MSG = 'The out array does not match the dimension of the expression'
+NOT_A_VECTOR_MSG = 'Only vectors and sequences of numbers can be added or subtracted in an expression'
+
+# generated functions, keyed on the shape of the expression they evaluate,
+# least recently used first; programs that build many different shapes
+# keep only the last MAX_COMPILED
+MAX_COMPILED = 256
+_compiled = OrderedDict()
+
+
+def lazy(v):
+    # a Vector, array or sequence of numbers as the leaf of an expression
+    if isinstance(v, VectorExpr):
+        return v
+    coordinates = getattr(v, 'coordinates', v)
+    if not hasattr(coordinates, '__len__'):
+        # e.g. u + 3.0, which has no meaning for vectors
+        raise Exception(NOT_A_VECTOR_MSG)
+    return Leaf(coordinates)
+
+
+def _as_scalar(c):
+    return c if isinstance(c, ScalarExpr) else Constant(c)
+
+
+class _Names(object):
+    # numbers the leaves and scalars of one expression while it is turned
+    # into source; a vector used twice is read once per element
+
+    def __init__(self):
+        self.leaves = []
+        self.leaf_names = {}
+        self.scalars = []
+
+    def leaf(self, coordinates):
+        key = id(coordinates)
+        if key not in self.leaf_names:
+            self.leaf_names[key] = 'x{}'.format(len(self.leaves))
+            self.leaves.append(coordinates)
+        return self.leaf_names[key]
+
+    def scalar(self, value):
+        self.scalars.append(value)
+        return 's{}'.format(len(self.scalars) - 1)
+
+
+def _function(source, num_leaves, num_scalars, mode):
+    # builds (once per expression shape) a function that runs the whole
+    # expression in one pass over the coordinates
+    key = (source, num_leaves, num_scalars, mode)
+    if key in _compiled:
+        _compiled.move_to_end(key)
+    else:
+        names = ['x{}'.format(i) for i in range(num_leaves)]
+        columns = ['c{}'.format(i) for i in range(num_leaves)]
+        scalars = ['s{}'.format(i) for i in range(num_scalars)]
+        target = names[0] if num_leaves == 1 else ', '.join(names)
+        iterable = columns[0] if num_leaves == 1 else 'zip({})'.format(', '.join(columns))
+        args = ', '.join(columns + scalars)
+        if mode == 'list':
+            code = 'def f({}):\n    return [{} for {} in {}]\n'.format(args, source, target, iterable)
+        elif mode == 'sum':
+            code = 'def f({}):\n    return sum([{} for {} in {}])\n'.format(args, source, target, iterable)
+        else:
+            code = ('def f(out, {}):\n'
+                    '    i = 0\n'
+                    '    for {} in {}:\n'
+                    '        out[i] = {}\n'
+                    '        i += 1\n').format(args, target, iterable, source)
+        namespace = {}
+        exec(code, namespace)
+        _compiled[key] = namespace['f']
+        if len(_compiled) > MAX_COMPILED:
+            _compiled.popitem(last=False)
+    return _compiled[key]
+
+
+def _run(source, names, mode, out=None):
+    dimension = len(names.leaves[0])
+    for coordinates in names.leaves:
+        if len(coordinates) != dimension:
+            raise Exception(DIMENSIONS_MUST_MATCH_MSG)
+    f = _function(source, len(names.leaves), len(names.scalars), mode)
+    if mode == 'out':
+        if len(out) != dimension:
+            raise Exception(OUT_SIZE_MISMATCH_MSG)
+        f(out, *(names.leaves + names.scalars))
+        return out
+    return f(*(names.leaves + names.scalars))
+
+
+class VectorExpr(object):
+    # a lazy vector-valued expression. Nothing is computed until evaluate(),
+    # which runs the whole tree in one fused pass, reading every leaf once
+    # per coordinate and allocating only the result (or nothing, with out=).
+
+    def __add__(self, other):
+        return BinOp('+', self, lazy(other))
+
+    def __sub__(self, other):
+        return BinOp('-', self, lazy(other))
+
+    def __mul__(self, c):
+        return Scale(_as_scalar(c), self)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, c):
+        return Scale(1. / _as_scalar(c), self)
+
+    def __neg__(self):
+        return Scale(Constant(-1.), self)
+
+    def __matmul__(self, other):
+        return Dot(self, lazy(other))
+
+    def evaluate(self, out=None):
+        # a new Vector, or the values written into out (e.g. an array('d'))
+        names = _Names()
+        source = self._source(names)
+        if out is not None:
+            return _run(source, names, 'out', out)
+        from vector import Vector
+        return Vector(_run(source, names, 'list'))
+
+
+class Leaf(VectorExpr):
+
+    def __init__(self, coordinates):
+        self.coordinates = coordinates
+
+    def _source(self, names):
+        return names.leaf(self.coordinates)
+
+
+class BinOp(VectorExpr):
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def _source(self, names):
+        return '({} {} {})'.format(self.left._source(names), self.op, self.right._source(names))
+
+
+class Scale(VectorExpr):
+
+    def __init__(self, scalar, vector):
+        self.scalar = scalar
+        self.vector = vector
+
+    def _source(self, names):
+        # the scalar is worked out before the pass and passed in by name
+        return '({} * {})'.format(names.scalar(self.scalar.value()), self.vector._source(names))
+
+
+class ScalarExpr(object):
+    # a lazy number, such as an inner product; value() or float() computes it
+
+    def __add__(self, other):
+        return ScalarOp('+', self, _as_scalar(other))
+
+    def __radd__(self, other):
+        return ScalarOp('+', _as_scalar(other), self)
+
+    def __sub__(self, other):
+        return ScalarOp('-', self, _as_scalar(other))
+
+    def __rsub__(self, other):
+        return ScalarOp('-', _as_scalar(other), self)
+
+    def __mul__(self, other):
+        if isinstance(other, VectorExpr):
+            return Scale(self, other)
+        if hasattr(other, 'coordinates'):
+            return Scale(self, lazy(other))
+        return ScalarOp('*', self, _as_scalar(other))
+
+    def __rmul__(self, other):
+        return ScalarOp('*', _as_scalar(other), self)
+
+    def __truediv__(self, other):
+        return ScalarOp('/', self, _as_scalar(other))
+
+    def __rtruediv__(self, other):
+        return ScalarOp('/', _as_scalar(other), self)
+
+    def __float__(self):
+        return float(self.value())
+
+
+class Constant(ScalarExpr):
+
+    def __init__(self, value):
+        self._value = value
+
+    def value(self):
+        return self._value
+
+
+class ScalarOp(ScalarExpr):
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def value(self):
+        a = self.left.value()
+        b = self.right.value()
+        if self.op == '+':
+            return a + b
+        if self.op == '-':
+            return a - b
+        if self.op == '*':
+            return a * b
+        return a / b
+
+
+class Dot(ScalarExpr):
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+    def value(self):
+        # one fused pass that sums the products of both sides
+        names = _Names()
+        source = '{} * {}'.format(self.left._source(names), self.right._source(names))
+        return _run(source, names, 'sum')
+
+
+if __name__ == '__main__':
+    # Vector's operators use the imported module, not this __main__ copy
+    from vector import Vector
+    from expr import lazy, _compiled, MAX_COMPILED
+
+    u = Vector([3.039, 1.879, 0.5])
+    b = Vector([0.825, 2.036, 1.])
+
+    def close(v, w):
+        return all(abs(x - y) < 1e-12 for x, y in zip(v, w))
+
+    if not close((u + b).evaluate(), u.add(b)) or not close((u - 2 * b).evaluate(), u.subtract(b.scale(2))):
+        print('test case 1 failed')
+
+    if (u @ b).value() != u.inner_product(b) or float(u @ u) != u.inner_product(u):
+        print('test case 2 failed')
+
+    # component_orthogonal_to as one expression: two dot passes and one fused pass
+    orthogonal = (u - (u @ b) / (b @ b) * b).evaluate()
+    if not close(orthogonal, u.component_orthogonal_to(b)):
+        print('test case 3 failed')
+
+    out = array('d', bytes(8 * 3))
+    result = (u + b * 0.5 - (-b)).evaluate(out=out)
+    if not (result is out and close(out, [x + 1.5 * y for x, y in zip(u, b)])):
+        print('test case 4 failed')
+
+    # out may also be one of the operands, for updates in a loop
+    x = array('d', [1., 2., 3.])
+    for _ in range(3):
+        (lazy(x) + 2. * lazy(b)).evaluate(out=x)
+    if not close(x, [1 + 6 * 0.825, 2 + 6 * 2.036, 3 + 6 * 1.]):
+        print('test case 5 failed')
+
+    # the same shape of expression reuses one generated function
+    before = len(_compiled)
+    (3 * b - u).evaluate()
+    (4 * u - b).evaluate()
+    if len(_compiled) != before + 1:
+        print('test case 6 failed')
+
+    try:
+        (u + Vector([1., 2.])).evaluate()
+        print('test case 7 failed')
+    except Exception as e:
+        if str(e) != DIMENSIONS_MUST_MATCH_MSG:
+            print('test case 7 failed')
+
+    for case in [lambda: u + 3.0, lambda: lazy(u) - 2, lambda: lazy(3.0), lambda: u - (u @ b)]:
+        try:
+            case()
+            print('test case 8 failed')
+        except Exception as e:
+            if str(e) != NOT_A_VECTOR_MSG:
+                print('test case 8 failed')
+
+    # the cache of generated functions stays bounded, dropping the oldest
+    first = next(iter(_compiled))
+    for k in range(MAX_COMPILED):
+        # a different shape for every k: its bits pick + or - in a chain
+        v = lazy(u)
+        for bit in range(9):
+            v = v - b if k >> bit & 1 else v + b
+        v.evaluate()
+    if not (len(_compiled) == MAX_COMPILED and first not in _compiled):
+        print('test case 9 failed')
@@ -0,0 +1,170 @@
+from itertools import product
+from math import sqrt, floor
+
+ZERO_TOLERANCE = 1e-10
+# largest difference allowed in any coordinate of two canonical forms
+DEFAULT_TOLERANCE = 1e-9
+# hash cells are this many tolerances wide, so most keys are far enough
+# from a cell edge that only their own cell has to be checked
+CELL_FACTOR = 8
+# the sign of a canonical normal is that of its first coordinate at least
+# this large, relative to 1/sqrt(dimension)
+SIGN_THRESHOLD = 0.5
+
+
+def canonical_form(equation):
+    # (direction, constant) of a Line or Plane: the normal vector scaled to
+    # unit length with its sign fixed, and the constant term scaled the same
+    # way. Scaled and sign-flipped copies of an equation have the same form.
+    coordinates = getattr(equation.normal_vector, 'coordinates', equation.normal_vector)
+    magnitude = sqrt(sum([x * x for x in coordinates]))
+    if magnitude < ZERO_TOLERANCE:
+        # 0 = c has no direction; such equations only group with each other
+        return (0.,) * len(coordinates), float(equation.constant_term)
+    # the sign comes from the first coordinate that is clearly not zero (a
+    # unit vector always has one this large), so a coordinate that is almost
+    # zero never decides it. Normals with a coordinate right at the threshold
+    # can still get opposite signs; _group probes the negated key for those.
+    threshold = SIGN_THRESHOLD / sqrt(len(coordinates)) * magnitude
+    for x in coordinates:
+        if abs(x) >= threshold:
+            scale = magnitude if x > 0 else -magnitude
+            break
+    return tuple([x / scale for x in coordinates]), equation.constant_term / scale
+
+
+class _Groups(object):
+    # union-find over keys (tuples of floats) where keys at most tolerance
+    # apart in every coordinate end up in one group. Keys are hashed into a
+    # grid of cells; a key near a cell edge also checks the neighbouring
+    # cells it could match in, so expected time is O(1) per key.
+
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.width = CELL_FACTOR * tolerance
+        self.cells = {}
+        self.exact = {}
+        self.parent = []
+
+    def _find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def _union(self, i, j):
+        i = self._find(i)
+        j = self._find(j)
+        if i != j:
+            # the earlier member stays the root
+            self.parent[max(i, j)] = min(i, j)
+
+    def add(self, key, either_sign=False):
+        # with either_sign, key also joins keys close to its negation
+        i = len(self.parent)
+        self.parent.append(i)
+        # identical keys (exact duplicates) join without a search
+        if key in self.exact:
+            self._union(i, self.exact[key])
+            return i
+        self.exact[key] = i
+
+        t = self.tolerance
+        w = self.width
+        probes = [key, tuple([-x for x in key])] if either_sign else [key]
+        for probe in probes:
+            ranges = [range(floor((x - t) / w), floor((x + t) / w) + 1) for x in probe]
+            for cell in product(*ranges):
+                for other, j in self.cells.get(cell, ()):
+                    if max([abs(a - b) for a, b in zip(probe, other)]) <= t:
+                        self._union(i, j)
+        self.cells.setdefault(tuple([floor(x / w) for x in key]), []).append((key, i))
+        return i
+
+    def groups(self):
+        # lists of members, each in input order, ordered by first member
+        members = {}
+        for i in range(len(self.parent)):
+            members.setdefault(self._find(i), []).append(i)
+        return [members[root] for root in sorted(members)]
+
+
+def _group(equations, tolerance, with_constant):
+    groups = _Groups(tolerance)
+    for equation in equations:
+        direction, constant = canonical_form(equation)
+        # a coordinate this close to the sign threshold could have been
+        # picked (or not) for a normal within tolerance of this one
+        threshold = SIGN_THRESHOLD / sqrt(len(direction))
+        either_sign = any([abs(abs(x) - threshold) <= 2 * tolerance for x in direction])
+        groups.add(direction + (constant,) if with_constant else direction, either_sign)
+    return [[equations[i] for i in members] for members in groups.groups()]
+
+
+def group_parallel(equations, tolerance=DEFAULT_TOLERANCE):
+    # families of parallel Lines or Planes (coincident ones included)
+    return _group(list(equations), tolerance, False)
+
+
+def group_coincident(equations, tolerance=DEFAULT_TOLERANCE):
+    # groups of equations describing the same line or plane
+    return _group(list(equations), tolerance, True)
+
+
+def deduplicate(equations, tolerance=DEFAULT_TOLERANCE):
+    # the first equation of every coincident group, in input order
+    return [group[0] for group in group_coincident(equations, tolerance)]
+
+
+if __name__ == '__main__':
+    import random
+    from vector import Vector
+    from line import Line
+    from plane import Plane
+
+    lines = [Line(Vector([1., 1.]), 2.), Line(Vector([-2., -2.]), -4.), Line(Vector([3., 3.]), 1.),
+             Line(Vector([1., -1.]), 0.), Line(Vector([4.046, 2.836]), 1.21), Line(Vector([10.115, 7.09]), 3.025)]
+    # positions by identity, since lines.index would go through __eq__
+    position = dict([(id(l), i) for i, l in enumerate(lines)])
+    if not ([[position[id(l)] for l in g] for g in group_parallel(lines)] == [[0, 1, 2], [3], [4, 5]] and
+            [[position[id(l)] for l in g] for g in group_coincident(lines)] == [[0, 1], [2], [3], [4, 5]]):
+        print('test case 1 failed')
+
+    # agrees with the pairwise __eq__ on scaled copies of random planes
+    rng = random.Random(0)
+    base = [Plane(Vector([rng.uniform(-5, 5) for _ in range(3)]), rng.uniform(-5, 5)) for _ in range(40)]
+    planes = []
+    for p in base:
+        for _ in range(rng.randint(1, 3)):
+            c = rng.choice([-1, 1]) * rng.uniform(0.5, 3)
+            planes.append(Plane(p.normal_vector.scale(c), p.constant_term * c))
+    rng.shuffle(planes)
+    pairwise = []
+    for p in planes:
+        for group in pairwise:
+            if group[0] == p:
+                group.append(p)
+                break
+        else:
+            pairwise.append([p])
+    if not (group_coincident(planes) == pairwise and len(deduplicate(planes)) == 40):
+        print('test case 2 failed')
+
+    # normals on either side of a cell edge, and of the sign choice
+    w = CELL_FACTOR * DEFAULT_TOLERANCE
+    edge = [Line(Vector([1., 3 * w - 1e-10]), 1.), Line(Vector([1., 3 * w + 1e-10]), 1.),
+            Line(Vector([1e-12, 1.]), 1.), Line(Vector([-1e-12, 1.]), 1.), Line(Vector([-1e-12, -1.]), -1.)]
+    t = SIGN_THRESHOLD / sqrt(2)
+    threshold = [Line(Vector([t + 1e-12, -sqrt(1 - (t + 1e-12) ** 2)]), 1.),
+                 Line(Vector([t - 1e-12, -sqrt(1 - (t - 1e-12) ** 2)]), 1.)]
+    if not (threshold[0].is_parallel_to(threshold[1]) and threshold[0] == threshold[1] and
+            [len(g) for g in group_parallel(threshold)] == [2] and
+            [len(g) for g in group_coincident(edge + threshold)] == [2, 3, 2]):
+        print('test case 3 failed')
+
+    zero = [Plane(), Plane(Vector([0, 0, 0]), 1), Plane(constant_term=0), Plane(Vector([0, 0, 1]), 0)]
+    if not ([len(g) for g in group_parallel(zero)] == [3, 1] and
+            [len(g) for g in group_coincident(zero)] == [2, 1, 1]):
+        print('test case 4 failed')
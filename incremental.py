@@ -0,0 +1,181 @@
+from vector import Vector
+from plane import Plane
+from parametrization import Parametrization
+
+ZERO_TOLERANCE = 1e-10
+
+PIVOT = 'pivot'
+REDUNDANT = 'redundant'
+INCONSISTENT = 'inconsistent'
+
+
+class IncrementalLinearSystem(object):
+    # keeps the RREF of the equations added so far. Each new equation is
+    # reduced against the current pivot rows only, so adding one costs
+    # O(n * rank) instead of a fresh elimination.
+
+    ALL_PLANES_MUST_BE_IN_SAME_DIM_MSG = 'All planes in the system should live in the same dimension'
+    NO_SOLUTIONS_MSG = 'No solutions'
+    INF_SOLUTIONS_MSG = 'Infinitely many solutions'
+
+    def __init__(self, dimension, planes=None):
+        self.dimension = dimension
+        self._reset()
+        for p in planes or []:
+            self.add_equation(p)
+
+    def _reset(self):
+        self.planes = []
+        # status of each equation when it was added
+        self.status = []
+        # reduced pivot rows as [coefficients..., constant] lists, with the
+        # pivot column of each row in indices_of_pivots
+        self.rows = []
+        self.indices_of_pivots = []
+        self.num_inconsistent = 0
+        self._solutions = None
+
+    def add_equation(self, plane):
+        if plane.dimension != self.dimension:
+            raise Exception(self.ALL_PLANES_MUST_BE_IN_SAME_DIM_MSG)
+        self.planes.append(plane)
+        self._solutions = None
+
+        row = list(plane.normal_vector.coordinates) + [plane.constant_term]
+        for pivot_row, col in zip(self.rows, self.indices_of_pivots):
+            coeff = row[col]
+            if abs(coeff) >= ZERO_TOLERANCE:
+                row = [x - coeff * y for x, y in zip(row, pivot_row)]
+
+        lead = -1
+        for j in range(self.dimension):
+            if abs(row[j]) >= ZERO_TOLERANCE:
+                lead = j
+                break
+
+        if lead == -1:
+            if abs(row[-1]) >= ZERO_TOLERANCE:
+                self.status.append(INCONSISTENT)
+                self.num_inconsistent += 1
+            else:
+                self.status.append(REDUNDANT)
+            return
+
+        scale = 1. / row[lead]
+        row = [x * scale for x in row]
+        row[lead] = 1.
+        # keep the existing rows reduced with respect to the new pivot
+        for i, pivot_row in enumerate(self.rows):
+            coeff = pivot_row[lead]
+            if abs(coeff) >= ZERO_TOLERANCE:
+                reduced = [x - coeff * y for x, y in zip(pivot_row, row)]
+                reduced[lead] = 0.
+                self.rows[i] = reduced
+        self.rows.append(row)
+        self.indices_of_pivots.append(lead)
+        self.status.append(PIVOT)
+
+    def remove_equation(self, index):
+        status = self.status[index]
+        if status == PIVOT:
+            # the pivot rows mix this equation into the others, rebuild them
+            planes = self.planes[:index] + self.planes[index + 1:]
+            self._reset()
+            for p in planes:
+                self.add_equation(p)
+            return
+
+        # redundant and inconsistent equations never entered the pivot rows
+        del self.planes[index]
+        del self.status[index]
+        if status == INCONSISTENT:
+            self.num_inconsistent -= 1
+        self._solutions = None
+
+    def rank(self):
+        return len(self.rows)
+
+    def is_consistent(self):
+        return self.num_inconsistent == 0
+
+    def compute_rref(self):
+        # pivot rows in column order followed by the zero rows, as planes
+        order = sorted(range(len(self.rows)), key=lambda i: self.indices_of_pivots[i])
+        planes = [Plane(normal_vector=Vector(self.rows[i][:-1]), constant_term=self.rows[i][-1])
+                  for i in order]
+        if self.num_inconsistent:
+            planes.append(Plane(constant_term=1))
+        while len(planes) < len(self.planes):
+            planes.append(Plane(normal_vector=Vector([0] * self.dimension)))
+        return planes
+
+    def find_solutions(self):
+        if self._solutions is None:
+            self._solutions = self._compute_solutions()
+        return self._solutions
+
+    def _compute_solutions(self):
+        if not self.is_consistent():
+            return self.NO_SOLUTIONS_MSG
+        if self.rank() != self.dimension:
+            return self.paramatrize_infinite_solutions()
+
+        solution = [0] * self.dimension
+        for row, col in zip(self.rows, self.indices_of_pivots):
+            solution[col] = row[-1]
+        return solution
+
+    def paramatrize_infinite_solutions(self):
+        dimension = self.dimension
+        free_indices = sorted(set(range(dimension)) - set(self.indices_of_pivots))
+
+        basepoint = [0] * dimension
+        for row, col in zip(self.rows, self.indices_of_pivots):
+            basepoint[col] = row[-1]
+
+        direction_vectors = []
+        for free in free_indices:
+            free_vector = [0] * dimension
+            free_vector[free] = 1
+            for row, col in zip(self.rows, self.indices_of_pivots):
+                free_vector[col] = -row[free]
+            direction_vectors.append(Vector(free_vector))
+
+        return Parametrization(Vector(basepoint), direction_vectors)
+
+
+    def __len__(self):
+        return len(self.planes)
+
+
+    def __getitem__(self, i):
+        return self.planes[i]
+
+
+if __name__ == '__main__':
+    s = IncrementalLinearSystem(3)
+    s.add_equation(Plane(normal_vector=Vector([1,1,1]), constant_term=1))
+    param = s.find_solutions()
+    if not (isinstance(param, Parametrization) and len(param.direction_vectors) == 2):
+        print('test case 1 failed')
+
+    s.add_equation(Plane(normal_vector=Vector([0,1,1]), constant_term=2))
+    param = s.find_solutions()
+    if not (param.basepoint == Vector([-1,2,0]) and
+            param.direction_vectors == [Vector([0,-1,1])]):
+        print('test case 2 failed')
+
+    s.add_equation(Plane(normal_vector=Vector([1,1,1]), constant_term=2))
+    if s.find_solutions() != s.NO_SOLUTIONS_MSG:
+        print('test case 3 failed')
+
+    s.remove_equation(2)
+    s.add_equation(Plane(normal_vector=Vector([1,2,-5]), constant_term=3))
+    if not isinstance(s.find_solutions(), list):
+        print('test case 4 failed')
+
+    s.remove_equation(0)
+    s.add_equation(Plane(normal_vector=Vector([1,-1,1]), constant_term=2))
+    x = s.find_solutions()
+    if not all(abs(p.normal_vector.inner_product(Vector(x)) - p.constant_term) < 1e-10 for p in s.planes):
+        print('test case 5 failed')
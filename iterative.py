@@ -0,0 +1,360 @@
+from math import sqrt
+
+ZERO_TOLERANCE = 1e-10
+
+
+class IterativeResult(object):
+
+    def __init__(self, solution, iterations, residual_norm, converged):
+        self.solution = solution
+        self.iterations = iterations
+        self.residual_norm = residual_norm
+        self.converged = converged
+
+    def __str__(self):
+        status = 'converged' if self.converged else 'did not converge'
+        return '{} after {} iterations, residual norm {:.3e}'.format(
+            status, self.iterations, self.residual_norm)
+
+
+class JacobiPreconditioner(object):
+
+    ZERO_ON_DIAGONAL_MSG = 'Jacobi preconditioning needs a nonzero diagonal'
+
+    def __init__(self, system):
+        try:
+            self.inverse_diagonal = [1. / d for d in system.diagonal()]
+        except ZeroDivisionError:
+            raise Exception(self.ZERO_ON_DIAGONAL_MSG)
+
+    def __call__(self, r):
+        return [d * x for d, x in zip(self.inverse_diagonal, r)]
+
+
+class ILU0Preconditioner(object):
+    # incomplete LU restricted to the sparsity pattern of A, L and U share
+    # one dict per row with L's unit diagonal left implicit
+
+    ZERO_PIVOT_MSG = 'ILU(0) hit a zero pivot'
+
+    def __init__(self, system):
+        n = len(system)
+        rows = [dict(system.row_entries(i)) for i in range(n)]
+        for i in range(n):
+            row = rows[i]
+            for k in sorted(c for c in row if c < i):
+                pivot = rows[k].get(k, 0.)
+                if abs(pivot) < ZERO_TOLERANCE:
+                    raise Exception(self.ZERO_PIVOT_MSG)
+                row[k] /= pivot
+                for j, v in rows[k].items():
+                    if j > k and j in row:
+                        row[j] -= row[k] * v
+            if abs(row.get(i, 0.)) < ZERO_TOLERANCE:
+                raise Exception(self.ZERO_PIVOT_MSG)
+        self.lower = [sorted((c, v) for c, v in row.items() if c < i) for i, row in enumerate(rows)]
+        self.upper = [sorted((c, v) for c, v in row.items() if c > i) for i, row in enumerate(rows)]
+        self.diagonal = [row[i] for i, row in enumerate(rows)]
+
+    def __call__(self, r):
+        n = len(r)
+        y = [0.] * n
+        for i in range(n):
+            y[i] = r[i] - sum([v * y[c] for c, v in self.lower[i]])
+        x = [0.] * n
+        for i in range(n - 1, -1, -1):
+            x[i] = (y[i] - sum([v * x[c] for c, v in self.upper[i]])) / self.diagonal[i]
+        return x
+
+
+PRECONDITIONERS = {
+    'jacobi': JacobiPreconditioner,
+    'ilu0': ILU0Preconditioner,
+}
+
+UNKNOWN_PRECONDITIONER_MSG = 'Unknown preconditioner'
+SYSTEM_MUST_BE_SQUARE_MSG = 'Iterative solvers need a square system'
+NO_PRECONDITIONER_MSG = 'Gauss-Seidel takes no preconditioner, use richardson or a Krylov method'
+NOT_JACOBI_PRECONDITIONER_MSG = 'Jacobi is preconditioned by the diagonal only, use richardson for other preconditioners'
+
+
+def _as_operator(system):
+    # LinearSystem has no matvec of its own, use its dense storage
+    if not hasattr(system, 'matvec'):
+        system = system.to_dense()
+    if len(system) != system.dimension:
+        raise Exception(SYSTEM_MUST_BE_SQUARE_MSG)
+    return system
+
+
+def _make_preconditioner(system, preconditioner):
+    if preconditioner is None or callable(preconditioner):
+        return preconditioner
+    try:
+        return PRECONDITIONERS[preconditioner](system)
+    except KeyError:
+        raise Exception(UNKNOWN_PRECONDITIONER_MSG)
+
+
+def _norm(v):
+    return sqrt(sum([x * x for x in v]))
+
+
+def _dot(u, v):
+    return sum([x * y for x, y in zip(u, v)])
+
+
+def _residual(system, b, x):
+    return [bi - ax for bi, ax in zip(b, system.matvec(x))]
+
+
+def conjugate_gradient(system, tol=1e-8, max_iter=None, preconditioner=None, callback=None, x0=None):
+    # for symmetric positive-definite systems
+    system = _as_operator(system)
+    M = _make_preconditioner(system, preconditioner)
+    n = system.dimension
+    b = system.right_hand_side()
+    if max_iter is None:
+        max_iter = 10 * n
+    x = list(x0) if x0 is not None else [0.] * n
+
+    target = tol * (_norm(b) or 1.)
+    r = _residual(system, b, x)
+    z = M(r) if M else r
+    p = list(z)
+    rz = _dot(r, z)
+    residual_norm = _norm(r)
+
+    k = 0
+    while residual_norm > target and k < max_iter:
+        Ap = system.matvec(p)
+        pAp = _dot(p, Ap)
+        if pAp == 0.:
+            break
+        alpha = rz / pAp
+        x = [xi + alpha * pi for xi, pi in zip(x, p)]
+        r = [ri - alpha * api for ri, api in zip(r, Ap)]
+        residual_norm = _norm(r)
+        k += 1
+        if callback:
+            callback(k, residual_norm)
+        if residual_norm <= target:
+            break
+
+        z = M(r) if M else r
+        rz_new = _dot(r, z)
+        beta = rz_new / rz
+        rz = rz_new
+        p = [zi + beta * pi for zi, pi in zip(z, p)]
+
+    return IterativeResult(x, k, residual_norm, residual_norm <= target)
+
+
+def gmres(system, tol=1e-8, max_iter=None, preconditioner=None, callback=None, x0=None, restart=30):
+    # restarted GMRES with right preconditioning, so the residual reported to
+    # the callback is the residual of the original system
+    system = _as_operator(system)
+    M = _make_preconditioner(system, preconditioner)
+    n = system.dimension
+    b = system.right_hand_side()
+    if max_iter is None:
+        max_iter = 10 * n
+    restart = min(restart, n)
+    x = list(x0) if x0 is not None else [0.] * n
+
+    target = tol * (_norm(b) or 1.)
+    r = _residual(system, b, x)
+    residual_norm = _norm(r)
+
+    k = 0
+    while residual_norm > target and k < max_iter:
+        beta = residual_norm
+        V = [[ri / beta for ri in r]]
+        Z = []
+        H = []
+        cs = []
+        sn = []
+        g = [beta]
+
+        for j in range(restart):
+            z = M(V[j]) if M else V[j]
+            Z.append(z)
+            w = system.matvec(z)
+
+            # modified Gram-Schmidt
+            h = []
+            for v in V:
+                hij = _dot(w, v)
+                w = [wi - hij * vi for wi, vi in zip(w, v)]
+                h.append(hij)
+            h_next = _norm(w)
+
+            # apply the previous Givens rotations to the new column
+            for i in range(j):
+                temp = cs[i] * h[i] + sn[i] * h[i + 1]
+                h[i + 1] = -sn[i] * h[i] + cs[i] * h[i + 1]
+                h[i] = temp
+            denom = sqrt(h[j] * h[j] + h_next * h_next)
+            c, s = (1., 0.) if denom == 0. else (h[j] / denom, h_next / denom)
+            h[j] = c * h[j] + s * h_next
+            cs.append(c)
+            sn.append(s)
+            g.append(-s * g[j])
+            g[j] = c * g[j]
+            H.append(h)
+
+            residual_norm = abs(g[j + 1])
+            k += 1
+            if callback:
+                callback(k, residual_norm)
+            if residual_norm <= target or k >= max_iter or h_next == 0.:
+                break
+            V.append([wi / h_next for wi in w])
+
+        # back substitution on the upper triangular Hessenberg factor
+        m = len(H)
+        y = [0.] * m
+        for i in range(m - 1, -1, -1):
+            y[i] = (g[i] - sum([H[l][i] * y[l] for l in range(i + 1, m)])) / H[i][i]
+        for i in range(m):
+            x = [xi + y[i] * zi for xi, zi in zip(x, Z[i])]
+
+        r = _residual(system, b, x)
+        residual_norm = _norm(r)
+        if m and H[m - 1][m - 1] == 0.:
+            break
+
+    return IterativeResult(x, k, residual_norm, residual_norm <= target)
+
+
+def richardson(system, tol=1e-8, max_iter=None, preconditioner='jacobi', callback=None, x0=None):
+    # preconditioned Richardson iteration, x += M^-1 (b - Ax). With the
+    # diagonal for M (the default) this is the Jacobi method; None means no
+    # preconditioner at all, which only converges for A close to I.
+    system = _as_operator(system)
+    M = _make_preconditioner(system, preconditioner)
+    if M is None:
+        M = list
+    n = system.dimension
+    b = system.right_hand_side()
+    if max_iter is None:
+        max_iter = 10 * n
+    x = list(x0) if x0 is not None else [0.] * n
+
+    target = tol * (_norm(b) or 1.)
+    r = _residual(system, b, x)
+    residual_norm = _norm(r)
+
+    k = 0
+    while residual_norm > target and k < max_iter:
+        correction = M(r)
+        x = [xi + ci for xi, ci in zip(x, correction)]
+        r = _residual(system, b, x)
+        residual_norm = _norm(r)
+        k += 1
+        if callback:
+            callback(k, residual_norm)
+
+    return IterativeResult(x, k, residual_norm, residual_norm <= target)
+
+
+def jacobi(system, tol=1e-8, max_iter=None, preconditioner=None, callback=None, x0=None):
+    # x += D^-1 (b - Ax) with D the diagonal. preconditioner is there so all
+    # solvers take the same options; only 'jacobi', the diagonal itself, is
+    # accepted, as any other would make this richardson under another name.
+    if preconditioner not in (None, 'jacobi'):
+        raise Exception(NOT_JACOBI_PRECONDITIONER_MSG)
+    return richardson(system, tol, max_iter, 'jacobi', callback, x0)
+
+
+def gauss_seidel(system, tol=1e-8, max_iter=None, preconditioner=None, callback=None, x0=None):
+    # forward sweeps using each updated value immediately. The sweep is its
+    # own splitting: preconditioner is only there so all solvers take the
+    # same options, and anything but None is refused rather than ignored.
+    if preconditioner is not None:
+        raise Exception(NO_PRECONDITIONER_MSG)
+
+    system = _as_operator(system)
+    n = system.dimension
+    b = system.right_hand_side()
+    if max_iter is None:
+        max_iter = 10 * n
+    x = list(x0) if x0 is not None else [0.] * n
+
+    rows = []
+    for i in range(n):
+        entries = list(system.row_entries(i))
+        diagonal = dict(entries).get(i, 0.)
+        if diagonal == 0.:
+            raise Exception(JacobiPreconditioner.ZERO_ON_DIAGONAL_MSG)
+        rows.append(([(c, v) for c, v in entries if c != i], diagonal))
+
+    target = tol * (_norm(b) or 1.)
+    residual_norm = _norm(_residual(system, b, x))
+
+    k = 0
+    while residual_norm > target and k < max_iter:
+        for i, (off_diagonal, diagonal) in enumerate(rows):
+            x[i] = (b[i] - sum([v * x[c] for c, v in off_diagonal])) / diagonal
+        residual_norm = _norm(_residual(system, b, x))
+        k += 1
+        if callback:
+            callback(k, residual_norm)
+
+    return IterativeResult(x, k, residual_norm, residual_norm <= target)
+
+
+if __name__ == '__main__':
+    from sparse import SparseLinearSystem
+    from dense import DenseSystem
+
+    n = 30
+    rows = [{i: 4.} for i in range(n)]
+    for i in range(n - 1):
+        rows[i][i + 1] = -1.
+        rows[i + 1][i] = -1.
+    sparse_system = SparseLinearSystem(rows, [1.] * n, n)
+    dense_system = DenseSystem.from_rows([[r.get(j, 0.) for j in range(n)] for r in rows], [1.] * n)
+    exact = dense_system.find_solutions()
+
+    def close(result):
+        return result.converged and all(abs(a - b) < 1e-6 for a, b in zip(result.solution, exact))
+
+    for case, solver in enumerate([conjugate_gradient, gmres, jacobi, gauss_seidel]):
+        for system in [sparse_system, dense_system]:
+            if not close(solver(system)):
+                print('test case {} failed'.format(case + 1))
+            if solver in (conjugate_gradient, gmres) and not close(solver(system, preconditioner='ilu0')):
+                print('test case {} failed'.format(case + 1))
+
+    try:
+        gauss_seidel(sparse_system, preconditioner='ilu0')
+        print('test case 4 failed')
+    except Exception as e:
+        if str(e) != NO_PRECONDITIONER_MSG:
+            print('test case 4 failed')
+
+    residuals = []
+    conjugate_gradient(sparse_system, preconditioner='jacobi',
+                       callback=lambda k, r: residuals.append(r))
+    if not (residuals and residuals[-1] <= 1e-8 * sqrt(n)):
+        print('test case 5 failed')
+
+    result = gmres(DenseSystem.from_rows([[1, 2], [3, 4]], [5, 6]))
+    if not (result.converged and abs(result.solution[0] + 4) < 1e-6 and abs(result.solution[1] - 4.5) < 1e-6):
+        print('test case 6 failed')
+
+    if not close(gmres(sparse_system, restart=5)):
+        print('test case 7 failed')
+
+    # any other preconditioner is richardson's, not jacobi's
+    if not (close(richardson(sparse_system, preconditioner='ilu0')) and
+            close(jacobi(sparse_system, preconditioner='jacobi'))):
+        print('test case 8 failed')
+    for solver, message in [(jacobi, NOT_JACOBI_PRECONDITIONER_MSG), (gauss_seidel, NO_PRECONDITIONER_MSG)]:
+        try:
+            solver(sparse_system, preconditioner=lambda r: r)
+            print('test case 9 failed')
+        except Exception as e:
+            if str(e) != message:
+                print('test case 9 failed')
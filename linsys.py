@@ -1,27 +1,157 @@
-from copy import deepcopy
+from array import array
 from vector import Vector
 from plane import Plane
 from parametrization import Parametrization
+from dense import DenseSystem
+from lu import LUFactorization
+from sparse import SparseLinearSystem
+from incremental import IncrementalLinearSystem
+from outofcore import OutOfCoreSystem, DEFAULT_MAX_MEMORY
+import iterative
+from exact import find_exact_solutions
+import rank as rank_reveal
+import structure
+import decompose
+import cholesky
+import storage
+import textio
+import refine
+
+class _LazyPlanes(object):
+    # the rows of a DenseSystem as a list of planes, each built on first use
+
+    def __init__(self, dense):
+        self.dense = dense
+        self._planes = [None] * len(dense)
+        # True once a row is replaced, so dense no longer matches
+        self.modified = False
+
+    def __len__(self):
+        return len(self._planes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        plane = self._planes[i]
+        if plane is None:
+            plane = self.dense[i]
+            self._planes[i] = plane
+        return plane
+
+    def __setitem__(self, i, plane):
+        self._planes[i] = plane
+        self.modified = True
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
 
 class LinearSystem(object):
 
     ALL_PLANES_MUST_BE_IN_SAME_DIM_MSG = 'All planes in the system should live in the same dimension'
+    UNKNOWN_ITERATIVE_METHOD_MSG = 'Unknown iterative method'
     NO_SOLUTIONS_MSG = 'No solutions'
     INF_SOLUTIONS_MSG = 'Infinitely many solutions'
 
+    # opt-in memoization of find_solutions and compute_rref shared by all
+    # systems; set to a cache.SolutionCache to enable
+    solution_cache = None
+
     def __init__(self, planes):
         try:
-            d = planes[0].dimension
-            for p in planes:
-                assert p.dimension == d
+            if isinstance(planes, _LazyPlanes):
+                # rows of one DenseSystem, all of its dimension
+                d = planes.dense.dimension
+            else:
+                d = planes[0].dimension
+                for p in planes:
+                    assert p.dimension == d
 
             self.planes = planes
             self.dimension = d
+            # LU or Cholesky factorization, dropped whenever a row changes
+            self._factorization = None
+            # (cache, {exact: canonical key}), dropped whenever a row changes
+            self._cache_key = None
 
         except AssertionError:
             raise Exception(self.ALL_PLANES_MUST_BE_IN_SAME_DIM_MSG)
 
 
+    def _cached(self, kind, compute):
+        # exact solves are keyed on Fractions, everything else on floats
+        cache = self.solution_cache
+        exact = kind == 'exact'
+        if self._cache_key is None or self._cache_key[0] is not cache:
+            self._cache_key = (cache, {})
+        keys = self._cache_key[1]
+        if exact not in keys:
+            keys[exact] = cache.key(self.planes, self.dimension, exact)
+        return cache.lookup((kind, keys[exact]), compute)
+
+    def to_dense(self):
+        if isinstance(self.planes, _LazyPlanes) and not self.planes.modified:
+            return self.planes.dense.copy()
+        return DenseSystem.from_planes(self.planes)
+
+    def to_sparse(self):
+        return SparseLinearSystem.from_planes(self.planes)
+
+    def to_incremental(self):
+        return IncrementalLinearSystem(self.dimension, list(self.planes))
+
+    def to_out_of_core(self, path, max_memory=DEFAULT_MAX_MEMORY):
+        # writes the augmented matrix to path; solve it with find_solutions()
+        return OutOfCoreSystem.from_planes(path, self.planes, max_memory)
+
+    def save(self, path, layout='dense', include_factorization=False):
+        # see storage.py for the format; the factorization is only stored for
+        # square systems and is computed here if it is not cached yet
+        factorization = self.factorize() if include_factorization else None
+        storage.save(path, self, factorization, layout)
+
+    @classmethod
+    def load(cls, path):
+        # a dense file stays mapped and its planes are built as rows are used
+        loaded = storage.load_system(path)
+        if isinstance(loaded, DenseSystem):
+            system = cls(_LazyPlanes(loaded))
+        else:
+            system = cls(loaded.planes)
+        factorization = storage.load_factorization(path)
+        system._factorization = factorization
+        return system
+
+    def factorize(self, assume_spd=False):
+        # Cholesky when the matrix is symmetric and turns out positive
+        # definite, LU otherwise (see cholesky.factorize; assume_spd does not
+        # change the result, so one cached factorization serves both).
+        # Cached until a row changes.
+        if self._factorization is None:
+            if len(self) != self.dimension:
+                raise Exception(LUFactorization.MATRIX_MUST_BE_SQUARE_MSG)
+            coefficients = array('d')
+            for p in self.planes:
+                coefficients.extend(p.normal_vector.coordinates)
+            self._factorization = cholesky.factorize(coefficients, self.dimension, assume_spd)
+        return self._factorization
+
+    def solve_factorized(self, assume_spd=False):
+        return self.factorize(assume_spd).solve([p.constant_term for p in self.planes])
+
+    def solve_mixed_precision(self, tol=refine.DEFAULT_TOL, max_iter=refine.DEFAULT_MAX_ITER):
+        # float32 LU with float64 iterative refinement; returns a
+        # refine.RefinementResult with the iterations and backward error
+        if len(self) != self.dimension:
+            raise Exception(LUFactorization.MATRIX_MUST_BE_SQUARE_MSG)
+        coefficients = array('d')
+        for p in self.planes:
+            coefficients.extend(p.normal_vector.coordinates)
+        return refine.mixed_precision_solve(coefficients, [p.constant_term for p in self.planes],
+                                            self.dimension, tol, max_iter)
+
+
     def swap_rows(self, row1, row2):
         temp_plane = self[row1]
         self[row1] = self[row2]
@@ -29,30 +159,35 @@ class LinearSystem(object):
 
 
     def multiply_coefficient_and_row(self, coefficient, row):
-        self[row].normal_vector = self[row].normal_vector.scale(coefficient)
-        self[row].constant_term*=coefficient
-        self[row].set_basepoint()
+        # rows are replaced rather than mutated so copies can share planes
+        plane = self[row]
+        self[row] = Plane(normal_vector=plane.normal_vector.scale(coefficient),
+                          constant_term=plane.constant_term*coefficient)
 
     def add_multiple_times_row_to_row(self, coefficient, row_to_add, row_to_be_added_to):
         row_to_add_plane = self[row_to_add]
         scaled_vector = row_to_add_plane.normal_vector.scale(coefficient)
         scaled_coeff = row_to_add_plane.constant_term*coefficient
         row_to_be_added_plane = self[row_to_be_added_to]
-        row_to_be_added_plane.normal_vector = row_to_be_added_plane.normal_vector.add(scaled_vector)
-        row_to_be_added_plane.constant_term += scaled_coeff
-        row_to_be_added_plane.set_basepoint()
+        self[row_to_be_added_to] = Plane(normal_vector=row_to_be_added_plane.normal_vector.add(scaled_vector),
+                                         constant_term=row_to_be_added_plane.constant_term + scaled_coeff)
 
-    def compute_triangular_form(self):
-        system = deepcopy(self)
+    def copy(self):
+        # planes are never modified in place, so the copy shares them until
+        # a row operation replaces a row on one side
+        return LinearSystem(list(self.planes))
+
+    def compute_triangular_form(self, inplace=False):
+        system = self if inplace else self.copy()
         num_eq = len(system)
         num_var = system.dimension
         col = 0
         for i in range(num_eq):
             while col < num_var:
                 coeff = system[i].normal_vector[col]
-                if(MyFloat(coeff).is_near_zero):
+                if(MyFloat(coeff).is_near_zero()):
                     non_zero_coeff_col = system.contains_nonzero_coeff_in_nth_var(i, col)
-                    if non_zero_coeff_col is not -1: #there's a row under row i with nonzero coeff for var j
+                    if non_zero_coeff_col != -1: #there's a row under row i with nonzero coeff for var j
                         system.swap_rows(non_zero_coeff_col, i) #swap that row with row i
                     else:
                         col+=1
@@ -62,8 +197,14 @@ class LinearSystem(object):
                 break;
         return system
 
-    def compute_rref(self):
-        tf = self.compute_triangular_form()
+    def compute_rref(self, inplace=False):
+        # in-place reductions change this system, so they bypass the cache
+        if self.solution_cache is not None and not inplace:
+            return self._cached('rref', lambda: self._compute_rref(inplace))
+        return self._compute_rref(inplace)
+
+    def _compute_rref(self, inplace):
+        tf = self.compute_triangular_form(inplace)
         try:
             # find the first non zero term for each row
             first_non_zero_term_array = tf.indices_of_first_nonzero_terms_in_each_row()
@@ -83,9 +224,18 @@ class LinearSystem(object):
             else:
                 raise e
 
-    def find_solutions(self):
+    def find_solutions(self, inplace=False, exact=False):
+        if self.solution_cache is not None and not inplace:
+            return self._cached('exact' if exact else 'solutions',
+                                lambda: self._find_solutions(inplace, exact))
+        return self._find_solutions(inplace, exact)
+
+    def _find_solutions(self, inplace, exact):
+        if exact:
+            # fraction-free elimination on integers, solutions come back as Fractions
+            return find_exact_solutions(self.planes)
         try:
-            rref = self.compute_rref()
+            rref = self.compute_rref(inplace)
             coefficient_list = rref.indices_of_first_nonzero_terms_in_each_row()
 
             for p in rref.planes:
@@ -104,6 +254,36 @@ class LinearSystem(object):
             else:
                 raise e
 
+    def solve_iteratively(self, method='gmres', **options):
+        # options are passed on to the solver: tol, max_iter, preconditioner, callback, x0
+        solvers = {
+            'cg': iterative.conjugate_gradient,
+            'gmres': iterative.gmres,
+            'jacobi': iterative.jacobi,
+            'richardson': iterative.richardson,
+            'gauss_seidel': iterative.gauss_seidel,
+        }
+        if method not in solvers:
+            raise Exception(self.UNKNOWN_ITERATIVE_METHOD_MSG)
+        return solvers[method](self.to_dense(), **options)
+
+    def solve_structured(self):
+        # returns (solution, solver); the solver is picked from the sparsity
+        # pattern: triangular, tridiagonal, block diagonal, banded or dense
+        return structure.solve_structured(self.to_dense())
+
+    def solve_decomposed(self, workers=None):
+        # solves independent groups of variables separately, across a process pool
+        return decompose.solve_decomposed(self.to_sparse(), workers)
+
+    def rank(self):
+        return rank_reveal.rank(self.planes)
+
+    def classify(self):
+        # one of NO_SOLUTIONS_MSG, INF_SOLUTIONS_MSG or 'Unique solution',
+        # without building the RREF or a parametrization
+        return rank_reveal.classify(self.planes)
+
     def paramatrize_infinite_solutions(self):
         dimension = self.dimension
         pivot_indicies = self.indices_of_first_nonzero_terms_in_each_row()
@@ -187,6 +367,8 @@ class LinearSystem(object):
         try:
             assert x.dimension == self.dimension
             self.planes[i] = x
+            self._factorization = None
+            self._cache_key = None
 
         except AssertionError:
             raise Exception(self.ALL_PLANES_MUST_BE_IN_SAME_DIM_MSG)
@@ -194,7 +376,7 @@ class LinearSystem(object):
 
     def __str__(self):
         ret = 'Linear System:\n'
-        temp = ['Equation {}: {}'.format(i+1,p) for i,p in enumerate(self.planes)]
+        temp = ['Equation {}: {}'.format(i+1,line) for i,line in enumerate(textio.equation_lines(self))]
         ret += '\n'.join(temp)
         return ret
 
@@ -203,182 +385,193 @@ class MyFloat(float):
     def is_near_zero(self, eps=1e-10):
         return abs(self) < eps
 
-# gaussian elimination row operations
-p0 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
-p1 = Plane(normal_vector=Vector([0,1,0]), constant_term=2)
-p2 = Plane(normal_vector=Vector([1,1,-1]), constant_term=3)
-p3 = Plane(normal_vector=Vector([1,0,-2]), constant_term=2)
-
-s = LinearSystem([p0,p1,p2,p3])
-
-s.swap_rows(0,1)
-if not (s[0] == p1 and s[1] == p0 and s[2] == p2 and s[3] == p3):
-    print('test case 1 failed')
-
-s.swap_rows(1,3)
-if not (s[0] == p1 and s[1] == p3 and s[2] == p2 and s[3] == p0):
-    print('test case 2 failed')
-
-s.swap_rows(3,1)
-if not (s[0] == p1 and s[1] == p0 and s[2] == p2 and s[3] == p3):
-    print('test case 3 failed')
-
-s.multiply_coefficient_and_row(1,0)
-if not (s[0] == p1 and s[1] == p0 and s[2] == p2 and s[3] == p3):
-    print('test case 4 failed')
-
-s.multiply_coefficient_and_row(-1,2)
-if not (s[0] == p1 and
-        s[1] == p0 and
-        s[2] == Plane(normal_vector=Vector([-1,-1,1]), constant_term=-3) and
-        s[3] == p3):
-    print('test case 5 failed')
-
-s.multiply_coefficient_and_row(10,1)
-if not (s[0] == p1 and
-        s[1] == Plane(normal_vector=Vector([10,10,10]), constant_term=10) and
-        s[2] == Plane(normal_vector=Vector([-1,-1,1]), constant_term=-3) and
-        s[3] == p3):
-    print('test case 6 failed')
-
-s.add_multiple_times_row_to_row(0,0,1)
-if not (s[0] == p1 and
-        s[1] == Plane(normal_vector=Vector([10,10,10]), constant_term=10) and
-        s[2] == Plane(normal_vector=Vector([-1,-1,1]), constant_term=-3) and
-        s[3] == p3):
-    print('test case 7 failed')
-
-
-s.add_multiple_times_row_to_row(1,0,1)
-if not (s[0] == p1 and
-        s[1] == Plane(normal_vector=Vector([10,11,10]), constant_term=12) and
-        s[2] == Plane(normal_vector=Vector([-1,-1,1]), constant_term=-3) and
-        s[3] == p3):
-    print('test case 8 failed')
-
-s.add_multiple_times_row_to_row(-1,1,0)
-if not (s[0] == Plane(normal_vector=Vector([-10,-10,-10]), constant_term=-10) and
-        s[1] == Plane(normal_vector=Vector([10,11,10]), constant_term=12) and
-        s[2] == Plane(normal_vector=Vector([-1,-1,1]), constant_term=-3) and
-        s[3] == p3):
-    print('test case 9 failed')
-
-
-# Triangular form
-p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
-p2 = Plane(normal_vector=Vector([0,1,1]), constant_term=2)
-s = LinearSystem([p1,p2])
-t = s.compute_triangular_form()
-if not (t[0] == p1 and
-        t[1] == p2):
-    print('test case 1 failed')
-
-p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
-p2 = Plane(normal_vector=Vector([1,1,1]), constant_term=2)
-s = LinearSystem([p1,p2])
-t = s.compute_triangular_form()
-if not (t[0] == p1 and
-        t[1] == Plane(constant_term=1)):
-    print('test case 2 failed')
-
-p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
-p2 = Plane(normal_vector=Vector([0,1,0]), constant_term=2)
-p3 = Plane(normal_vector=Vector([1,1,-1]), constant_term=3)
-p4 = Plane(normal_vector=Vector([1,0,-2]), constant_term=2)
-s = LinearSystem([p1,p2,p3,p4])
-t = s.compute_triangular_form()
-if not (t[0] == p1 and
-        t[1] == p2 and
-        t[2] == Plane(normal_vector=Vector([0,0,-2]), constant_term=2) and
-        t[3] == Plane()):
-    print('test case 3 failed')
-
-p1 = Plane(normal_vector=Vector([0,1,1]), constant_term=1)
-p2 = Plane(normal_vector=Vector([1,-1,1]), constant_term=2)
-p3 = Plane(normal_vector=Vector([1,2,-5]), constant_term=3)
-s = LinearSystem([p1,p2,p3])
-t = s.compute_triangular_form()
-if not (t[0] == Plane(normal_vector=Vector([1,-1,1]), constant_term=2) and
-        t[1] == Plane(normal_vector=Vector([0,1,1]), constant_term=1) and
-        t[2] == Plane(normal_vector=Vector([0,0,-9]), constant_term=-2)):
-    print('test case 4 failed')
-
-
-#RREF
-p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
-p2 = Plane(normal_vector=Vector([0,1,1]), constant_term=2)
-s = LinearSystem([p1,p2])
-r = s.compute_rref()
-if not (r[0] == Plane(normal_vector=Vector([1,0,0]), constant_term=-1) and
-        r[1] == p2):
-    print('test case 1 failed')
-
-p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
-p2 = Plane(normal_vector=Vector([1,1,1]), constant_term=2)
-s = LinearSystem([p1,p2])
-r = s.compute_rref()
-if not (r[0] == p1 and
-        r[1] == Plane(constant_term=1)):
-    print('test case 2 failed')
-
-p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
-p2 = Plane(normal_vector=Vector([0,1,0]), constant_term=2)
-p3 = Plane(normal_vector=Vector([1,1,-1]), constant_term=3)
-p4 = Plane(normal_vector=Vector([1,0,-2]), constant_term=2)
-s = LinearSystem([p1,p2,p3,p4])
-r = s.compute_rref()
-if not (r[0] == Plane(normal_vector=Vector([1,0,0]), constant_term=0) and
-        r[1] == p2 and
-        r[2] == Plane(normal_vector=Vector([0,0,-2]), constant_term=2) and
-        r[3] == Plane()):
-    print('test case 3 failed')
-
-p1 = Plane(normal_vector=Vector([0,1,1]), constant_term=1)
-p2 = Plane(normal_vector=Vector([1,-1,1]), constant_term=2)
-p3 = Plane(normal_vector=Vector([1,2,-5]), constant_term=3)
-s = LinearSystem([p1,p2,p3])
-r = s.compute_rref()
-if not (r[0] == Plane(normal_vector=Vector([1,0,0]), constant_term=23/9) and
-        r[1] == Plane(normal_vector=Vector([0,1,0]), constant_term=7/9) and
-        r[2] == Plane(normal_vector=Vector([0,0,1]), constant_term=2/9)):
-    print('test case 4 failed')
-
-
-## Find solutions
-# p1 = Plane(normal_vector=Vector([5.862, 1.178, -10.366]), constant_term=-8.15)
-# p2 = Plane(normal_vector=Vector([-2.931, -0.589, 5.183]), constant_term=-4.075)
-# system = LinearSystem([p1, p2])
-# print(system.find_solutions())
-
-# p1 = Plane(Vector([8.631, 5.112, -1.816]), -5.113)
-# p2 = Plane(Vector([4.315, 11.132, -5.27]), -6.775)
-# p3 = Plane(Vector([-2.158, 3.01, -1.727]), -0.831)
-# system = LinearSystem([p1, p2, p3])
-# print(system.find_solutions())
-
-# p1 = Plane(Vector([5.262, 2.739, -9.878]), -3.441)
-# p2 = Plane(Vector([5.111, 6.358, 7.638]), -2.152)
-# p3 = Plane(Vector([2.016, -9.924, -1.367]), -9.278)
-# p4 = Plane(Vector([2.167, -13.543, -18.883]), -10.567)
-# system = LinearSystem([p1, p2, p3, p4])
-# print(system.find_solutions())
-
-
-# parametrization
-p1 = Plane(normal_vector=Vector([0.786, 0.786, 0.588]), constant_term=-0.714)
-p2 = Plane(normal_vector=Vector([-0.131, -0.131, 0.244]), constant_term=0.319)
-system = LinearSystem([p1, p2])
-print(system.find_solutions())
-
-p1 = Plane(Vector([8.631, 5.112, -1.816]), -5.113)
-p2 = Plane(Vector([4.315, 11.132, -5.27]), -6.775)
-p3 = Plane(Vector([-2.158, 3.01, -1.727]), -0.831)
-system = LinearSystem([p1, p2, p3])
-print(system.find_solutions())
-
-p1 = Plane(Vector([0.935, 1.76, -9.365]), -9.955)
-p2 = Plane(Vector([0.187, 0.352, -1.873]), -1.991)
-p3 = Plane(Vector([0.374, 0.704, -3.746]), -3.982)
-p4 = Plane(Vector([-0.561, -1.056, 5.619]), 5.973)
-system = LinearSystem([p1, p2, p3, p4])
-print(system.find_solutions())
+if __name__ == '__main__':
+    # gaussian elimination row operations
+    p0 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p1 = Plane(normal_vector=Vector([0,1,0]), constant_term=2)
+    p2 = Plane(normal_vector=Vector([1,1,-1]), constant_term=3)
+    p3 = Plane(normal_vector=Vector([1,0,-2]), constant_term=2)
+
+    s = LinearSystem([p0,p1,p2,p3])
+
+    s.swap_rows(0,1)
+    if not (s[0] == p1 and s[1] == p0 and s[2] == p2 and s[3] == p3):
+        print('test case 1 failed')
+
+    s.swap_rows(1,3)
+    if not (s[0] == p1 and s[1] == p3 and s[2] == p2 and s[3] == p0):
+        print('test case 2 failed')
+
+    s.swap_rows(3,1)
+    if not (s[0] == p1 and s[1] == p0 and s[2] == p2 and s[3] == p3):
+        print('test case 3 failed')
+
+    s.multiply_coefficient_and_row(1,0)
+    if not (s[0] == p1 and s[1] == p0 and s[2] == p2 and s[3] == p3):
+        print('test case 4 failed')
+
+    s.multiply_coefficient_and_row(-1,2)
+    if not (s[0] == p1 and
+            s[1] == p0 and
+            s[2] == Plane(normal_vector=Vector([-1,-1,1]), constant_term=-3) and
+            s[3] == p3):
+        print('test case 5 failed')
+
+    s.multiply_coefficient_and_row(10,1)
+    if not (s[0] == p1 and
+            s[1] == Plane(normal_vector=Vector([10,10,10]), constant_term=10) and
+            s[2] == Plane(normal_vector=Vector([-1,-1,1]), constant_term=-3) and
+            s[3] == p3):
+        print('test case 6 failed')
+
+    s.add_multiple_times_row_to_row(0,0,1)
+    if not (s[0] == p1 and
+            s[1] == Plane(normal_vector=Vector([10,10,10]), constant_term=10) and
+            s[2] == Plane(normal_vector=Vector([-1,-1,1]), constant_term=-3) and
+            s[3] == p3):
+        print('test case 7 failed')
+
+
+    s.add_multiple_times_row_to_row(1,0,1)
+    if not (s[0] == p1 and
+            s[1] == Plane(normal_vector=Vector([10,11,10]), constant_term=12) and
+            s[2] == Plane(normal_vector=Vector([-1,-1,1]), constant_term=-3) and
+            s[3] == p3):
+        print('test case 8 failed')
+
+    s.add_multiple_times_row_to_row(-1,1,0)
+    if not (s[0] == Plane(normal_vector=Vector([-10,-10,-10]), constant_term=-10) and
+            s[1] == Plane(normal_vector=Vector([10,11,10]), constant_term=12) and
+            s[2] == Plane(normal_vector=Vector([-1,-1,1]), constant_term=-3) and
+            s[3] == p3):
+        print('test case 9 failed')
+
+
+    # Triangular form
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0,1,1]), constant_term=2)
+    s = LinearSystem([p1,p2])
+    t = s.compute_triangular_form()
+    if not (t[0] == p1 and
+            t[1] == p2):
+        print('test case 1 failed')
+
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,1,1]), constant_term=2)
+    s = LinearSystem([p1,p2])
+    t = s.compute_triangular_form()
+    if not (t[0] == p1 and
+            t[1] == Plane(constant_term=1)):
+        print('test case 2 failed')
+
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0,1,0]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1,1,-1]), constant_term=3)
+    p4 = Plane(normal_vector=Vector([1,0,-2]), constant_term=2)
+    s = LinearSystem([p1,p2,p3,p4])
+    t = s.compute_triangular_form()
+    if not (t[0] == p1 and
+            t[1] == p2 and
+            t[2] == Plane(normal_vector=Vector([0,0,-2]), constant_term=2) and
+            t[3] == Plane()):
+        print('test case 3 failed')
+
+    p1 = Plane(normal_vector=Vector([0,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,-1,1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1,2,-5]), constant_term=3)
+    s = LinearSystem([p1,p2,p3])
+    t = s.compute_triangular_form()
+    if not (t[0] == Plane(normal_vector=Vector([1,-1,1]), constant_term=2) and
+            t[1] == Plane(normal_vector=Vector([0,1,1]), constant_term=1) and
+            t[2] == Plane(normal_vector=Vector([0,0,-9]), constant_term=-2)):
+        print('test case 4 failed')
+
+    # the copy shares rows with the original, which must stay untouched
+    if not (s[0] == p1 and s[1] == p2 and s[2] == p3 and t[2] is not s[2]):
+        print('test case 5 failed')
+
+    t = s.compute_triangular_form(inplace=True)
+    if not (t is s and
+            s[0] == Plane(normal_vector=Vector([1,-1,1]), constant_term=2) and
+            s[2] == Plane(normal_vector=Vector([0,0,-9]), constant_term=-2)):
+        print('test case 6 failed')
+
+
+    #RREF
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0,1,1]), constant_term=2)
+    s = LinearSystem([p1,p2])
+    r = s.compute_rref()
+    if not (r[0] == Plane(normal_vector=Vector([1,0,0]), constant_term=-1) and
+            r[1] == p2):
+        print('test case 1 failed')
+
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,1,1]), constant_term=2)
+    s = LinearSystem([p1,p2])
+    r = s.compute_rref()
+    if not (r[0] == p1 and
+            r[1] == Plane(constant_term=1)):
+        print('test case 2 failed')
+
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0,1,0]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1,1,-1]), constant_term=3)
+    p4 = Plane(normal_vector=Vector([1,0,-2]), constant_term=2)
+    s = LinearSystem([p1,p2,p3,p4])
+    r = s.compute_rref()
+    if not (r[0] == Plane(normal_vector=Vector([1,0,0]), constant_term=0) and
+            r[1] == p2 and
+            r[2] == Plane(normal_vector=Vector([0,0,-2]), constant_term=2) and
+            r[3] == Plane()):
+        print('test case 3 failed')
+
+    p1 = Plane(normal_vector=Vector([0,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,-1,1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1,2,-5]), constant_term=3)
+    s = LinearSystem([p1,p2,p3])
+    r = s.compute_rref()
+    if not (r[0] == Plane(normal_vector=Vector([1,0,0]), constant_term=23/9) and
+            r[1] == Plane(normal_vector=Vector([0,1,0]), constant_term=7/9) and
+            r[2] == Plane(normal_vector=Vector([0,0,1]), constant_term=2/9)):
+        print('test case 4 failed')
+
+
+    ## Find solutions
+    # p1 = Plane(normal_vector=Vector([5.862, 1.178, -10.366]), constant_term=-8.15)
+    # p2 = Plane(normal_vector=Vector([-2.931, -0.589, 5.183]), constant_term=-4.075)
+    # system = LinearSystem([p1, p2])
+    # print(system.find_solutions())
+
+    # p1 = Plane(Vector([8.631, 5.112, -1.816]), -5.113)
+    # p2 = Plane(Vector([4.315, 11.132, -5.27]), -6.775)
+    # p3 = Plane(Vector([-2.158, 3.01, -1.727]), -0.831)
+    # system = LinearSystem([p1, p2, p3])
+    # print(system.find_solutions())
+
+    # p1 = Plane(Vector([5.262, 2.739, -9.878]), -3.441)
+    # p2 = Plane(Vector([5.111, 6.358, 7.638]), -2.152)
+    # p3 = Plane(Vector([2.016, -9.924, -1.367]), -9.278)
+    # p4 = Plane(Vector([2.167, -13.543, -18.883]), -10.567)
+    # system = LinearSystem([p1, p2, p3, p4])
+    # print(system.find_solutions())
+
+
+    # parametrization
+    p1 = Plane(normal_vector=Vector([0.786, 0.786, 0.588]), constant_term=-0.714)
+    p2 = Plane(normal_vector=Vector([-0.131, -0.131, 0.244]), constant_term=0.319)
+    system = LinearSystem([p1, p2])
+    print(system.find_solutions())
+
+    p1 = Plane(Vector([8.631, 5.112, -1.816]), -5.113)
+    p2 = Plane(Vector([4.315, 11.132, -5.27]), -6.775)
+    p3 = Plane(Vector([-2.158, 3.01, -1.727]), -0.831)
+    system = LinearSystem([p1, p2, p3])
+    print(system.find_solutions())
+
+    p1 = Plane(Vector([0.935, 1.76, -9.365]), -9.955)
+    p2 = Plane(Vector([0.187, 0.352, -1.873]), -1.991)
+    p3 = Plane(Vector([0.374, 0.704, -3.746]), -3.982)
+    p4 = Plane(Vector([-0.561, -1.056, 5.619]), 5.973)
+    system = LinearSystem([p1, p2, p3, p4])
+    print(system.find_solutions())
@@ -0,0 +1,135 @@
+from array import array
+
+ZERO_TOLERANCE = 1e-10
+
+
+class LUFactorization(object):
+    # PA = LU with partial pivoting. L (unit diagonal) and U share one
+    # row-major buffer, and perm[i] is the original row placed at row i.
+    # typecode 'f' keeps the factors in float32, rounding after every update.
+
+    MATRIX_MUST_BE_SQUARE_MSG = 'Only square systems can be factorized'
+    MATRIX_IS_SINGULAR_MSG = 'Matrix is singular'
+    RHS_DIMENSION_MISMATCH_MSG = 'The right-hand side does not match the size of the system'
+
+    def __init__(self, coefficients, dimension, typecode='d'):
+        if len(coefficients) != dimension * dimension:
+            raise Exception(self.MATRIX_MUST_BE_SQUARE_MSG)
+        self.dimension = dimension
+        self.lu = array(typecode, coefficients)
+        self.perm = list(range(dimension))
+        self._factor()
+
+    @classmethod
+    def from_factors(cls, lu, perm, dimension):
+        # wraps factors computed elsewhere, e.g. by the blocked engine
+        factorization = cls.__new__(cls)
+        factorization.dimension = dimension
+        factorization.lu = lu
+        factorization.perm = perm
+        return factorization
+
+    @classmethod
+    def from_dense(cls, system):
+        n = system.dimension
+        if system.num_equations != n:
+            raise Exception(cls.MATRIX_MUST_BE_SQUARE_MSG)
+        coefficients = array('d')
+        for i in range(n):
+            coefficients.extend(system.coefficients(i))
+        return cls(coefficients, n)
+
+    @classmethod
+    def from_planes(cls, planes):
+        n = len(planes)
+        coefficients = array('d')
+        for p in planes:
+            if p.dimension != n:
+                raise Exception(cls.MATRIX_MUST_BE_SQUARE_MSG)
+            coefficients.extend(p.normal_vector.coordinates)
+        return cls(coefficients, n)
+
+    def _factor(self):
+        n = self.dimension
+        a = self.lu
+        perm = self.perm
+
+        for k in range(n):
+            pivot_row = k
+            pivot_val = abs(a[k * n + k])
+            for i in range(k + 1, n):
+                val = abs(a[i * n + k])
+                if val > pivot_val:
+                    pivot_row = i
+                    pivot_val = val
+            if pivot_val < ZERO_TOLERANCE:
+                raise Exception(self.MATRIX_IS_SINGULAR_MSG)
+
+            if pivot_row != k:
+                p = pivot_row * n
+                q = k * n
+                temp = a[p:p + n]
+                a[p:p + n] = a[q:q + n]
+                a[q:q + n] = temp
+                perm[k], perm[pivot_row] = perm[pivot_row], perm[k]
+
+            pivot = a[k * n + k]
+            pivot_tail = a[k * n + k + 1:k * n + n]
+            for i in range(k + 1, n):
+                start = i * n
+                coeff = a[start + k]
+                if coeff == 0.:
+                    continue
+                multiplier = coeff / pivot
+                a[start + k] = multiplier
+                a[start + k + 1:start + n] = array(a.typecode, [y - multiplier * x for x, y in
+                                                                zip(pivot_tail, a[start + k + 1:start + n])])
+
+    def solve(self, b):
+        n = self.dimension
+        if len(b) != n:
+            raise Exception(self.RHS_DIMENSION_MISMATCH_MSG)
+        a = self.lu
+
+        # forward substitution with the unit lower triangle
+        y = [0.] * n
+        for i in range(n):
+            start = i * n
+            y[i] = b[self.perm[i]] - sum([l * v for l, v in zip(a[start:start + i], y)])
+
+        # back substitution with the upper triangle
+        x = [0.] * n
+        for i in range(n - 1, -1, -1):
+            start = i * n
+            s = sum([u * v for u, v in zip(a[start + i + 1:start + n], x[i + 1:])])
+            x[i] = (y[i] - s) / a[start + i]
+        return x
+
+    def solve_many(self, B):
+        return [self.solve(b) for b in B]
+
+
+if __name__ == '__main__':
+    from vector import Vector
+    from plane import Plane
+
+    p1 = Plane(normal_vector=Vector([0,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,-1,1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1,2,-5]), constant_term=3)
+    f = LUFactorization.from_planes([p1,p2,p3])
+    x = f.solve([1, 2, 3])
+    if not all(abs(a - b) < 1e-10 for a, b in zip(x, [23/9, 7/9, 2/9])):
+        print('test case 1 failed')
+
+    xs = f.solve_many([[1, 2, 3], [0, 0, 0]])
+    if not (len(xs) == 2 and xs[1] == [0, 0, 0]):
+        print('test case 2 failed')
+
+    try:
+        LUFactorization.from_planes([Plane(Vector([1,1,1]), 1),
+                                     Plane(Vector([2,2,2]), 1),
+                                     Plane(Vector([0,0,1]), 1)])
+        print('test case 3 failed')
+    except Exception as e:
+        if str(e) != LUFactorization.MATRIX_IS_SINGULAR_MSG:
+            print('test case 3 failed')
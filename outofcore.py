@@ -0,0 +1,385 @@
+import os
+import mmap
+from array import array
+from operator import sub
+from vector import Vector
+from parametrization import Parametrization
+
+ZERO_TOLERANCE = 1e-10
+DEFAULT_MAX_MEMORY = 64 * 2 ** 20
+# wider panels save passes over the file but cost more work in memory
+MAX_PANEL_COLUMNS = 32
+# a float in a Python list: the pointer and the float object it points to
+LIST_FLOAT_BYTES = 32
+
+
+class OutOfCoreSystem(object):
+    # the augmented matrix [A|b] lives in a file, float64 row-major in the
+    # same layout as DenseSystem, and is only ever mapped one tile of rows at
+    # a time. max_memory bounds the tile (with its alignment padding), one
+    # panel of panel_columns columns of every row in a flat array, the
+    # panel's pivot rows, 8 bytes per row of bookkeeping (the row order of a
+    # panel, later the pivot column of each row) and scratch for the row
+    # being updated. Only the solution or parametrization that is returned
+    # is not counted.
+
+    NO_SOLUTIONS_MSG = 'No solutions'
+    INF_SOLUTIONS_MSG = 'Infinitely many solutions'
+    FILE_SIZE_MISMATCH_MSG = 'The file size does not match the shape of the system'
+    ALL_ROWS_MUST_BE_IN_SAME_DIM_MSG = 'All rows in the system should live in the same dimension'
+    MAX_MEMORY_TOO_SMALL_MSG = 'max_memory must hold a panel of one column, a tile of one row and the per-row bookkeeping'
+
+    def __init__(self, path, num_equations, dimension, max_memory=DEFAULT_MAX_MEMORY):
+        self.path = path
+        self.num_equations = num_equations
+        self.dimension = dimension
+        self.width = dimension + 1
+        self.row_bytes = 8 * self.width
+
+        # a mapping starts up to ALLOCATIONGRANULARITY bytes before its tile
+        # (see _map); updating a row briefly takes up to three lists of
+        # Python floats as long as the row
+        budget = (max_memory - mmap.ALLOCATIONGRANULARITY - 8 * num_equations -
+                  3 * LIST_FLOAT_BYTES * self.width)
+        # up to half of the rest holds the panel: its columns of every row
+        # and its pivot rows in full, with their tails
+        per_column = 8 * num_equations + 2 * self.row_bytes
+        self.panel_columns = max(1, min(dimension, MAX_PANEL_COLUMNS, budget // 2 // per_column))
+        tile_budget = budget - self.panel_columns * per_column
+        if tile_budget < self.row_bytes:
+            raise Exception(self.MAX_MEMORY_TOO_SMALL_MSG)
+        self.tile_rows = tile_budget // self.row_bytes
+
+        # streaming passes over the file made by compute_rref
+        self.passes = 0
+
+        if os.path.getsize(path) != num_equations * self.row_bytes:
+            raise Exception(self.FILE_SIZE_MISMATCH_MSG)
+        self._file = open(path, 'r+b')
+        self._fd = self._file.fileno()
+
+    @classmethod
+    def create(cls, path, num_equations, dimension, max_memory=DEFAULT_MAX_MEMORY):
+        # a zero-filled (sparse on most filesystems) file of the right size
+        with open(path, 'wb') as f:
+            f.truncate(num_equations * 8 * (dimension + 1))
+        return cls(path, num_equations, dimension, max_memory)
+
+    @classmethod
+    def from_rows(cls, path, rows, dimension, max_memory=DEFAULT_MAX_MEMORY):
+        # rows is any iterable of (coefficients, constant), consumed lazily
+        num_equations = 0
+        with open(path, 'wb') as f:
+            for coefficients, constant in rows:
+                row = array('d', coefficients)
+                if len(row) != dimension:
+                    raise Exception(cls.ALL_ROWS_MUST_BE_IN_SAME_DIM_MSG)
+                row.append(constant)
+                row.tofile(f)
+                num_equations += 1
+        return cls(path, num_equations, dimension, max_memory)
+
+    @classmethod
+    def from_planes(cls, path, planes, max_memory=DEFAULT_MAX_MEMORY):
+        planes = iter(planes)
+        first = next(planes)
+        rows = ((p.normal_vector.coordinates, p.constant_term) for p in _chain(first, planes))
+        return cls.from_rows(path, rows, first.dimension, max_memory)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.num_equations
+
+
+    def read_row(self, i):
+        row = array('d')
+        row.frombytes(os.pread(self._fd, self.row_bytes, i * self.row_bytes))
+        return row
+
+    def write_row(self, i, row):
+        os.pwrite(self._fd, array('d', row).tobytes(), i * self.row_bytes)
+
+    def _tiles(self):
+        for start in range(0, self.num_equations, self.tile_rows):
+            yield start, min(start + self.tile_rows, self.num_equations)
+
+    def _map(self, start, end):
+        # mmap offsets must be aligned, so map from the aligned offset and
+        # return the index of row start inside the float64 view
+        offset = start * self.row_bytes
+        aligned = offset - offset % mmap.ALLOCATIONGRANULARITY
+        mm = mmap.mmap(self._fd, end * self.row_bytes - aligned, offset=aligned)
+        view = memoryview(mm).cast('d')
+        return mm, view, (offset - aligned) // 8
+
+    def _read_panel(self, first_row, c0, c1):
+        # columns c0..c1 of rows first_row.. as one flat row-major array, in
+        # one pass
+        panel = array('d')
+        w = self.width
+        self.passes += 1
+        for start, end in self._tiles():
+            if end <= first_row:
+                continue
+            mm, view, base = self._map(start, end)
+            try:
+                for i in range(max(start, first_row), end):
+                    offset = base + (i - start) * w
+                    panel.extend(view[offset + c0:offset + c1])
+            finally:
+                view.release()
+                mm.close()
+        return panel
+
+    def _factor_panel(self, panel, first_row, c0, c1):
+        # partial pivoting on the panel in memory, in place: the rows (in
+        # pivot order) and columns that sequential Gauss-Jordan would pick
+        b = c1 - c0
+        count = len(panel) // b
+        order = array('q', range(first_row, first_row + count))
+        pivots = []
+        r = 0
+        for j in range(b):
+            if r >= count:
+                break
+            best = max(range(r, count), key=lambda k: abs(panel[k * b + j]))
+            if abs(panel[best * b + j]) < ZERO_TOLERANCE:
+                continue
+            if best != r:
+                top = panel[best * b:(best + 1) * b]
+                panel[best * b:(best + 1) * b] = panel[r * b:(r + 1) * b]
+                panel[r * b:(r + 1) * b] = top
+                order[r], order[best] = order[best], order[r]
+            top = panel[r * b + j:(r + 1) * b]
+            scale = 1. / top[0]
+            for k in range(r + 1, count):
+                coeff = panel[k * b + j] * scale
+                if coeff != 0.:
+                    start = k * b + j
+                    end = (k + 1) * b
+                    panel[start:end] = array('d', [y - coeff * x for x, y in zip(top, panel[start:end])])
+            pivots.append((order[r], c0 + j))
+            r += 1
+        return pivots
+
+    def _pivot_rows(self, pivots, c0):
+        # the chosen rows reduced against each other so that pivot row k has
+        # a 1 in pivot column k and 0 in the others; every other row then
+        # reduces to row - sum(row[column_k] * pivot row k)
+        rows = [self.read_row(i) for i, j in pivots]
+        columns = [j for i, j in pivots]
+        for k, col in enumerate(columns):
+            best = max(range(k, len(rows)), key=lambda r: abs(rows[r][col]))
+            rows[k], rows[best] = rows[best], rows[k]
+            top = rows[k]
+            scale = 1. / top[col]
+            top[c0:] = array('d', [x * scale for x in top[c0:]])
+            for r, other in enumerate(rows):
+                coeff = other[col]
+                if r != k and coeff != 0.:
+                    other[c0:] = array('d', [y - coeff * x for x, y in zip(top[c0:], other[c0:])])
+        for k, row in enumerate(rows):
+            for l, col in enumerate(columns):
+                row[col] = 1. if k == l else 0.
+        return rows
+
+    def compute_rref(self):
+        # blocked Gauss-Jordan with partial pivoting, in place on disk. The
+        # pivots of panel_columns columns at a time are found in memory, then
+        # one streaming pass over the tiles applies the whole panel to every
+        # other row and gathers the next panel, so the file is read about
+        # dimension / panel_columns times.
+        m = self.num_equations
+        n = self.dimension
+        w = self.width
+        b = self.panel_columns
+
+        row = 0
+        c0 = 0
+        panel = self._read_panel(0, 0, min(b, n)) if n else None
+        while c0 < n and row < m:
+            c1 = min(c0 + b, n)
+            pivots = self._factor_panel(panel, row, c0, c1)
+            panel = None
+            c2 = min(c1 + b, n)
+            if not pivots:
+                panel = self._read_panel(row, c1, c2)
+                c0 = c1
+                continue
+
+            tops = self._pivot_rows(pivots, c0)
+            tails = [top[c0:] for top in tops]
+            columns = [j for i, j in pivots]
+            chosen = set([i for i, j in pivots])
+            q = len(pivots)
+            # pivot row k moves to row + k, and the other rows there take
+            # the places the pivot rows leave
+            targets = range(row, row + q)
+            displaced = [i for i in targets if i not in chosen]
+            vacated = [i for i, j in pivots if i >= row + q]
+            moves = dict(zip(displaced, vacated))
+
+            # the next panel holds columns c1..c2 of rows row + q.., which
+            # is where the rows of this pass end up
+            next_width = c2 - c1
+            panel = array('d', [0.]) * ((m - row - q) * next_width)
+            self.passes += 1
+            for start, end in self._tiles():
+                mm, view, base = self._map(start, end)
+                try:
+                    for i in range(start, end):
+                        if i in chosen:
+                            continue
+                        offset = base + (i - start) * w
+                        tail = view[offset + c0:offset + w].tolist()
+                        for col, top in zip(columns, tails):
+                            coeff = tail[col - c0]
+                            if coeff != 0.:
+                                tail = list(map(sub, tail, [coeff * x for x in top]))
+                        for col in columns:
+                            tail[col - c0] = 0.
+                        view[offset + c0:offset + w] = array('d', tail)
+                        final = moves.get(i, i)
+                        if final >= row + q:
+                            k = (final - row - q) * next_width
+                            panel[k:k + next_width] = array('d', tail[c1 - c0:c2 - c0])
+                finally:
+                    view.release()
+                    mm.close()
+
+            for i, j in moves.items():
+                self.write_row(j, self.read_row(i))
+            for k, top in enumerate(tops):
+                self.write_row(row + k, top)
+            row += q
+            c0 = c1
+        return self
+
+    def indices_of_first_nonzero_terms_in_each_row(self):
+        # an array('q'), 8 bytes per row, with -1 for rows of zeros
+        indices = array('q')
+        for start, end in self._tiles():
+            mm, view, base = self._map(start, end)
+            try:
+                for i in range(start, end):
+                    offset = base + (i - start) * self.width
+                    index = -1
+                    for j in range(self.dimension):
+                        if abs(view[offset + j]) >= ZERO_TOLERANCE:
+                            index = j
+                            break
+                    indices.append(index)
+            finally:
+                view.release()
+                mm.close()
+        return indices
+
+    def find_solutions(self, solution_path=None):
+        # reduces the file to RREF in place; a unique solution is also written
+        # to solution_path as raw float64 values when given
+        self.compute_rref()
+        n = self.dimension
+        pivot_indices = self.indices_of_first_nonzero_terms_in_each_row()
+
+        rank = 0
+        for i, j in enumerate(pivot_indices):
+            if j == -1:
+                if abs(self.read_row(i)[n]) >= ZERO_TOLERANCE:
+                    return self.NO_SOLUTIONS_MSG
+            else:
+                rank += 1
+
+        if rank != n:
+            return self.paramatrize_infinite_solutions(pivot_indices)
+
+        solution = array('d', [0.]) * n
+        for i, j in enumerate(pivot_indices):
+            if j != -1:
+                solution[j] = self.read_row(i)[n]
+        if solution_path is not None:
+            with open(solution_path, 'wb') as f:
+                solution.tofile(f)
+        return solution.tolist()
+
+    def paramatrize_infinite_solutions(self, pivot_indices=None):
+        # the basepoint and directions are built straight into float64
+        # arrays, reading each pivot row once
+        if pivot_indices is None:
+            pivot_indices = self.indices_of_first_nonzero_terms_in_each_row()
+        n = self.dimension
+        is_pivot = bytearray(n)
+        for j in pivot_indices:
+            if j != -1:
+                is_pivot[j] = 1
+        free_indices = [j for j in range(n) if not is_pivot[j]]
+
+        basepoint = array('d', [0.]) * n
+        direction_coords = [array('d', [0.]) * n for _ in free_indices]
+        for k, free in enumerate(free_indices):
+            direction_coords[k][free] = 1.
+        for i, j in enumerate(pivot_indices):
+            if j != -1:
+                row = self.read_row(i)
+                basepoint[j] = row[n]
+                for k, free in enumerate(free_indices):
+                    direction_coords[k][j] = -row[free]
+
+        return Parametrization(Vector(basepoint), [Vector(v) for v in direction_coords])
+
+
+def _chain(first, rest):
+    yield first
+    for x in rest:
+        yield x
+
+
+if __name__ == '__main__':
+    import random
+    import tempfile
+    from dense import DenseSystem
+
+    rng = random.Random(0)
+    n = 23
+    rows = [[rng.uniform(-1, 1) for _ in range(n)] for _ in range(n)]
+    constants = [rng.uniform(-1, 1) for _ in range(n)]
+    expected = DenseSystem.from_rows(rows, constants).find_solutions()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'system.bin')
+        solution_path = os.path.join(directory, 'solution.bin')
+        # a small budget forces panels of a few columns and small tiles
+        max_memory = mmap.ALLOCATIONGRANULARITY + 6000
+        with OutOfCoreSystem.from_rows(path, zip(rows, constants), n, max_memory) as s:
+            if not (s.panel_columns == 3 and s.tile_rows == 9 and
+                    s.tile_rows * s.row_bytes + s.panel_columns * (8 * n + 2 * s.row_bytes) + 8 * n +
+                    3 * LIST_FLOAT_BYTES * s.width + mmap.ALLOCATIONGRANULARITY <= max_memory):
+                print('test case 1 failed')
+            x = s.find_solutions(solution_path)
+            saved = array('d')
+            with open(solution_path, 'rb') as f:
+                saved.fromfile(f, n)
+            # one pass to read the first panel, then one per panel
+            if not (all(abs(a - b) < 1e-9 for a, b in zip(x, expected)) and list(saved) == x and
+                    s.passes == 1 + (n + s.panel_columns - 1) // s.panel_columns):
+                print('test case 2 failed')
+
+        from plane import Plane
+        planes = [Plane(Vector([1,1,1]), 1), Plane(Vector([0,1,1]), 2)]
+        with OutOfCoreSystem.from_planes(path, planes, max_memory=2 ** 14) as s:
+            param = s.find_solutions()
+            if not (param.basepoint == Vector([-1,2,0]) and
+                    param.direction_vectors == [Vector([0,-1,1])]):
+                print('test case 3 failed')
+
+        planes = [Plane(Vector([1,1,1]), 1), Plane(Vector([1,1,1]), 2)]
+        with OutOfCoreSystem.from_planes(path, planes, max_memory=2 ** 14) as s:
+            if s.find_solutions() != OutOfCoreSystem.NO_SOLUTIONS_MSG:
+                print('test case 4 failed')
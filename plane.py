@@ -6,6 +6,8 @@ class Plane(object):
 
     def __init__(self, normal_vector=None, constant_term=None):
         self.dimension = 3
+        if normal_vector:
+            self.dimension = normal_vector.dimension
 
         if not normal_vector:
             all_zeros = [0]*self.dimension
@@ -39,7 +41,12 @@ class Plane(object):
 
 
     def __str__(self):
+        return Plane.format_equation(enumerate(self.normal_vector.coordinates), self.constant_term)
 
+
+    @staticmethod
+    def format_equation(terms, constant_term):
+        # terms are (index, coefficient) pairs in index order; zeros may be left out
         num_float_places = 3
 
         def write_coefficient(coefficient, is_initial_term=False):
@@ -62,26 +69,24 @@ class Plane(object):
 
             return output
 
-        n = self.normal_vector
-
-        try:
-            initial_index = self.first_nonzero_index(n)
-            terms = [write_coefficient(n[i], is_initial_term=(i==initial_index)) + 'x_{}'.format(i+1)
-                     for i in range(self.dimension) if round(n[i], num_float_places) != 0]
-            output = ' '.join(terms)
-
-        except Exception as e:
-            if str(e) == self.NO_NONZERO_ELTS_FOUND_MSG:
-                output = '0'
-            else:
-                raise e
-
-        constant = round(self.constant_term, num_float_places)
+        output_terms = []
+        found_initial_term = False
+        for i, coefficient in terms:
+            is_initial_term = not found_initial_term and not MyFloat(coefficient).is_near_zero()
+            if is_initial_term:
+                found_initial_term = True
+            if round(coefficient, num_float_places) != 0:
+                output_terms.append(write_coefficient(coefficient, is_initial_term) + 'x_{}'.format(i+1))
+
+        if found_initial_term:
+            output = ' '.join(output_terms)
+        else:
+            output = '0'
+
+        constant = round(constant_term, num_float_places)
         if constant % 1 == 0:
             constant = int(constant)
-        output += ' = {}'.format(constant)
-
-        return output
+        return output + ' = {}'.format(constant)
 
 
     @staticmethod
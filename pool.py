@@ -0,0 +1,147 @@
+from array import array
+from concurrent.futures import wait
+from multiprocessing import shared_memory
+from dense import DenseSystem
+import procpool
+
+
+def _pack(systems):
+    # (offset, num_equations, dimension) of each system's augmented matrix
+    # inside one flat float64 buffer, in the DenseSystem layout
+    shapes = []
+    offset = 0
+    for s in systems:
+        num_equations = len(s)
+        shapes.append((offset, num_equations, s.dimension))
+        offset += num_equations * (s.dimension + 1)
+    return shapes, offset
+
+
+def _write(view, system, offset):
+    if isinstance(system, DenseSystem):
+        view[offset:offset + len(system.buffer)] = array('d', system.buffer)
+        return
+    w = system.dimension + 1
+    for i, p in enumerate(system.planes):
+        row = array('d', p.normal_vector.coordinates)
+        row.append(p.constant_term)
+        view[offset + i * w:offset + (i + 1) * w] = row
+
+
+def _reduce(view, shapes):
+    for offset, num_equations, dimension in shapes:
+        rows = view[offset:offset + num_equations * (dimension + 1)]
+        DenseSystem(num_equations, dimension, rows).compute_rref(inplace=True)
+        rows.release()
+
+
+def _reduce_shared(name, shapes):
+    # process pool entry point: reduces each system of the chunk to RREF in
+    # place in the shared buffer, so nothing but the shapes is pickled
+    shm = shared_memory.SharedMemory(name=name)
+    view = shm.buf.cast('d')
+    try:
+        _reduce(view, shapes)
+    finally:
+        view.release()
+        shm.close()
+
+
+def _solutions(view, shapes):
+    results = []
+    for offset, num_equations, dimension in shapes:
+        rows = view[offset:offset + num_equations * (dimension + 1)]
+        results.append(DenseSystem(num_equations, dimension, rows).solutions_from_rref())
+        rows.release()
+    return results
+
+
+def solve_many(systems, workers=None, chunksize=None):
+    # solves independent systems (LinearSystem, DenseSystem or anything with
+    # planes) across a shared process pool. All augmented matrices are
+    # copied into one shared memory buffer, the workers reduce them to RREF
+    # in place, and the solutions are read back from the same buffer.
+    # Results are yielded in input order as soon as each chunk is done. With
+    # workers=None a batch with little work in total is solved in this
+    # process.
+    systems = list(systems)
+    shapes, size = _pack(systems)
+    if workers is None:
+        work = sum([procpool.elimination_work(m, n) for offset, m, n in shapes])
+        workers = procpool.default_workers() if work >= procpool.MIN_PARALLEL_WORK else 1
+    if chunksize is None:
+        chunksize = max(1, len(systems) // (4 * workers))
+    chunks = [shapes[i:i + chunksize] for i in range(0, len(shapes), chunksize)]
+
+    if workers == 1 or len(chunks) <= 1:
+        for system, (offset, num_equations, dimension) in zip(systems, shapes):
+            buffer = array('d', bytes(8 * num_equations * (dimension + 1)))
+            _write(buffer, system, 0)
+            yield DenseSystem(num_equations, dimension, buffer).compute_rref(inplace=True).solutions_from_rref()
+        return
+
+    shm = shared_memory.SharedMemory(create=True, size=max(8, 8 * size))
+    view = shm.buf.cast('d')
+    futures = []
+    try:
+        for system, (offset, num_equations, dimension) in zip(systems, shapes):
+            _write(view, system, offset)
+        futures = [procpool.submit(workers, _reduce_shared, shm.name, chunk) for chunk in chunks]
+        for future, chunk in zip(futures, chunks):
+            future.result()
+            for result in _solutions(view, chunk):
+                yield result
+    finally:
+        # also reached when the caller stops iterating early: the pool is
+        # shared, so only this call's chunks are dropped, and the buffer is
+        # freed once the running ones are done with it
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        view.release()
+        shm.close()
+        shm.unlink()
+
+
+if __name__ == '__main__':
+    import random
+    from vector import Vector
+    from plane import Plane
+    from parametrization import Parametrization
+    from linsys import LinearSystem
+
+    rng = random.Random(0)
+    systems = []
+    for k in range(40):
+        n = rng.randint(2, 6)
+        systems.append(LinearSystem([Plane(Vector([rng.uniform(-5, 5) for _ in range(n)]), rng.uniform(-5, 5))
+                                     for _ in range(n)]))
+    systems.append(LinearSystem([Plane(Vector([1,1,1]), 1), Plane(Vector([1,1,1]), 2)]))
+    systems.append(LinearSystem([Plane(Vector([1,1,1]), 1), Plane(Vector([0,1,1]), 2)]))
+    systems.append(systems[0].to_dense())
+    # DenseSystem is the reference, since solve_many reduces the same layout
+    expected = [(s if isinstance(s, DenseSystem) else s.to_dense()).find_solutions() for s in systems]
+
+    def same(a, b):
+        if isinstance(a, Parametrization):
+            return (isinstance(b, Parametrization) and a.basepoint == b.basepoint and
+                    a.direction_vectors == b.direction_vectors)
+        if isinstance(a, str):
+            return a == b
+        return all(abs(x - y) < 1e-9 * max(1, abs(x)) for x, y in zip(a, b))
+
+    for case, (workers, chunksize) in enumerate([(1, None), (2, None), (3, 4)]):
+        results = list(solve_many(systems, workers, chunksize))
+        if not (len(results) == len(systems) and all(same(a, b) for a, b in zip(expected, results))):
+            print('test case {} failed'.format(case + 1))
+
+    # stopping early drops the remaining chunks and frees the shared buffer;
+    # the pool stays up for the next call
+    it = solve_many(systems, workers=2, chunksize=2)
+    if not same(next(it), expected[0]):
+        print('test case 4 failed')
+    it.close()
+    pool = procpool.get_pool(2)
+    if not (all(same(a, b) for a, b in zip(expected, solve_many(systems, 2, 2))) and
+            procpool.get_pool(2) is pool):
+        print('test case 5 failed')
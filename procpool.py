@@ -0,0 +1,68 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# with workers=None, a solve stays in this process unless it has at least
+# this much elimination work (about rows * columns * pivots multiply-adds);
+# below it starting or feeding worker processes costs more than it saves
+MIN_PARALLEL_WORK = 10 ** 5
+
+# process pools shared by every parallel solver, one per worker count. They
+# are started on first use, kept for later calls and shut down at exit.
+_pools = {}
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def elimination_work(num_equations, dimension):
+    return num_equations * dimension * min(num_equations, dimension)
+
+
+def get_pool(workers):
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return pool
+
+
+def _replace_pool(workers):
+    # a pool whose worker died refuses every new task with BrokenProcessPool
+    _pools.pop(workers).shutdown(wait=False)
+    return get_pool(workers)
+
+
+def submit(workers, fn, *args):
+    # fn(*args) on the shared pool, replacing the pool once if it is broken
+    try:
+        return get_pool(workers).submit(fn, *args)
+    except BrokenProcessPool:
+        return _replace_pool(workers).submit(fn, *args)
+
+
+def map_tasks(workers, fn, tasks, chunksize=1):
+    # pool.map over tasks (a list, so it can be submitted again) on the
+    # shared pool, replacing the pool once if it is broken
+    try:
+        return get_pool(workers).map(fn, tasks, chunksize=chunksize)
+    except BrokenProcessPool:
+        return _replace_pool(workers).map(fn, tasks, chunksize=chunksize)
+
+
+if __name__ == '__main__':
+    if not (get_pool(2) is get_pool(2) and get_pool(2) is not get_pool(3)):
+        print('test case 1 failed')
+    if submit(2, elimination_work, 3, 4).result() != 36:
+        print('test case 2 failed')
+
+    # a worker that dies breaks the pool; the next task gets a new one
+    broken = get_pool(2)
+    try:
+        submit(2, os._exit, 1).result()
+        print('test case 3 failed')
+    except BrokenProcessPool:
+        pass
+    if not (list(map_tasks(2, abs, [-1, -2])) == [1, 2] and get_pool(2) is not broken and
+            submit(2, elimination_work, 2, 2).result() == 8):
+        print('test case 3 failed')
@@ -0,0 +1,189 @@
+from decimal import Decimal
+from fractions import Fraction
+from exact import to_integer_rows
+from batch import UNIQUE_SOLUTION_MSG, NO_SOLUTIONS_MSG, INF_SOLUTIONS_MSG
+
+# primes below 2^31, so products of two residues fit in a machine word
+PRIMES = [2147483647, 2147483629, 2147483587]
+
+EPSILON = 2. ** -52
+
+
+def is_exact(planes):
+    # Decimals are exact too; to_integer_rows reads them without rounding
+    for p in planes:
+        if not isinstance(p.constant_term, (int, Fraction, Decimal)):
+            return False
+        for x in p.normal_vector.coordinates:
+            if not isinstance(x, (int, Fraction, Decimal)):
+                return False
+    return True
+
+
+def modular_ranks(rows, dimension, prime, stop_on_inconsistency=False):
+    # returns (rank of A, rank of [A|b]) mod prime. Each row is reduced
+    # against the pivot rows found so far, so a 0 = c row is seen as soon as
+    # it is reached and can end the scan.
+    pivot_rows = []
+    pivot_cols = []
+    inconsistent = False
+    for original in rows:
+        row = [x % prime for x in original]
+        for pivot_row, col in zip(pivot_rows, pivot_cols):
+            coeff = row[col]
+            if coeff:
+                row = [(x - coeff * y) % prime for x, y in zip(row, pivot_row)]
+
+        lead = -1
+        for j in range(dimension):
+            if row[j]:
+                lead = j
+                break
+        if lead == -1:
+            if row[dimension] and not inconsistent:
+                inconsistent = True
+                if stop_on_inconsistency:
+                    break
+            continue
+
+        inverse = pow(row[lead], prime - 2, prime)
+        pivot_rows.append([(x * inverse) % prime for x in row])
+        pivot_cols.append(lead)
+
+    rank_a = len(pivot_rows)
+    return rank_a, rank_a + (1 if inconsistent else 0)
+
+
+def float_ranks(planes, stop_on_inconsistency=False):
+    # LU with complete pivoting restricted to the columns of A, which reveals
+    # the numerical rank: elimination stops once every remaining entry is
+    # below tolerance, relative to the largest entry of A. Like the modular
+    # scan, a 0 = c row met during the pivot search can end it early.
+    dimension = planes[0].dimension
+    # mixed inputs (e.g. Decimal next to float) are all read as floats
+    rows = [[float(x) for x in p.normal_vector.coordinates] + [float(p.constant_term)] for p in planes]
+    num_eq = len(rows)
+    scale = max([abs(x) for r in rows for x in r[:dimension]] + [0.])
+    tolerance = max(num_eq, dimension) * EPSILON * scale
+
+    def b_tolerance():
+        return max(num_eq, dimension) * EPSILON * max([abs(r[dimension]) for r in rows] + [scale])
+
+    cols = list(range(dimension))
+    rank_a = 0
+    while rank_a < min(num_eq, dimension):
+        best = 0.
+        pivot_row = pivot_col = -1
+        for i in range(rank_a, num_eq):
+            row_best = 0.
+            for k in range(rank_a, dimension):
+                val = abs(rows[i][cols[k]])
+                if val > row_best:
+                    row_best = val
+                if val > best:
+                    best = val
+                    pivot_row = i
+                    pivot_col = k
+            if (stop_on_inconsistency and row_best <= tolerance and
+                    abs(rows[i][dimension]) > b_tolerance()):
+                return rank_a, rank_a + 1
+        if best <= tolerance:
+            break
+        rows[rank_a], rows[pivot_row] = rows[pivot_row], rows[rank_a]
+        cols[rank_a], cols[pivot_col] = cols[pivot_col], cols[rank_a]
+
+        top = rows[rank_a]
+        pivot = top[cols[rank_a]]
+        for i in range(rank_a + 1, num_eq):
+            factor = rows[i][cols[rank_a]] / pivot
+            if factor != 0.:
+                rows[i] = [y - factor * x for x, y in zip(top, rows[i])]
+        rank_a += 1
+
+    b_tol = b_tolerance()
+    for r in rows[rank_a:]:
+        if abs(r[dimension]) > b_tol:
+            return rank_a, rank_a + 1
+    return rank_a, rank_a
+
+
+def ranks(planes, stop_on_inconsistency=False):
+    dimension = planes[0].dimension
+    if not is_exact(planes):
+        return float_ranks(planes, stop_on_inconsistency)
+
+    # a prime can only lower a rank, so the largest rank of A and of [A|b]
+    # over a few primes are the true ranks unless every prime divides the
+    # same minor. A prime that stopped at a 0 = c row has only counted the
+    # rows before it, so its own pair is returned as is.
+    rows = to_integer_rows(planes)
+    rank_a = rank_ab = -1
+    for prime in PRIMES:
+        a, ab = modular_ranks(rows, dimension, prime, stop_on_inconsistency)
+        if stop_on_inconsistency and ab > a:
+            return a, ab
+        rank_a = max(rank_a, a)
+        rank_ab = max(rank_ab, ab)
+    return rank_a, rank_ab
+
+
+def rank(planes):
+    return ranks(planes)[0]
+
+
+def classify(planes):
+    rank_a, rank_ab = ranks(planes, stop_on_inconsistency=True)
+    if rank_ab > rank_a:
+        return NO_SOLUTIONS_MSG
+    if rank_a == planes[0].dimension:
+        return UNIQUE_SOLUTION_MSG
+    return INF_SOLUTIONS_MSG
+
+
+if __name__ == '__main__':
+    from vector import Vector
+    from plane import Plane
+
+    p1 = Plane(normal_vector=Vector([0,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,-1,1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1,2,-5]), constant_term=3)
+    if not (rank([p1,p2,p3]) == 3 and classify([p1,p2,p3]) == UNIQUE_SOLUTION_MSG):
+        print('test case 1 failed')
+
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,1,1]), constant_term=2)
+    if not (rank([p1,p2]) == 1 and classify([p1,p2]) == NO_SOLUTIONS_MSG):
+        print('test case 2 failed')
+
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0,1,1]), constant_term=2)
+    if classify([p1,p2]) != INF_SOLUTIONS_MSG:
+        print('test case 3 failed')
+
+    p1 = Plane(Vector([0.935, 1.76, -9.365]), -9.955)
+    p2 = Plane(Vector([0.187, 0.352, -1.873]), -1.991)
+    p3 = Plane(Vector([0.374, 0.704, -3.746]), -3.982)
+    p4 = Plane(Vector([-0.561, -1.056, 5.619]), 5.973)
+    if not (rank([p1,p2,p3,p4]) == 1 and classify([p1,p2,p3,p4]) == INF_SOLUTIONS_MSG):
+        print('test case 4 failed')
+
+    p1 = Plane(Vector([Fraction(1, 3), Fraction(2, 3), 1]), 1)
+    p2 = Plane(Vector([1, 2, 3]), 4)
+    if classify([p1,p2]) != NO_SOLUTIONS_MSG:
+        print('test case 5 failed')
+
+    from decimal import Decimal
+    p1 = Plane(Vector([Decimal('0.1'), Decimal('0.2')]), Decimal('0.3'))
+    p2 = Plane(Vector([Decimal('0.2'), Decimal('0.4')]), Decimal('0.7'))
+    p3 = Plane(Vector([Decimal('0.2'), 0.5]), Decimal('0.6'))
+    if not (classify([p1,p2]) == NO_SOLUTIONS_MSG and ranks([p1,p2]) == (1, 2) and
+            ranks([p1,p3]) == (2, 2)):
+        print('test case 6 failed')
+
+    # the float scan stops at the first 0 = c row it meets
+    p1 = Plane(Vector([1., 1.]), 1.)
+    p2 = Plane(Vector([0., 0.]), 1.)
+    p3 = Plane(Vector([1., 2.]), 1.)
+    if not (float_ranks([p1,p2,p3], stop_on_inconsistency=True) == (0, 1) and
+            float_ranks([p1,p2,p3]) == (2, 3) and classify([p1,p2,p3]) == NO_SOLUTIONS_MSG):
+        print('test case 7 failed')
@@ -0,0 +1,127 @@
+from math import isfinite
+from lu import LUFactorization
+
+# normwise backward error to reach, a few units of float64 roundoff
+DEFAULT_TOL = 1e-15
+DEFAULT_MAX_ITER = 10
+# an iteration has to cut the backward error at least this much, otherwise
+# refinement has stagnated (usually at the float64 noise floor)
+STAGNATION_FACTOR = 0.5
+# stagnating above this backward error counts as failure, like divergence
+FALLBACK_ERROR = 1e-12
+
+
+class RefinementResult(object):
+
+    def __init__(self, solution, iterations, backward_error, converged, fell_back):
+        self.solution = solution
+        self.iterations = iterations
+        self.backward_error = backward_error
+        self.converged = converged
+        # True when the float32 factors were given up for a float64 solve
+        self.fell_back = fell_back
+
+    def __str__(self):
+        status = 'converged' if self.converged else 'did not converge'
+        precision = 'float64 fallback' if self.fell_back else 'float32 factors'
+        return '{} after {} iterations ({}), backward error {:.3e}'.format(
+            status, self.iterations, precision, self.backward_error)
+
+
+def _residual(a, n, x, b):
+    # b - Ax, accumulated in float64
+    return [bi - sum([a[i * n + j] * x[j] for j in range(n)]) for i, bi in enumerate(b)]
+
+
+def backward_error(a, n, x, b, r=None):
+    # ||b - Ax|| / (||A|| ||x|| + ||b||) in the infinity norm
+    if r is None:
+        r = _residual(a, n, x, b)
+    norm_a = max([sum([abs(v) for v in a[i * n:(i + 1) * n]]) for i in range(n)] or [0.])
+    norm_x = max([abs(v) for v in x] or [0.])
+    norm_b = max([abs(v) for v in b] or [0.])
+    denominator = norm_a * norm_x + norm_b
+    if denominator == 0.:
+        return 0.
+    return max([abs(v) for v in r] or [0.]) / denominator
+
+
+def mixed_precision_solve(coefficients, constants, dimension, tol=DEFAULT_TOL, max_iter=DEFAULT_MAX_ITER):
+    # LU in float32, then iterative refinement: the residual is formed in
+    # float64 and each correction is solved with the float32 factors. If the
+    # float32 factorization fails, or refinement diverges or stalls far from
+    # the tolerance, the system is solved again with float64 factors.
+    n = dimension
+    a = coefficients
+    b = list(constants)
+
+    try:
+        factors = LUFactorization(a, n, typecode='f')
+        x = factors.solve(b)
+    except Exception as e:
+        if str(e) != LUFactorization.MATRIX_IS_SINGULAR_MSG:
+            raise e
+        x = None
+
+    iterations = 0
+    if x is not None:
+        r = _residual(a, n, x, b)
+        error = backward_error(a, n, x, b, r)
+        while isfinite(error) and error > tol and iterations < max_iter:
+            d = factors.solve(r)
+            candidate = [xi + di for xi, di in zip(x, d)]
+            r_candidate = _residual(a, n, candidate, b)
+            candidate_error = backward_error(a, n, candidate, b, r_candidate)
+            iterations += 1
+            if not isfinite(candidate_error) or candidate_error > error:
+                # diverging: the float32 factors are too inaccurate here
+                error = float('nan')
+                break
+            stagnated = candidate_error > STAGNATION_FACTOR * error
+            x, r, error = candidate, r_candidate, candidate_error
+            if stagnated:
+                break
+        if isfinite(error) and error <= max(tol, FALLBACK_ERROR):
+            return RefinementResult(x, iterations, error, error <= tol, False)
+
+    x = LUFactorization(a, n).solve(b)
+    error = backward_error(a, n, x, b)
+    return RefinementResult(x, iterations, error, error <= tol, True)
+
+
+if __name__ == '__main__':
+    import random
+    from array import array
+
+    rng = random.Random(0)
+    n = 30
+    a = array('d', [rng.uniform(-1, 1) for _ in range(n * n)])
+    for i in range(n):
+        a[i * n + i] += n
+    b = [rng.uniform(-1, 1) for _ in range(n)]
+
+    result = mixed_precision_solve(a, b, n)
+    plain = LUFactorization(a, n, typecode='f').solve(b)
+    if not (result.converged and not result.fell_back and 1 <= result.iterations <= 4 and
+            result.backward_error <= DEFAULT_TOL and backward_error(a, n, plain, b) > 1e-10):
+        print('test case 1 failed')
+
+    # entries beyond the float32 range overflow the float32 factors
+    big = array('d', [1e300, 1, 1, 1e300])
+    result = mixed_precision_solve(big, [1e300, 1e300], 2)
+    if not (result.fell_back and all(abs(v - 1) < 1e-12 for v in result.solution)):
+        print('test case 2 failed')
+
+    # too ill-conditioned for float32 factors to make refinement converge
+    hilbert = array('d', [1. / (i + j + 1) for i in range(8) for j in range(8)])
+    result = mixed_precision_solve(hilbert, [1.] * 8, 8)
+    if not (result.fell_back and result.backward_error < 1e-14 and
+            result.backward_error == backward_error(hilbert, 8, result.solution, [1.] * 8)):
+        print('test case 3 failed')
+
+    try:
+        mixed_precision_solve(array('d', [1, 2, 2, 4]), [1, 2], 2)
+        print('test case 4 failed')
+    except Exception as e:
+        if str(e) != LUFactorization.MATRIX_IS_SINGULAR_MSG:
+            print('test case 4 failed')
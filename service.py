@@ -0,0 +1,213 @@
+import asyncio
+from collections import deque
+from timeit import default_timer as timer
+from dense import DenseSystem
+from batch import (solve_batch, stack_equations, UNIQUE_SOLUTION, NO_SOLUTIONS,
+                   NO_SOLUTIONS_MSG)
+
+DEFAULT_WINDOW = 0.002
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_PENDING = 10000
+# batches with fewer coefficients than this are solved on the event loop,
+# larger ones in the executor
+DEFAULT_INLINE_LIMIT = 2000
+LATENCY_SAMPLES = 1000
+
+QUEUE_FULL_MSG = 'Too many systems are pending'
+SOLVER_CLOSED_MSG = 'The solver is closed'
+
+
+def solve_group(coeffs, consts):
+    # one result per system, in the same form as find_solutions. Systems
+    # with infinitely many solutions are rare, so only they get a full RREF
+    # for their parametrization.
+    classes, solutions = solve_batch(coeffs, consts)
+    n = len(coeffs[0][0]) if coeffs else 0
+    results = []
+    for k, code in enumerate(classes):
+        if code == UNIQUE_SOLUTION:
+            results.append(list(solutions[k * n:(k + 1) * n]))
+        elif code == NO_SOLUTIONS:
+            results.append(NO_SOLUTIONS_MSG)
+        else:
+            results.append(DenseSystem.from_rows(coeffs[k], consts[k]).find_solutions())
+    return results
+
+
+class AsyncSolver(object):
+    # asyncio front end: concurrent solve() calls are collected for up to
+    # `window` seconds, grouped by shape and solved with one solve_batch per
+    # group. At most max_pending systems are in flight; further callers wait
+    # (or get an exception with block=False).
+
+    def __init__(self, window=DEFAULT_WINDOW, max_batch=DEFAULT_MAX_BATCH,
+                 max_pending=DEFAULT_MAX_PENDING, executor=None, inline_limit=DEFAULT_INLINE_LIMIT):
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.executor = executor
+        self.inline_limit = inline_limit
+
+        self._slots = asyncio.Semaphore(max_pending)
+        self._groups = {}
+        self._timer = None
+        self._tasks = set()
+        self._closed = False
+
+        self.started = timer()
+        self.requests = 0
+        self.completed = 0
+        self.batches = 0
+        self.executor_batches = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    async def solve(self, system, block=True):
+        # system is a LinearSystem or a list of Lines or Planes
+        if self._closed:
+            raise Exception(SOLVER_CLOSED_MSG)
+        if not block and self._slots.locked():
+            raise Exception(QUEUE_FULL_MSG)
+        async with self._slots:
+            coeffs, consts = stack_equations([system])
+            key = (len(coeffs[0]), len(coeffs[0][0]))
+            future = asyncio.get_running_loop().create_future()
+            self.requests += 1
+            group = self._groups.setdefault(key, [])
+            group.append((coeffs[0], consts[0], future, timer()))
+            if len(group) >= self.max_batch:
+                self._dispatch(self._groups.pop(key))
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+            return await future
+
+    def _flush(self):
+        self._timer = None
+        groups = self._groups
+        self._groups = {}
+        for group in groups.values():
+            self._dispatch(group)
+
+    def _dispatch(self, group):
+        task = asyncio.get_running_loop().create_task(self._run(group))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group):
+        coeffs = [item[0] for item in group]
+        consts = [item[1] for item in group]
+        self.batches += 1
+        try:
+            if len(coeffs) * len(coeffs[0]) * len(coeffs[0][0]) < self.inline_limit:
+                results = solve_group(coeffs, consts)
+            else:
+                self.executor_batches += 1
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, solve_group, coeffs, consts)
+        except Exception as e:
+            for item in group:
+                if not item[2].done():
+                    item[2].set_exception(e)
+            return
+
+        now = timer()
+        for (c, k, future, submitted), result in zip(group, results):
+            # a caller may have given up (cancelled) in the meantime
+            if not future.done():
+                future.set_result(result)
+            self.completed += 1
+            self._latencies.append(now - submitted)
+
+    async def close(self):
+        # solves what is still queued, then refuses new systems
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._flush()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def metrics(self):
+        latencies = sorted(self._latencies)
+
+        def percentile(q):
+            if not latencies:
+                return 0.
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        elapsed = timer() - self.started
+        return {
+            'requests': self.requests,
+            'completed': self.completed,
+            'pending': self.requests - self.completed,
+            'batches': self.batches,
+            'executor_batches': self.executor_batches,
+            'mean_batch_size': self.completed / self.batches if self.batches else 0.,
+            'throughput': self.completed / elapsed if elapsed > 0 else 0.,
+            'latency_p50': percentile(0.5),
+            'latency_p99': percentile(0.99),
+        }
+
+
+if __name__ == '__main__':
+    import random
+    from vector import Vector
+    from plane import Plane
+    from line import Line
+    from parametrization import Parametrization
+    from linsys import LinearSystem
+
+    async def clients():
+        # an in-process stand-in for a service: many concurrent callers
+        rng = random.Random(0)
+        systems = []
+        for k in range(300):
+            n = rng.choice([2, 3, 4])
+            systems.append(LinearSystem([Plane(Vector([rng.uniform(-5, 5) for _ in range(n)]),
+                                               rng.uniform(-5, 5)) for _ in range(n)]))
+        systems.append([Line(Vector([1, 1]), 2), Line(Vector([1, -1]), 0)])
+        systems.append(LinearSystem([Plane(Vector([1,1,1]), 1), Plane(Vector([1,1,1]), 2)]))
+        systems.append(LinearSystem([Plane(Vector([1,1,1]), 1), Plane(Vector([0,1,1]), 2)]))
+
+        async with AsyncSolver(window=0.01, max_batch=64, max_pending=100, inline_limit=500) as solver:
+            results = await asyncio.gather(*[solver.solve(s) for s in systems])
+            metrics = solver.metrics()
+
+        ok = True
+        for s, result in zip(systems[:300], results):
+            if not all(abs(a - b) < 1e-8 * max(1, abs(a)) for a, b in zip(s.to_dense().find_solutions(), result)):
+                ok = False
+        if not (ok and results[300] == [1., 1.]):
+            print('test case 1 failed')
+        if not (results[301] == NO_SOLUTIONS_MSG and isinstance(results[302], Parametrization) and
+                results[302].basepoint == Vector([-1, 2, 0])):
+            print('test case 2 failed')
+        # 303 systems in 4 shapes with batches of at most 64
+        if not (metrics['completed'] == 303 and metrics['pending'] == 0 and
+                4 <= metrics['batches'] < 303 and metrics['executor_batches'] > 0):
+            print('test case 3 failed')
+
+        solver = AsyncSolver(max_pending=1)
+        first = asyncio.ensure_future(solver.solve(systems[0]))
+        await asyncio.sleep(0)
+        try:
+            await solver.solve(systems[1], block=False)
+            print('test case 4 failed')
+        except Exception as e:
+            if str(e) != QUEUE_FULL_MSG:
+                print('test case 4 failed')
+        await first
+        await solver.close()
+        try:
+            await solver.solve(systems[1])
+            print('test case 5 failed')
+        except Exception as e:
+            if str(e) != SOLVER_CLOSED_MSG:
+                print('test case 5 failed')
+
+    asyncio.run(clients())
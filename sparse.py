@@ -0,0 +1,244 @@
+import heapq
+from vector import Vector
+from plane import Plane
+from parametrization import Parametrization
+
+ZERO_TOLERANCE = 1e-10
+# a pivot may be up to this many times smaller than the largest entry in its
+# column, which leaves room to pick the sparsest row
+PIVOT_THRESHOLD = 0.1
+
+
+class SparseLinearSystem(object):
+    # each row is a dict {column: coefficient} holding only the nonzero terms
+
+    ALL_PLANES_MUST_BE_IN_SAME_DIM_MSG = 'All planes in the system should live in the same dimension'
+    NO_SOLUTIONS_MSG = 'No solutions'
+    INF_SOLUTIONS_MSG = 'Infinitely many solutions'
+
+    def __init__(self, rows, constants, dimension):
+        self.rows = rows
+        self.constants = constants
+        self.dimension = dimension
+        # (row, col) pivots, filled in on systems produced by compute_rref
+        self.pivots = None
+
+    @classmethod
+    def from_planes(cls, planes):
+        d = planes[0].dimension
+        rows = []
+        constants = []
+        for p in planes:
+            if p.dimension != d:
+                raise Exception(cls.ALL_PLANES_MUST_BE_IN_SAME_DIM_MSG)
+            rows.append({j: x for j, x in enumerate(p.normal_vector.coordinates)
+                         if abs(x) >= ZERO_TOLERANCE})
+            constants.append(p.constant_term)
+        return cls(rows, constants, d)
+
+    def copy(self):
+        return SparseLinearSystem([dict(r) for r in self.rows], list(self.constants), self.dimension)
+
+    def nnz(self):
+        return sum(len(r) for r in self.rows)
+
+    def right_hand_side(self):
+        return list(self.constants)
+
+    def row_entries(self, row):
+        return self.rows[row].items()
+
+    def diagonal(self):
+        return [self.rows[i].get(i, 0.) for i in range(min(len(self.rows), self.dimension))]
+
+    def matvec(self, x):
+        return [sum([v * x[c] for c, v in row.items()]) for row in self.rows]
+
+    @property
+    def planes(self):
+        return [self[i] for i in range(len(self))]
+
+
+    def _eliminate(self):
+        # forward elimination with a minimum degree ordering: the next pivot
+        # column is always the one with the fewest nonzeros left among the
+        # unpivoted rows, counted on the matrix as fill appears. Returns the
+        # (row, col) pivots in elimination order.
+        rows = self.rows
+        col_rows = self._column_index()
+        heap = [(len(col_rows[c]), c) for c in range(self.dimension)]
+        heapq.heapify(heap)
+        done = [False] * self.dimension
+
+        pivots = []
+        while heap:
+            count, col = heapq.heappop(heap)
+            if done[col] or count != len(col_rows[col]):
+                continue
+            done[col] = True
+            candidates = list(col_rows[col])
+            if not candidates:
+                continue
+            largest = max(abs(rows[r][col]) for r in candidates)
+            if largest < ZERO_TOLERANCE:
+                continue
+            pivot_row = min((r for r in candidates if abs(rows[r][col]) >= PIVOT_THRESHOLD * largest),
+                            key=lambda r: len(rows[r]))
+
+            # col_rows only tracks the rows that are still unpivoted
+            top = rows[pivot_row]
+            for c in top:
+                col_rows[c].discard(pivot_row)
+            pivot = top[col]
+            for r in candidates:
+                if r == pivot_row:
+                    continue
+                self._add_multiple_of_row(-rows[r][col] / pivot, pivot_row, r, col_rows)
+                if col in rows[r]:
+                    del rows[r][col]
+                    col_rows[col].discard(r)
+            for c in top:
+                if not done[c]:
+                    heapq.heappush(heap, (len(col_rows[c]), c))
+            pivots.append((pivot_row, col))
+        return pivots
+
+    def _column_index(self):
+        col_rows = [set() for _ in range(self.dimension)]
+        for i, row in enumerate(self.rows):
+            for c in row:
+                col_rows[c].add(i)
+        return col_rows
+
+    def _add_multiple_of_row(self, coefficient, row_to_add, row_to_be_added_to, col_rows):
+        target = self.rows[row_to_be_added_to]
+        for c, v in self.rows[row_to_add].items():
+            value = target.get(c, 0.) + coefficient * v
+            if abs(value) < ZERO_TOLERANCE:
+                if c in target:
+                    del target[c]
+                    col_rows[c].discard(row_to_be_added_to)
+            else:
+                if c not in target:
+                    col_rows[c].add(row_to_be_added_to)
+                target[c] = value
+        self.constants[row_to_be_added_to] += coefficient * self.constants[row_to_add]
+
+    def compute_rref(self):
+        # the reduced system keeps the original row order; pivot rows are
+        # normalized and cleared from every other pivot row
+        system = self.copy()
+        pivots = system._eliminate()
+        rows = system.rows
+        col_rows = system._column_index()
+
+        for pivot_row, col in reversed(pivots):
+            scale = 1. / rows[pivot_row][col]
+            rows[pivot_row] = {c: v * scale for c, v in rows[pivot_row].items()}
+            rows[pivot_row][col] = 1.
+            system.constants[pivot_row] *= scale
+            for r in list(col_rows[col]):
+                if r == pivot_row:
+                    continue
+                system._add_multiple_of_row(-rows[r][col], pivot_row, r, col_rows)
+                if col in rows[r]:
+                    del rows[r][col]
+                    col_rows[col].discard(r)
+
+        system.pivots = pivots
+        return system
+
+    def find_solutions(self):
+        rref = self.compute_rref()
+        pivot_rows = set(r for r, c in rref.pivots)
+
+        for i, row in enumerate(rref.rows):
+            if i not in pivot_rows and not row and abs(rref.constants[i]) >= ZERO_TOLERANCE:
+                return self.NO_SOLUTIONS_MSG
+
+        if len(rref.pivots) != rref.dimension:
+            return rref.paramatrize_infinite_solutions()
+
+        solution = [0] * rref.dimension
+        for r, c in rref.pivots:
+            solution[c] = rref.constants[r]
+        return solution
+
+    def paramatrize_infinite_solutions(self):
+        rref = self if self.pivots is not None else self.compute_rref()
+        dimension = rref.dimension
+        free_indices = sorted(set(range(dimension)) - set(c for r, c in rref.pivots))
+        free_position = {f: k for k, f in enumerate(free_indices)}
+
+        basepoint = [0] * dimension
+        direction_coords = [[0] * dimension for _ in free_indices]
+        for f, k in free_position.items():
+            direction_coords[k][f] = 1
+        for r, c in rref.pivots:
+            basepoint[c] = rref.constants[r]
+            for f, v in rref.rows[r].items():
+                if f != c:
+                    direction_coords[free_position[f]][c] = -v
+
+        return Parametrization(Vector(basepoint), [Vector(v) for v in direction_coords])
+
+
+    def __len__(self):
+        return len(self.rows)
+
+
+    def __getitem__(self, i):
+        coords = [0] * self.dimension
+        for c, v in self.rows[i].items():
+            coords[c] = v
+        return Plane(normal_vector=Vector(coords), constant_term=self.constants[i])
+
+
+    def __setitem__(self, i, x):
+        if x.dimension != self.dimension:
+            raise Exception(self.ALL_PLANES_MUST_BE_IN_SAME_DIM_MSG)
+        self.rows[i] = {j: v for j, v in enumerate(x.normal_vector.coordinates)
+                        if abs(v) >= ZERO_TOLERANCE}
+        self.constants[i] = x.constant_term
+        self.pivots = None
+
+
+    def __str__(self):
+        ret = 'Sparse Linear System:\n'
+        temp = ['Equation {}: {}'.format(i+1, p) for i, p in enumerate(self.planes)]
+        ret += '\n'.join(temp)
+        return ret
+
+
+if __name__ == '__main__':
+    p1 = Plane(normal_vector=Vector([0,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,-1,1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1,2,-5]), constant_term=3)
+    s = SparseLinearSystem.from_planes([p1,p2,p3])
+    x = s.find_solutions()
+    if not all(abs(a - b) < 1e-10 for a, b in zip(x, [23/9, 7/9, 2/9])):
+        print('test case 1 failed')
+
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,1,1]), constant_term=2)
+    s = SparseLinearSystem.from_planes([p1,p2])
+    if s.find_solutions() != SparseLinearSystem.NO_SOLUTIONS_MSG:
+        print('test case 2 failed')
+
+    p1 = Plane(normal_vector=Vector([1,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([0,1,1]), constant_term=2)
+    s = SparseLinearSystem.from_planes([p1,p2])
+    param = s.find_solutions()
+    if not (param.basepoint == Vector([-1,2,0]) and
+            param.direction_vectors == [Vector([0,-1,1])]):
+        print('test case 3 failed')
+
+    # a 1-D chain keeps its nonzero count under elimination
+    n = 50
+    rows = [{i: 2.} for i in range(n)]
+    for i in range(n - 1):
+        rows[i][i + 1] = -1.
+        rows[i + 1][i] = -1.
+    s = SparseLinearSystem(rows, [1.] * n, n)
+    if not (s.compute_rref().nnz() == n and s[0] == Plane(Vector([2, -1] + [0] * (n - 2)), 1)):
+        print('test case 4 failed')
@@ -0,0 +1,316 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from vector import Vector
+from parametrization import Parametrization
+from dense import DenseSystem
+from sparse import SparseLinearSystem
+from lu import LUFactorization
+from cholesky import CholeskyFactorization
+
+# File layout, little-endian, every section 8-byte aligned (big-endian hosts
+# swap bytes on save and on load, where they get copies instead of views):
+#   header (64 bytes): magic, version, kind, factorization kind,
+#                      rows, dimension, count (nnz or number of directions)
+#   payload by kind:
+#     KIND_DENSE           rows x (dimension + 1) float64, the DenseSystem layout
+#     KIND_CSR             indptr int64[rows + 1], indices int64[nnz],
+#                          data float64[nnz], constants float64[rows]
+#     KIND_SOLUTION        float64[dimension]
+#     KIND_PARAMETRIZATION basepoint float64[dimension],
+#                          directions float64[count x dimension]
+#   then, for systems with a stored factorization:
+#     FACTORIZATION_LU       lu float64[dimension^2], perm int64[dimension]
+#     FACTORIZATION_CHOLESKY lower float64[dimension^2]
+
+MAGIC = b'LSYS'
+VERSION = 1
+HEADER = struct.Struct('<4sHBB7Q')
+HEADER_SIZE = 64
+
+KIND_DENSE = 0
+KIND_CSR = 1
+KIND_SOLUTION = 2
+KIND_PARAMETRIZATION = 3
+
+FACTORIZATION_NONE = 0
+FACTORIZATION_LU = 1
+FACTORIZATION_CHOLESKY = 2
+
+# arrays are in native byte order, the file is little-endian
+BYTESWAP = sys.byteorder == 'big'
+
+NOT_A_SYSTEM_FILE_MSG = 'Not a linear system file'
+NOT_A_SYSTEM_MSG = 'The file holds a solution, not a linear system'
+UNSUPPORTED_VERSION_MSG = 'Unsupported linear system file version'
+UNKNOWN_LAYOUT_MSG = "The layout should be 'dense' or 'sparse'"
+CANNOT_STORE_FACTORIZATION_MSG = 'A factorization can only be stored with a square system of the same size'
+
+
+def _header(kind, factorization_kind, rows, dimension, count):
+    header = HEADER.pack(MAGIC, VERSION, kind, factorization_kind, rows, dimension, count, 0, 0, 0, 0)
+    return header + bytes(HEADER_SIZE - len(header))
+
+
+def _write(f, typecode, values):
+    a = array(typecode, values)
+    if BYTESWAP:
+        a.byteswap()
+    a.tofile(f)
+
+
+def _factorization_kind(factorization):
+    if factorization is None:
+        return FACTORIZATION_NONE
+    if isinstance(factorization, CholeskyFactorization):
+        return FACTORIZATION_CHOLESKY
+    return FACTORIZATION_LU
+
+
+def save(path, obj, factorization=None, layout='dense'):
+    # obj is a LinearSystem, DenseSystem, SparseLinearSystem, Parametrization
+    # or a solution (a sequence of numbers or a Vector). layout picks dense or
+    # CSR storage for a LinearSystem; the other system types keep their own.
+    if layout not in ('dense', 'sparse'):
+        raise Exception(UNKNOWN_LAYOUT_MSG)
+    if hasattr(obj, 'to_sparse'):
+        obj = obj.to_sparse() if layout == 'sparse' else obj.to_dense()
+    if factorization is not None:
+        if not (isinstance(obj, (DenseSystem, SparseLinearSystem)) and
+                len(obj) == obj.dimension == factorization.dimension):
+            raise Exception(CANNOT_STORE_FACTORIZATION_MSG)
+
+    with open(path, 'wb') as f:
+        if isinstance(obj, DenseSystem):
+            f.write(_header(KIND_DENSE, _factorization_kind(factorization), len(obj), obj.dimension, 0))
+            _write(f, 'd', obj.buffer)
+        elif isinstance(obj, SparseLinearSystem):
+            indptr = array('q', [0])
+            indices = array('q')
+            data = array('d')
+            for row in obj.rows:
+                for c in sorted(row):
+                    indices.append(c)
+                    data.append(row[c])
+                indptr.append(len(indices))
+            f.write(_header(KIND_CSR, _factorization_kind(factorization), len(obj), obj.dimension, len(data)))
+            _write(f, 'q', indptr)
+            _write(f, 'q', indices)
+            _write(f, 'd', data)
+            _write(f, 'd', obj.constants)
+        elif isinstance(obj, Parametrization):
+            directions = obj.direction_vectors
+            f.write(_header(KIND_PARAMETRIZATION, FACTORIZATION_NONE, 0, obj.dimension, len(directions)))
+            _write(f, 'd', obj.basepoint.coordinates)
+            for v in directions:
+                _write(f, 'd', v.coordinates)
+        else:
+            if isinstance(obj, Vector):
+                obj = obj.coordinates
+            f.write(_header(KIND_SOLUTION, FACTORIZATION_NONE, 0, len(obj), 0))
+            _write(f, 'd', obj)
+
+        if isinstance(factorization, CholeskyFactorization):
+            _write(f, 'd', factorization.lower)
+        elif factorization is not None:
+            _write(f, 'd', factorization.lu)
+            _write(f, 'q', factorization.perm)
+
+
+class _Mapping(object):
+    # a private copy-on-write mapping of a file: pages are read only when
+    # touched, and writes through the views never reach the file
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            # mmap refuses empty files, and shorter ones have no header
+            if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+                raise Exception(NOT_A_SYSTEM_FILE_MSG)
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        fields = HEADER.unpack_from(self.mm)
+        if fields[0] != MAGIC:
+            raise Exception(NOT_A_SYSTEM_FILE_MSG)
+        if fields[1] != VERSION:
+            raise Exception(UNSUPPORTED_VERSION_MSG)
+        self.kind, self.factorization_kind, self.rows, self.dimension, self.count = fields[2:7]
+        self.offset = HEADER_SIZE
+
+    def take(self, typecode, length):
+        # the next length items of the payload as a typed view
+        start = self.offset
+        self.offset += 8 * length
+        if self.offset > len(self.mm):
+            raise Exception(NOT_A_SYSTEM_FILE_MSG)
+        view = memoryview(self.mm)[start:self.offset].cast(typecode)
+        if BYTESWAP:
+            view = array(typecode, view)
+            view.byteswap()
+        return view
+
+
+def _load_payload(mapping):
+    n = mapping.dimension
+    m = mapping.rows
+    if mapping.kind == KIND_DENSE:
+        return DenseSystem(m, n, mapping.take('d', m * (n + 1)))
+    if mapping.kind == KIND_CSR:
+        # the dict-of-rows representation has to be built, so CSR is read in full
+        indptr = mapping.take('q', m + 1)
+        indices = mapping.take('q', mapping.count)
+        data = mapping.take('d', mapping.count)
+        constants = mapping.take('d', m)
+        rows = [dict(zip(indices[indptr[i]:indptr[i + 1]], data[indptr[i]:indptr[i + 1]]))
+                for i in range(m)]
+        return SparseLinearSystem(rows, list(constants), n)
+    if mapping.kind == KIND_SOLUTION:
+        return list(mapping.take('d', n))
+    if mapping.kind == KIND_PARAMETRIZATION:
+        basepoint = Vector(mapping.take('d', n))
+        directions = mapping.take('d', mapping.count * n)
+        return Parametrization(basepoint, [Vector(directions[k * n:(k + 1) * n])
+                                           for k in range(mapping.count)])
+    raise Exception(NOT_A_SYSTEM_FILE_MSG)
+
+
+def load(path):
+    # a dense system comes back backed by the mapped file, so opening it is
+    # O(1) and only the rows that are used get read
+    return _load_payload(_Mapping(path))
+
+
+def load_system(path):
+    # like load, for callers that need a DenseSystem or SparseLinearSystem
+    mapping = _Mapping(path)
+    if mapping.kind in (KIND_SOLUTION, KIND_PARAMETRIZATION):
+        raise Exception(NOT_A_SYSTEM_MSG)
+    return _load_payload(mapping)
+
+
+def load_factorization(path):
+    # the stored factorization, also backed by the mapping, or None
+    mapping = _Mapping(path)
+    if mapping.factorization_kind == FACTORIZATION_NONE:
+        return None
+    n = mapping.dimension
+    m = mapping.rows
+    # step over the system without reading it
+    if mapping.kind == KIND_DENSE:
+        mapping.take('d', m * (n + 1))
+    else:
+        mapping.take('q', m + 1 + mapping.count)
+        mapping.take('d', mapping.count + m)
+    if mapping.factorization_kind == FACTORIZATION_CHOLESKY:
+        return CholeskyFactorization.from_factors(mapping.take('d', n * n), n)
+    lu = mapping.take('d', n * n)
+    return LUFactorization.from_factors(lu, list(mapping.take('q', n)), n)
+
+
+if __name__ == '__main__':
+    import tempfile
+    from plane import Plane
+    from cholesky import factorize
+
+    p1 = Plane(normal_vector=Vector([0,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,-1,1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1,2,-5]), constant_term=3)
+    s = DenseSystem.from_planes([p1,p2,p3])
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'system.lsys')
+
+        save(path, s, factorization=s.factorize())
+        loaded = load(path)
+        if not ((BYTESWAP or isinstance(loaded.buffer, memoryview)) and loaded.planes == s.planes):
+            print('test case 1 failed')
+        x = loaded.find_solutions()
+        f = load_factorization(path)
+        if not (all(abs(a - b) < 1e-10 for a, b in zip(x, [23/9, 7/9, 2/9])) and
+                f.solve([1, 2, 3]) == s.factorize().solve([1, 2, 3])):
+            print('test case 2 failed')
+
+        # writes to a loaded system stay private to the process
+        loaded.compute_rref(inplace=True)
+        if not load(path).planes == s.planes:
+            print('test case 3 failed')
+
+        sparse = SparseLinearSystem([{0: 1., 2: 1.}, {}, {1: -2.}], [2., 0., 3.], 3)
+        save(path, sparse)
+        loaded = load(path)
+        if not (loaded.rows == sparse.rows and loaded.constants == sparse.constants and
+                load_factorization(path) is None):
+            print('test case 4 failed')
+
+        spd = array('d', [4, 12, -16, 12, 37, -43, -16, -43, 98])
+        save(path, DenseSystem.from_rows([spd[0:3], spd[3:6], spd[6:9]], [1, 2, 3]),
+             factorization=factorize(spd, 3))
+        f = load_factorization(path)
+        if not (isinstance(f, CholeskyFactorization) and list(f.lower) == [2, 0, 0, 6, 1, 0, -8, 5, 3]):
+            print('test case 5 failed')
+
+        param = Parametrization(Vector([-1, 2, 0]), [Vector([0, -1, 1]), Vector([1, 0, 0])])
+        save(path, param)
+        loaded = load(path)
+        if not (loaded.basepoint == param.basepoint and
+                loaded.direction_vectors == param.direction_vectors):
+            print('test case 6 failed')
+
+        save(path, [0.5, 1.5])
+        if load(path) != [0.5, 1.5]:
+            print('test case 7 failed')
+
+        try:
+            save(path, param, factorization=s.factorize())
+            print('test case 8 failed')
+        except Exception as e:
+            if str(e) != CANNOT_STORE_FACTORIZATION_MSG:
+                print('test case 8 failed')
+
+        try:
+            load_system(path)
+            print('test case 9 failed')
+        except Exception as e:
+            if str(e) != NOT_A_SYSTEM_MSG:
+                print('test case 9 failed')
+
+        open(path, 'wb').close()
+        try:
+            load(path)
+            print('test case 10 failed')
+        except Exception as e:
+            if str(e) != NOT_A_SYSTEM_FILE_MSG:
+                print('test case 10 failed')
+
+        # LinearSystem.load maps the file and builds planes only when used
+        from linsys import LinearSystem
+        system = LinearSystem([p1,p2,p3])
+        system.save(path)
+        loaded = LinearSystem.load(path)
+        if not (loaded.planes._planes == [None] * 3 and loaded.to_dense().buffer == s.buffer and
+                loaded[1] == p2 and loaded.find_solutions() == system.find_solutions()):
+            print('test case 11 failed')
+        save(path, [0.5, 1.5])
+        try:
+            LinearSystem.load(path)
+            print('test case 12 failed')
+        except Exception as e:
+            if str(e) != NOT_A_SYSTEM_MSG:
+                print('test case 12 failed')
+
+        with open(path, 'wb') as f:
+            f.write(b'not a system file at all, but long enough for a header' + bytes(16))
+        try:
+            load(path)
+            print('test case 13 failed')
+        except Exception as e:
+            if str(e) != NOT_A_SYSTEM_FILE_MSG:
+                print('test case 13 failed')
+
+        # a stored Cholesky factor serves factorize() with or without the hint
+        system = LinearSystem([Plane(Vector(spd[0:3]), 1), Plane(Vector(spd[3:6]), 2), Plane(Vector(spd[6:9]), 3)])
+        system.save(path, include_factorization=True)
+        loaded = LinearSystem.load(path)
+        f = loaded.factorize()
+        if not (isinstance(f, CholeskyFactorization) and loaded.factorize(assume_spd=True) is f):
+            print('test case 14 failed')
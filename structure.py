@@ -0,0 +1,257 @@
+from array import array
+from dense import DenseSystem
+
+ZERO_TOLERANCE = 1e-10
+
+DENSE = 'dense'
+DIAGONAL = 'diagonal'
+UPPER_TRIANGULAR = 'upper_triangular'
+LOWER_TRIANGULAR = 'lower_triangular'
+TRIDIAGONAL = 'tridiagonal'
+BANDED = 'banded'
+BLOCK_DIAGONAL = 'block_diagonal'
+
+# banded LU is used while the band covers at most this share of a row
+MAX_BAND_FRACTION = 0.25
+
+
+class ZeroPivotError(Exception):
+    pass
+
+
+def bandwidths(system):
+    # (lower, upper) bandwidth of a square system's coefficient matrix
+    buf = system.buffer
+    w = system.width
+    lower = upper = 0
+    for i in range(system.num_equations):
+        start = i * w
+        for j in range(system.dimension):
+            if buf[start + j] != 0.:
+                if i - j > lower:
+                    lower = i - j
+                if j - i > upper:
+                    upper = j - i
+    return lower, upper
+
+
+def diagonal_blocks(system):
+    # split points of the contiguous diagonal blocks: no coefficient links a
+    # row before a split to a column after it, or the other way round
+    buf = system.buffer
+    w = system.width
+    n = system.dimension
+    reach = list(range(n))
+    for i in range(n):
+        start = i * w
+        for j in range(n):
+            if buf[start + j] != 0.:
+                k = max(i, j)
+                m = min(i, j)
+                if k > reach[m]:
+                    reach[m] = k
+
+    blocks = []
+    block_start = 0
+    furthest = 0
+    for i in range(n):
+        furthest = max(furthest, reach[i])
+        if furthest == i:
+            blocks.append((block_start, i + 1))
+            block_start = i + 1
+    return blocks
+
+
+def detect_structure(system):
+    if system.num_equations != system.dimension:
+        return DENSE, {}
+    n = system.dimension
+    lower, upper = bandwidths(system)
+    if lower == 0 and upper == 0:
+        return DIAGONAL, {}
+    if lower == 0:
+        return UPPER_TRIANGULAR, {}
+    if upper == 0:
+        return LOWER_TRIANGULAR, {}
+    if lower <= 1 and upper <= 1:
+        return TRIDIAGONAL, {}
+    blocks = diagonal_blocks(system)
+    if len(blocks) > 1:
+        return BLOCK_DIAGONAL, {'blocks': blocks}
+    if lower + upper + 1 <= MAX_BAND_FRACTION * n:
+        return BANDED, {'lower': lower, 'upper': upper}
+    return DENSE, {}
+
+
+def _rows(system):
+    w = system.width
+    buf = system.buffer
+    return [list(buf[i * w:(i + 1) * w]) for i in range(system.num_equations)]
+
+
+def _check_pivot(pivot):
+    if abs(pivot) < ZERO_TOLERANCE:
+        raise ZeroPivotError()
+
+
+def solve_triangular(system, upper=True):
+    n = system.dimension
+    rows = _rows(system)
+    x = [0.] * n
+    order = range(n - 1, -1, -1) if upper else range(n)
+    for i in order:
+        row = rows[i]
+        _check_pivot(row[i])
+        if upper:
+            s = sum([a * b for a, b in zip(row[i + 1:n], x[i + 1:])])
+        else:
+            s = sum([a * b for a, b in zip(row[:i], x[:i])])
+        x[i] = (row[n] - s) / row[i]
+    return x
+
+
+def solve_tridiagonal(system):
+    # Thomas algorithm, O(n)
+    n = system.dimension
+    buf = system.buffer
+    w = system.width
+    sub = [buf[i * w + i - 1] for i in range(1, n)]
+    diag = [buf[i * w + i] for i in range(n)]
+    sup = [buf[i * w + i + 1] for i in range(n - 1)]
+    d = [buf[i * w + n] for i in range(n)]
+
+    c_prime = [0.] * n
+    d_prime = [0.] * n
+    _check_pivot(diag[0])
+    if n > 1:
+        c_prime[0] = sup[0] / diag[0]
+    d_prime[0] = d[0] / diag[0]
+    for i in range(1, n):
+        denom = diag[i] - sub[i - 1] * c_prime[i - 1]
+        _check_pivot(denom)
+        if i < n - 1:
+            c_prime[i] = sup[i] / denom
+        d_prime[i] = (d[i] - sub[i - 1] * d_prime[i - 1]) / denom
+
+    x = [0.] * n
+    x[n - 1] = d_prime[n - 1]
+    for i in range(n - 2, -1, -1):
+        x[i] = d_prime[i] - c_prime[i] * x[i + 1]
+    return x
+
+
+def solve_banded(system, lower, upper):
+    # LU without pivoting inside the band, O(n * lower * upper)
+    n = system.dimension
+    rows = _rows(system)
+    for k in range(n):
+        top = rows[k]
+        pivot = top[k]
+        _check_pivot(pivot)
+        end = min(n, k + upper + 1)
+        for i in range(k + 1, min(n, k + lower + 1)):
+            row = rows[i]
+            factor = row[k] / pivot
+            if factor == 0.:
+                continue
+            row[k:end] = [y - factor * x for x, y in zip(top[k:end], row[k:end])]
+            row[n] -= factor * top[n]
+
+    x = [0.] * n
+    for i in range(n - 1, -1, -1):
+        row = rows[i]
+        end = min(n, i + upper + 1)
+        s = sum([a * b for a, b in zip(row[i + 1:end], x[i + 1:end])])
+        x[i] = (row[n] - s) / row[i]
+    return x
+
+
+def _sub_system(system, start, end):
+    w = system.width
+    n = system.dimension
+    buf = system.buffer
+    sub = array('d')
+    for i in range(start, end):
+        sub.extend(buf[i * w + start:i * w + end])
+        sub.append(buf[i * w + n])
+    return DenseSystem(end - start, end - start, sub)
+
+
+def solve_block_diagonal(system, blocks):
+    x = []
+    for start, end in blocks:
+        solution, solver = solve_structured(_sub_system(system, start, end))
+        if not isinstance(solution, list):
+            raise ZeroPivotError()
+        x.extend(solution)
+    return x
+
+
+def solve_structured(system):
+    # returns (solution, name of the solver that produced it). Structured
+    # solvers run without pivoting; if one meets a zero pivot the system is
+    # handed to the general elimination instead.
+    structure, info = detect_structure(system)
+    try:
+        if structure == DIAGONAL or structure == UPPER_TRIANGULAR:
+            return solve_triangular(system, upper=True), structure
+        if structure == LOWER_TRIANGULAR:
+            return solve_triangular(system, upper=False), structure
+        if structure == TRIDIAGONAL:
+            return solve_tridiagonal(system), structure
+        if structure == BANDED:
+            return solve_banded(system, info['lower'], info['upper']), structure
+        if structure == BLOCK_DIAGONAL:
+            return solve_block_diagonal(system, info['blocks']), structure
+    except ZeroPivotError:
+        pass
+    return system.find_solutions(), DENSE
+
+
+if __name__ == '__main__':
+    n = 20
+    rows = [[0.] * n for _ in range(n)]
+    for i in range(n):
+        rows[i][i] = 4.
+        if i > 0:
+            rows[i][i - 1] = -1.
+        if i < n - 1:
+            rows[i][i + 1] = -1.
+    tridiagonal = DenseSystem.from_rows(rows, [1.] * n)
+    exact = tridiagonal.find_solutions()
+
+    def close(x):
+        return all(abs(a - b) < 1e-10 for a, b in zip(x, exact))
+
+    x, solver = solve_structured(tridiagonal)
+    if not (solver == TRIDIAGONAL and close(x)):
+        print('test case 1 failed')
+
+    for i in range(n - 2):
+        rows[i][i + 2] = 0.5
+        rows[i + 2][i] = 0.5
+    banded = DenseSystem.from_rows(rows, [1.] * n)
+    exact = banded.find_solutions()
+    x, solver = solve_structured(banded)
+    if not (solver == BANDED and close(x)):
+        print('test case 2 failed')
+
+    upper = DenseSystem.from_rows([[2, 1, 1], [0, 3, 1], [0, 0, 4]], [4, 4, 4])
+    x, solver = solve_structured(upper)
+    if not (solver == UPPER_TRIANGULAR and x == [1., 1., 1.]):
+        print('test case 3 failed')
+
+    blocks = DenseSystem.from_rows([[1, 2, 0, 0, 0],
+                                    [3, 4, 0, 0, 0],
+                                    [0, 0, 1, 1, 1],
+                                    [0, 0, 1, 2, 3],
+                                    [0, 0, 1, 3, 6]], [5, 6, 3, 6, 10])
+    exact = blocks.find_solutions()
+    x, solver = solve_structured(blocks)
+    if not (solver == BLOCK_DIAGONAL and close(x)):
+        print('test case 4 failed')
+
+    # a zero pivot sends the system to general elimination
+    x, solver = solve_structured(DenseSystem.from_rows([[0, 1, 0], [1, 0, 1], [0, 1, 1]], [1, 2, 3]))
+    if not (solver == DENSE and all(abs(a - b) < 1e-10 for a, b in zip(x, [0, 1, 2]))):
+        print('test case 5 failed')
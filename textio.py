@@ -0,0 +1,256 @@
+import re
+from array import array
+from plane import Plane
+from dense import DenseSystem
+from sparse import SparseLinearSystem
+
+# a term as Plane.__str__ writes it: 'x_1', '-2x_2', '+ 0.5x_3', '- x_4'
+_TERM = re.compile(r'\s*([+-]?)\s*([0-9.]+(?:[eE][+-]?[0-9]+)?)?x_([0-9]+)\s*')
+
+MALFORMED_EQUATION_MSG = 'Malformed equation'
+UNKNOWN_LAYOUT_MSG = "The layout should be 'dense' or 'sparse'"
+VARIABLE_OUT_OF_RANGE_MSG = 'The equation uses a variable beyond the dimension of the system'
+
+
+def lines_from_chunks(chunks):
+    # reassembles lines from arbitrary chunks of text, e.g. f.read(2 ** 20)
+    rest = ''
+    for chunk in chunks:
+        lines = (rest + chunk).split('\n')
+        rest = lines.pop()
+        for line in lines:
+            yield line
+    if rest:
+        yield rest
+
+
+def parse_equations(lines):
+    # yields ({column: coefficient}, constant) for each equation in the
+    # Plane.__str__ form. 'Equation k: ' prefixes and header lines such as
+    # 'Linear System:', as written by the system classes, are skipped.
+    for line in lines:
+        line = line.strip()
+        if not line or line.endswith(':'):
+            continue
+        if line.startswith('Equation'):
+            line = line.split(':', 1)[1]
+        lhs, sep, rhs = line.partition('=')
+        if not sep:
+            raise Exception(MALFORMED_EQUATION_MSG)
+
+        # the terms have to cover the whole left-hand side, and every term
+        # after the first needs its sign, so nothing is silently skipped
+        lhs = lhs.strip()
+        row = {}
+        pos = 0
+        if lhs == '0':
+            pos = len(lhs)
+        if not lhs:
+            raise Exception(MALFORMED_EQUATION_MSG)
+        try:
+            while pos < len(lhs):
+                match = _TERM.match(lhs, pos)
+                if not match or (pos and not match.group(1)):
+                    raise Exception(MALFORMED_EQUATION_MSG)
+                sign, coefficient, index = match.groups()
+                value = float(coefficient) if coefficient else 1.
+                if sign == '-':
+                    value = -value
+                # variables are numbered from x_1, as Plane.__str__ writes them
+                col = int(index) - 1
+                if col < 0:
+                    raise Exception(MALFORMED_EQUATION_MSG)
+                row[col] = row.get(col, 0.) + value
+                pos = match.end()
+            yield row, float(rhs)
+        except ValueError:
+            raise Exception(MALFORMED_EQUATION_MSG)
+
+
+def parse_csv(lines, delimiter=',', header=False):
+    # yields (coefficients, constant) for rows of the form a_1,...,a_n,b
+    for line in lines:
+        if header:
+            header = False
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            values = [float(x) for x in line.split(delimiter)]
+        except ValueError:
+            raise Exception(MALFORMED_EQUATION_MSG)
+        yield values[:-1], values[-1]
+
+
+def _build(rows, dimension, layout):
+    # rows are (dict, constant) pairs; a dense system is filled row by row
+    # when the dimension is known, otherwise the rows are kept as dicts
+    # until the widest one has been seen
+    if layout not in ('dense', 'sparse'):
+        raise Exception(UNKNOWN_LAYOUT_MSG)
+
+    if layout == 'dense' and dimension is not None:
+        buffer = array('d')
+        num_equations = 0
+        for row, constant in rows:
+            if row and max(row) >= dimension:
+                raise Exception(VARIABLE_OUT_OF_RANGE_MSG)
+            values = [0.] * (dimension + 1)
+            for col, value in row.items():
+                values[col] = value
+            values[dimension] = constant
+            buffer.extend(values)
+            num_equations += 1
+        return DenseSystem(num_equations, dimension, buffer)
+
+    sparse_rows = []
+    constants = []
+    width = 0
+    for row, constant in rows:
+        sparse_rows.append({c: v for c, v in row.items() if v != 0.})
+        constants.append(constant)
+        if row:
+            width = max(width, max(row) + 1)
+    if dimension is None:
+        dimension = width
+    elif width > dimension:
+        raise Exception(VARIABLE_OUT_OF_RANGE_MSG)
+
+    if layout == 'sparse':
+        return SparseLinearSystem(sparse_rows, constants, dimension)
+    return DenseSystem.from_rows([[r.get(c, 0.) for c in range(dimension)] for r in sparse_rows], constants)
+
+
+def read_equations(lines, dimension=None, layout='dense'):
+    # builds a DenseSystem or SparseLinearSystem straight from text lines
+    # (a file object works) without creating a Plane per equation. Without
+    # a dimension, the highest variable index that appears sets it.
+    return _build(parse_equations(lines), dimension, layout)
+
+
+def read_csv(lines, layout='dense', delimiter=',', header=False):
+    # the number of columns fixes the dimension, so both layouts are filled
+    # row by row
+    if layout not in ('dense', 'sparse'):
+        raise Exception(UNKNOWN_LAYOUT_MSG)
+    buffer = array('d')
+    sparse_rows = []
+    constants = []
+    dimension = None
+    for coefficients, constant in parse_csv(lines, delimiter, header):
+        if dimension is None:
+            dimension = len(coefficients)
+        elif len(coefficients) != dimension:
+            raise Exception(DenseSystem.ALL_ROWS_MUST_BE_IN_SAME_DIM_MSG)
+        if layout == 'dense':
+            buffer.extend(coefficients)
+            buffer.append(constant)
+        else:
+            sparse_rows.append({c: v for c, v in enumerate(coefficients) if v != 0.})
+        constants.append(constant)
+
+    if layout == 'sparse':
+        return SparseLinearSystem(sparse_rows, constants, dimension or 0)
+    return DenseSystem(len(constants), dimension or 0, buffer)
+
+
+def _equations(system):
+    # (terms, constant) for each row of any of the system classes
+    if isinstance(system, SparseLinearSystem):
+        for row, constant in zip(system.rows, system.constants):
+            yield sorted(row.items()), constant
+    elif isinstance(system, DenseSystem):
+        for i in range(system.num_equations):
+            yield enumerate(system.coefficients(i)), system.constant_term(i)
+    else:
+        for p in system.planes:
+            yield enumerate(p.normal_vector.coordinates), p.constant_term
+
+
+def equation_lines(system):
+    # the equations of a LinearSystem, DenseSystem or SparseLinearSystem as
+    # Plane.__str__ would write them, one string at a time
+    for terms, constant in _equations(system):
+        yield Plane.format_equation(terms, constant)
+
+
+def write_equations(system, out):
+    # streams the equations to a file object, one per line
+    for line in equation_lines(system):
+        out.write(line)
+        out.write('\n')
+
+
+def write_csv(system, out, delimiter=','):
+    for terms, constant in _equations(system):
+        if isinstance(system, SparseLinearSystem):
+            values = [0.] * system.dimension
+            for c, v in terms:
+                values[c] = v
+        else:
+            values = [v for c, v in terms]
+        values.append(constant)
+        out.write(delimiter.join([repr(float(v)) for v in values]))
+        out.write('\n')
+
+
+if __name__ == '__main__':
+    import io
+    from vector import Vector
+
+    text = ['Linear System:',
+            'Equation 1: 2x_1 - x_3 = 4',
+            'Equation 2: -x_1 + 0.5x_2 = -1.5',
+            '',
+            '0 = 0']
+    s = read_equations(text)
+    if not (isinstance(s, DenseSystem) and s.dimension == 3 and
+            list(s.buffer) == [2, 0, -1, 4, -1, 0.5, 0, -1.5, 0, 0, 0, 0]):
+        print('test case 1 failed')
+
+    s = read_equations(text, dimension=4, layout='sparse')
+    if not (s.rows == [{0: 2., 2: -1.}, {0: -1., 1: 0.5}, {}] and s.dimension == 4 and
+            s.constants == [4., -1.5, 0.]):
+        print('test case 2 failed')
+
+    if list(read_equations(text, dimension=3).buffer) != list(read_equations(text).buffer):
+        print('test case 3 failed')
+
+    # writing and reading back goes through the same text as Plane.__str__
+    p1 = Plane(normal_vector=Vector([0,1,1]), constant_term=1)
+    p2 = Plane(normal_vector=Vector([1,-1,1]), constant_term=2)
+    p3 = Plane(normal_vector=Vector([1,2,-5.5]), constant_term=3)
+    dense = DenseSystem.from_planes([p1,p2,p3])
+    out = io.StringIO()
+    write_equations(dense, out)
+    if out.getvalue() != '{}\n{}\n{}\n'.format(p1, p2, p3):
+        print('test case 4 failed')
+    if read_equations(out.getvalue().splitlines()).planes != dense.planes:
+        print('test case 5 failed')
+
+    out = io.StringIO()
+    write_csv(dense.compute_rref(), out)
+    back = read_csv(lines_from_chunks(out.getvalue()[i:i + 7] for i in range(0, len(out.getvalue()), 7)))
+    if list(back.buffer) != list(dense.compute_rref().buffer):
+        print('test case 6 failed')
+
+    s = read_csv(['a,b,c,d', '1,0,0,2', '0,3,0,4'], layout='sparse', header=True)
+    if not (s.rows == [{0: 1.}, {1: 3.}] and s.constants == [2., 4.] and s.dimension == 3):
+        print('test case 7 failed')
+
+    for bad in ['x_1 + x_2', 'x_1 = y', 'nonsense = 1', 'x_1 x_2 = 3', 'x_1 + junk x_2 = 3',
+                '2x_1 + x_2 ! = 1', '1.2.3x_1 = 0', ' = 1', 'x_0 = 1', '3x_0 + 2x_1 = 4']:
+        try:
+            read_equations([bad])
+            print('test case 8 failed')
+        except Exception as e:
+            if str(e) != MALFORMED_EQUATION_MSG:
+                print('test case 8 failed')
+
+    try:
+        read_equations(['x_5 = 1'], dimension=3)
+        print('test case 9 failed')
+    except Exception as e:
+        if str(e) != VARIABLE_OUT_OF_RANGE_MSG:
+            print('test case 9 failed')
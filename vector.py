@@ -1,15 +1,28 @@
 from math import sqrt, pi, acos
+from array import array
+from operator import add, sub
+import expr
 
 class Vector(object):
+    # immutable: float coordinates live in a compact array('d'), anything
+    # else (ints, Fractions) in a tuple. Magnitude and unit vector are
+    # computed once, on first use.
+    __slots__ = ('coordinates', 'dimension', '_magnitude', '_unit')
+
     CANNOT_NORMALIZE_ZERO_VECTOR_MSG = 'Cannot normalize the zero vector'
     NO_UNIQUE_PARALLEL_COMPONENT_MSG = 'Zero vector has no unique parallel components'
+    VECTOR_IS_IMMUTABLE_MSG = 'Vectors are immutable'
 
     def __init__(self, coordinates):
         try:
             if not coordinates:
                 raise ValueError
-            self.coordinates = tuple(coordinates)
-            self.dimension = len(coordinates)
+            if ((isinstance(coordinates, array) and coordinates.typecode == 'd') or
+                    _all_floats(coordinates)):
+                _set_coordinates(self, array('d', coordinates))
+            else:
+                _set_coordinates(self, tuple(coordinates))
+            _set_dimension(self, len(coordinates))
 
         except ValueError:
             raise ValueError('The coordinates must be nonempty')
@@ -17,59 +30,110 @@ class Vector(object):
         except TypeError:
             raise TypeError('The coordinates must be an iterable')
 
+    @classmethod
+    def _from_floats(cls, coordinates):
+        # coordinates is a fresh list of floats, e.g. from arithmetic
+        return _wrap(array('d', coordinates))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(self.VECTOR_IS_IMMUTABLE_MSG)
+
+    def __delattr__(self, name):
+        raise AttributeError(self.VECTOR_IS_IMMUTABLE_MSG)
+
+    def __reduce__(self):
+        return (Vector, (tuple(self.coordinates),))
+
     def __len__(self):
-        return len(self.coordinates)
+        return self.dimension
 
     def __getitem__(self, i):
         return self.coordinates[i]
 
     def __str__(self):
-        return 'Vector: {}'.format(self.coordinates)
+        return 'Vector: {}'.format(tuple(self.coordinates))
 
     def __eq__(self, v):
-        return self.coordinates == v.coordinates
+        a = self.coordinates
+        b = v.coordinates
+        if type(a) is type(b):
+            return a == b
+        return len(a) == len(b) and all([x == y for x, y in zip(a, b)])
+
+    def __hash__(self):
+        # equal vectors hash alike whether stored as floats or not
+        return hash(tuple(self.coordinates))
 
     def __iter__(self):
-        self.current = 0
-        return self
+        return iter(self.coordinates)
+
+    # operators build lazy expressions (see expr.py) that are computed in one
+    # pass by evaluate(); the named methods below compute right away
+    def __add__(self, v):
+        return expr.lazy(self) + v
+
+    def __sub__(self, v):
+        return expr.lazy(self) - v
+
+    def __mul__(self, c):
+        return expr.lazy(self) * c
+
+    __rmul__ = __mul__
 
-    def __next__(self):
-        if self.current >= len(self.coordinates):
-            raise StopIteration
-        else:
-            current_value = self.coordinates[self.current]
-            self.current += 1
-            return current_value
+    def __truediv__(self, c):
+        return expr.lazy(self) / c
 
+    def __neg__(self):
+        return -expr.lazy(self)
 
+    def __matmul__(self, v):
+        return expr.lazy(self) @ v
+
+
+    # float vectors (and float or int scalars) give floats, so those results
+    # are built straight into an array without checking their types
     def add(self, v):
-        coord = []
-        for i in range(len(self.coordinates)):
-            coord.append(self.coordinates[i] + v.coordinates[i])
-        return Vector(coord)
+        a = self.coordinates
+        b = v.coordinates
+        if type(a) is array and type(b) is array:
+            return _wrap(array('d', map(add, a, b)))
+        return _make([x + y for x, y in zip(a, b)])
 
     def subtract(self, v):
-        coord = [x-y for x,y in zip(self.coordinates, v.coordinates)]
-        return Vector(coord)
+        a = self.coordinates
+        b = v.coordinates
+        if type(a) is array and type(b) is array:
+            return _wrap(array('d', map(sub, a, b)))
+        return _make([x - y for x, y in zip(a, b)])
 
     def scale(self, c):
-        coord = [x*c for x in self.coordinates]
-        return Vector(coord)
+        a = self.coordinates
+        if type(a) is array and type(c) in (float, int):
+            return _wrap(array('d', [x * c for x in a]))
+        return _make([x * c for x in a])
 
     def magnitude(self):
-        coord = [x**2 for x in self.coordinates]
-        return sqrt(sum(coord))
+        # the cache slots stay unset until first use
+        try:
+            return self._magnitude
+        except AttributeError:
+            magnitude = sqrt(sum([x**2 for x in self.coordinates]))
+            _set_magnitude(self, magnitude)
+            return magnitude
 
     def normalize(self):
         try:
-            magnitude = self.magnitude()
-            return self.scale(1./magnitude)
-        except ZeroDivisionError:
-            raise Exception(self.CANNOT_NORMALIZE_ZERO_VECTOR_MSG)
+            return self._unit
+        except AttributeError:
+            try:
+                unit = self.scale(1./self.magnitude())
+            except ZeroDivisionError:
+                raise Exception(self.CANNOT_NORMALIZE_ZERO_VECTOR_MSG)
+            _set_unit(self, unit)
+            return unit
 
     def inner_product(self, v):
-        coord = [x*y for x,y, in zip(self.coordinates, v.coordinates)]
-        return sum(coord)
+        return sum([x*y for x, y in zip(self.coordinates, v.coordinates)])
 
     def angle_with(self, v, in_degrees=False):
         try:
@@ -89,10 +153,10 @@ class Vector(object):
                 raise e
 
     def is_parallel_to(self, v):
-        return (self.is_zero() or 
-                v.is_zero() or
-                self.angle_with(v) == 0 or
-                self.angle_with(v) == pi)
+        if self.is_zero() or v.is_zero():
+            return True
+        angle = self.angle_with(v)
+        return angle == 0 or angle == pi
 
     def is_zero(self, tolerance=1e-10):
         return self.magnitude() < tolerance
@@ -106,7 +170,7 @@ class Vector(object):
             return unit_basis.scale(self.inner_product(unit_basis))
         except Exception as e:
             if str(e) == self.CANNOT_NORMALIZE_ZERO_VECTOR_MSG:
-                raise Except(self.NO_UNIQUE_PARALLEL_COMPONENT_MSG)
+                raise Exception(self.NO_UNIQUE_PARALLEL_COMPONENT_MSG)
             else:
                 raise e
 
@@ -135,6 +199,33 @@ class Vector(object):
         return 0        
 
 
+# the slot descriptors write past Vector.__setattr__
+_set_coordinates = Vector.coordinates.__set__
+_set_dimension = Vector.dimension.__set__
+_set_magnitude = Vector._magnitude.__set__
+_set_unit = Vector._unit.__set__
+
+
+def _wrap(coordinates):
+    # a Vector that takes over coordinates, a fresh array('d')
+    v = object.__new__(Vector)
+    _set_coordinates(v, coordinates)
+    _set_dimension(v, len(coordinates))
+    return v
+
+
+def _all_floats(coordinates):
+    for x in coordinates:
+        if type(x) is not float:
+            return False
+    return True
+
+
+def _make(coordinates):
+    # results of arithmetic keep the compact form when they are all floats
+    if _all_floats(coordinates):
+        return Vector._from_floats(coordinates)
+    return Vector(coordinates)
 
 
 # # Quiz add, substract, scale
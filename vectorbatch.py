@@ -0,0 +1,264 @@
+from array import array
+from math import sqrt, acos, pi
+from numbers import Number
+from operator import add, sub, mul
+from vector import Vector
+
+ZERO_VECTOR_MASK = 1
+
+
+class VectorBatch(object):
+    # count vectors of one dimension stored row-major in a single float64
+    # buffer. Binary operations take another batch of the same count, a
+    # batch of one or a single Vector, which is broadcast against every row.
+    # Batches of two different sizes above one do not broadcast; for every
+    # pair of rows use pairwise_inner_product, or loop over one batch.
+    # Where Vector raises for a zero vector, the batch operations return a
+    # mask instead: an array('b') with ZERO_VECTOR_MASK in the affected rows.
+
+    DIMENSIONS_MUST_MATCH_MSG = 'All vectors should live in the same dimension'
+    COUNTS_DO_NOT_BROADCAST_MSG = 'Batches should have the same size or a single vector'
+    BUFFER_SIZE_MISMATCH_MSG = 'The buffer size does not match the shape of the batch'
+    CROSS_PRODUCT_NEEDS_3D_MSG = 'The cross product is only defined in three dimensions'
+
+    def __init__(self, count, dimension, buffer=None):
+        self.count = count
+        self.dimension = dimension
+        if buffer is None:
+            buffer = array('d', bytes(8 * count * dimension))
+        elif len(buffer) != count * dimension:
+            raise Exception(self.BUFFER_SIZE_MISMATCH_MSG)
+        self.buffer = buffer
+
+    @classmethod
+    def from_vectors(cls, vectors):
+        d = vectors[0].dimension
+        buffer = array('d')
+        for v in vectors:
+            if v.dimension != d:
+                raise Exception(cls.DIMENSIONS_MUST_MATCH_MSG)
+            buffer.extend(v.coordinates)
+        return cls(len(vectors), d, buffer)
+
+    @classmethod
+    def from_rows(cls, rows):
+        d = len(rows[0])
+        buffer = array('d')
+        for row in rows:
+            if len(row) != d:
+                raise Exception(cls.DIMENSIONS_MUST_MATCH_MSG)
+            buffer.extend(row)
+        return cls(len(rows), d, buffer)
+
+    def to_vectors(self):
+        return [self[i] for i in range(self.count)]
+
+    def row(self, i):
+        d = self.dimension
+        return self.buffer[i * d:(i + 1) * d]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError('vector index out of range')
+        return Vector(self.row(i))
+
+    def __str__(self):
+        return 'VectorBatch: {} vectors of dimension {}'.format(self.count, self.dimension)
+
+
+    def _broadcast(self, other):
+        # (own buffer, other's buffer, count), both buffers count rows long
+        if isinstance(other, Vector):
+            other = VectorBatch(1, other.dimension, array('d', other.coordinates))
+        if other.dimension != self.dimension:
+            raise Exception(self.DIMENSIONS_MUST_MATCH_MSG)
+        if other.count == self.count:
+            return self.buffer, other.buffer, self.count
+        if other.count == 1:
+            return self.buffer, other.buffer * self.count, self.count
+        if self.count == 1:
+            return self.buffer * other.count, other.buffer, other.count
+        raise Exception(self.COUNTS_DO_NOT_BROADCAST_MSG)
+
+    def _row_sums(self, values):
+        # sums of consecutive groups of dimension values, a strided column at a time
+        d = self.dimension
+        sums = values[0::d]
+        for k in range(1, d):
+            sums = list(map(add, sums, values[k::d]))
+        return array('d', sums)
+
+    def _scale_rows(self, buffer, scalars):
+        d = self.dimension
+        out = array('d', buffer)
+        for k in range(d):
+            out[k::d] = array('d', map(mul, buffer[k::d], scalars))
+        return out
+
+    def add(self, other):
+        a, b, count = self._broadcast(other)
+        return VectorBatch(count, self.dimension, array('d', map(add, a, b)))
+
+    def subtract(self, other):
+        a, b, count = self._broadcast(other)
+        return VectorBatch(count, self.dimension, array('d', map(sub, a, b)))
+
+    def scale(self, c):
+        # c is one scalar (of any numeric type) or one per row
+        if isinstance(c, Number):
+            c = float(c)
+            return VectorBatch(self.count, self.dimension, array('d', [x * c for x in self.buffer]))
+        return VectorBatch(self.count, self.dimension, self._scale_rows(self.buffer, c))
+
+    def inner_product(self, other):
+        a, b, count = self._broadcast(other)
+        return self._row_sums(list(map(mul, a, b)))
+
+    def pairwise_inner_product(self, other):
+        # inner products of every row with every row of other, any counts:
+        # row-major, self.count rows of other.count values
+        if isinstance(other, Vector):
+            other = VectorBatch(1, other.dimension, array('d', other.coordinates))
+        if other.dimension != self.dimension:
+            raise Exception(self.DIMENSIONS_MUST_MATCH_MSG)
+        m = other.count
+        out = array('d', bytes(8 * self.count * m))
+        for j in range(m):
+            out[j::m] = self._row_sums(list(map(mul, self.buffer, other.row(j) * self.count)))
+        return out
+
+    def magnitude(self):
+        return array('d', map(sqrt, self._row_sums([x * x for x in self.buffer])))
+
+    def is_zero(self, tolerance=1e-10):
+        return array('b', [ZERO_VECTOR_MASK if m < tolerance else 0 for m in self.magnitude()])
+
+    def normalize(self):
+        # (unit vectors, mask); zero vectors stay zero and are masked
+        magnitudes = self.magnitude()
+        mask = array('b', [ZERO_VECTOR_MASK if m == 0. else 0 for m in magnitudes])
+        inverse = [1. / m if m != 0. else 0. for m in magnitudes]
+        return VectorBatch(self.count, self.dimension, self._scale_rows(self.buffer, inverse)), mask
+
+    def angle_with(self, other, in_degrees=False):
+        # (angles, mask); masked angles are nan
+        if isinstance(other, Vector):
+            other = VectorBatch(1, other.dimension, array('d', other.coordinates))
+        u1, mask1 = self.normalize()
+        u2, mask2 = other.normalize()
+        a, b, count = u1._broadcast(u2)
+        if len(mask1) != count:
+            mask1 = mask1 * count
+        if len(mask2) != count:
+            mask2 = mask2 * count
+        mask = array('b', map(max, mask1, mask2))
+        factor = 180 / pi if in_degrees else 1.
+        # rounded like Vector.angle_with, which keeps acos in its domain
+        angles = array('d', [acos(round(x, 3)) * factor for x in self._row_sums(list(map(mul, a, b)))])
+        for i, masked in enumerate(mask):
+            if masked:
+                angles[i] = float('nan')
+        return angles, mask
+
+    def cross_product(self, other):
+        if self.dimension != 3:
+            raise Exception(self.CROSS_PRODUCT_NEEDS_3D_MSG)
+        a, b, count = self._broadcast(other)
+        x1, y1, z1 = a[0::3], a[1::3], a[2::3]
+        x2, y2, z2 = b[0::3], b[1::3], b[2::3]
+        out = array('d', bytes(8 * 3 * count))
+        out[0::3] = array('d', [y * z_ - z * y_ for y, z, y_, z_ in zip(y1, z1, y2, z2)])
+        out[1::3] = array('d', [z * x_ - x * z_ for x, z, x_, z_ in zip(x1, z1, x2, z2)])
+        out[2::3] = array('d', [x * y_ - y * x_ for x, y, x_, y_ in zip(x1, y1, x2, y2)])
+        return VectorBatch(count, 3, out)
+
+    def component_parallel_to(self, basis):
+        # (components, mask); rows with a zero basis vector are zero and masked
+        if isinstance(basis, Vector):
+            basis = VectorBatch(1, basis.dimension, array('d', basis.coordinates))
+        unit, mask = basis.normalize()
+        a, u, count = self._broadcast(unit)
+        if len(mask) != count:
+            mask = mask * count
+        coefficients = self._row_sums(list(map(mul, a, u)))
+        return VectorBatch(count, self.dimension, self._scale_rows(u, coefficients)), mask
+
+    def component_orthogonal_to(self, basis):
+        parallel, mask = self.component_parallel_to(basis)
+        a, p, count = self._broadcast(parallel)
+        out = array('d', map(sub, a, p))
+        # masked rows are zero, like the parallel component
+        d = self.dimension
+        for i, masked in enumerate(mask):
+            if masked:
+                out[i * d:(i + 1) * d] = array('d', bytes(8 * d))
+        return VectorBatch(count, d, out), mask
+
+
+if __name__ == '__main__':
+    vectors = [Vector([3.039, 1.879, 0.5]), Vector([0., 0., 0.]), Vector([-9.88, -3.264, -8.159])]
+    others = [Vector([0.825, 2.036, 1.]), Vector([1., 2., 3.]), Vector([-2.155, -9.353, -9.473])]
+    batch = VectorBatch.from_vectors(vectors)
+    other = VectorBatch.from_vectors(others)
+
+    def close(u, v):
+        return all(abs(x - y) < 1e-12 for x, y in zip(u.coordinates, v.coordinates))
+
+    if not (batch.to_vectors() == vectors and len(batch) == 3):
+        print('test case 1 failed')
+
+    if not (batch.add(other).to_vectors() == [u.add(v) for u, v in zip(vectors, others)] and
+            list(batch.inner_product(other)) == [u.inner_product(v) for u, v in zip(vectors, others)]):
+        print('test case 2 failed')
+
+    units, mask = batch.normalize()
+    if not (list(mask) == [0, 1, 0] and close(units[0], vectors[0].normalize()) and
+            units[1] == Vector([0., 0., 0.])):
+        print('test case 3 failed')
+
+    angles, mask = batch.angle_with(other)
+    if not (list(mask) == [0, 1, 0] and angles[0] == vectors[0].angle_with(others[0]) and
+            angles[1] != angles[1] and angles[2] == vectors[2].angle_with(others[2])):
+        print('test case 4 failed')
+
+    if not all(close(c, u.cross_product(v)) for c, u, v in zip(batch.cross_product(other), vectors, others)):
+        print('test case 5 failed')
+
+    # one basis vector against the whole batch
+    parallel, mask = batch.component_parallel_to(others[0])
+    orthogonal, mask2 = batch.component_orthogonal_to(others[0])
+    if not (list(mask) == [0, 0, 0] and
+            all(close(p, v.component_parallel_to(others[0])) for p, v in zip(parallel, vectors)) and
+            all(close(o, v.component_orthogonal_to(others[0])) for o, v in zip(orthogonal, vectors))):
+        print('test case 6 failed')
+
+    # a zero basis vector is masked rather than raising
+    parallel, mask = other.component_parallel_to(batch)
+    if not (list(mask) == [0, 1, 0] and parallel[1] == Vector([0., 0., 0.]) and
+            close(parallel[2], others[2].component_parallel_to(vectors[2]))):
+        print('test case 7 failed')
+
+    single = VectorBatch.from_vectors([Vector([1., 1., 1.])])
+    if not (single.subtract(batch).count == 3 and list(batch.scale([1., 2., 3.]).row(2)) ==
+            [x * 3. for x in vectors[2].coordinates]):
+        print('test case 8 failed')
+
+    try:
+        batch.add(VectorBatch.from_vectors(others[:2]))
+        print('test case 9 failed')
+    except Exception as e:
+        if str(e) != VectorBatch.COUNTS_DO_NOT_BROADCAST_MSG:
+            print('test case 9 failed')
+
+    from fractions import Fraction
+    from decimal import Decimal
+    pairs = batch.pairwise_inner_product(VectorBatch.from_vectors(others[:2]))
+    if not (list(pairs) == [u.inner_product(v) for u in vectors for v in others[:2]] and
+            batch.scale(Fraction(1, 2)).to_vectors() == batch.scale(0.5).to_vectors() and
+            batch.scale(Decimal('0.5')).to_vectors() == batch.scale(0.5).to_vectors()):
+        print('test case 10 failed')